@@ -19,6 +19,12 @@ import uuid
 import io
 import urllib.request as _urllib_request
 import urllib.error as _urllib_error
+import urllib.parse
+from camera_rooms import CameraRoom, RoomManager, normalize_confidence as _normalize_confidence
+from camera_upload import IMAGE_TYPES, UploadError, media_type, parse_detect_upload
+from camera_stream import STREAM_STATS, CameraStream, handshake_headers
+from camera_aioserver import AsyncCameraServer
+from camera_hints import SERVER_LOAD, TARGET_LATENCY_MS
 from yoloV4.yolov4_demo import YOLOv4Detector
 try:
     import cv2 as _cv2
@@ -27,6 +33,46 @@ except Exception:
     _cv2 = None
     _np = None
 
+try:
+    from yoloV4.model_registry import InferencePoolBusy
+    from yoloV4.fair_queue import inference_client
+    from yoloV4.error_recorder import get_error_recorder
+except Exception:
+    get_error_recorder = None
+    class InferencePoolBusy(RuntimeError):
+        """Placeholder so `except InferencePoolBusy` works without the YOLO package."""
+
+    import contextlib as _contextlib
+
+    def inference_client(client, priority=0):
+        return _contextlib.nullcontext()
+
+# Seconds a client is asked to wait (Retry-After) when every inference context is busy
+DETECT_RETRY_AFTER = int(os.environ.get("DETECT_RETRY_AFTER", "1"))
+# Latest frame wins: while a camera's frame is being analyzed, a newer /detect post
+# replaces the one waiting behind it, which is answered as superseded at once
+CAMERA_COALESCE = os.environ.get("CAMERA_COALESCE", "1").strip().lower() not in ("0", "false", "no", "off")
+# Camera server implementation: "asyncio" (camera_aioserver.py) or "threading" (http.server)
+CAMERA_SERVER = os.environ.get("CAMERA_SERVER", "asyncio").strip().lower()
+# Port the 'camera' command serves Camera.html and /detect on
+CAMERA_PORT = int(os.environ.get("CAMERA_PORT", "8000"))
+
+# Detector readiness: set once start_camera_server has loaded and warmed up the detector
+DETECTOR_READY = threading.Event()
+DETECTOR_READINESS = {'state': 'not_started'}
+CAMERA_WARMUP_RUNS = int(os.environ.get("CAMERA_WARMUP_RUNS", "3"))
+# Camera frames that differ from the last analyzed one by less than this (mean
+# abs diff of a small grayscale thumbnail, 0-255) reuse its detections; 0 = off
+CAMERA_CHANGE_THRESHOLD = float(os.environ.get("CAMERA_CHANGE_THRESHOLD", "3.0"))
+# Run YOLO on every Nth camera frame and track person boxes in between; 1 = every frame
+CAMERA_KEYFRAME_INTERVAL = int(os.environ.get("CAMERA_KEYFRAME_INTERVAL", "3"))
+# Fixed cameras read by the server itself next to the browser: comma separated
+# video files, V4L2 devices (0, /dev/video0) or RTSP URLs, sampled at CAMERA_VIDEO_FPS.
+# Prefix an entry with "room=" (kitchen=rtsp://...) to name its camera room.
+CAMERA_VIDEO_SOURCES = os.environ.get("CAMERA_VIDEO_SOURCES", "")
+CAMERA_VIDEO_FPS = float(os.environ.get("CAMERA_VIDEO_FPS", "5"))
+VIDEO_SOURCES = []
+
 # Try to import emergency alert system (optional, for reliable multi-channel alerts)
 try:
     from emergency_alert import send_emergency_alert as _send_emergency_alert
@@ -110,14 +156,35 @@ SUMMARY_MAX_AGE_SECONDS = 10.0
 # Camera auto-stop configuration: after this many detect frames, select best candidate
 # and request that the camera be stopped automatically. Changeable by the operator.
 CAMERA_AUTOSTOP_N = 5
-CAMERA_SHOT_COUNTER = 0
+# Set when the default (browser) room auto-stops; the main loop then stops the server
 CAMERA_AUTO_STOP_TRIGGERED = False
-CAMERA_SHOT_LOCK = threading.Lock()
+# Per-camera identification state (camera_rooms.py). The default room is the
+# browser camera and keeps using RECENT_IDENTIFICATIONS as its window; other
+# rooms are created on first use by /detect {"camera": ...} or a video source.
+# CAMERA_ROOM_PRIORITY ("bedroom=2,kitchen=1") orders rooms on a busy inference pool.
+# CAMERA_MAX_ROOMS / CAMERA_ROOM_TTL bound how many rooms clients can create.
+ROOMS = RoomManager(
+    CameraRoom('default', window_max=RECENT_MAX, identifications=RECENT_IDENTIFICATIONS, lock=RECENT_IDENTIFICATIONS_LOCK),
+    priorities={
+        name.strip(): int(value)
+        for name, _, value in (item.partition('=') for item in os.environ.get('CAMERA_ROOM_PRIORITY', '').split(','))
+        if name.strip() and value.strip().lstrip('-').isdigit()
+    },
+)
+
+
+def forget_camera_stream(room):
+    # An evicted room takes its per-stream detector state (tracker, change gate,
+    # cascade search, inference queue entries) with it
+    D = globals().get('DETECTOR')
+    if D is not None and hasattr(D, 'forget_stream'):
+        D.forget_stream(room.name)
+
+
+ROOMS.on_evict = forget_camera_stream
 SERVER_BUILD_ID = "v1-autostop-{}".format(uuid.uuid4().hex[:8])
 SKIP_PENDING_PROMPT = False
 SKIP_PENDING_PRINTED = False
-LAST_CONFIRMATION_KEY = None
-LAST_CONFIRMATION_TS = 0.0
 CONFIRMATION_REPEAT_SECONDS = 5.0
 # Panic confirmation toggle: when True, it produces `panic` which asks before sending external alerts
 PANIC_REQUIRE_CONFIRM = True
@@ -129,11 +196,7 @@ PANIC_REQUIRE_CONFIRM = True
 # Can be overridden via environment variables for testing (e.g., INACTIVITY_TIMEOUT=30 for 30 seconds)
 INACTIVITY_TIMEOUT_SECONDS = int(os.environ.get('INACTIVITY_TIMEOUT', 600))  # 10 minutes default
 INACTIVITY_PROMPT_TIMEOUT = int(os.environ.get('INACTIVITY_PROMPT_TIMEOUT', 30))  # 30 seconds to respond
-PERSON_IDENTIFIED_TS = None       # Timestamp when person was identified
-PERSON_IDENTIFIED_ID = None       # ID of the identified person
-PERSON_IDENTIFIED_NAME = None     # Name of the identified person
-PERSON_INACTIVITY_THREAD = None   # Current inactivity monitor thread
-PERSON_INACTIVITY_CANCELLED = False  # Flag to cancel pending inactivity check
+# The monitored person and the monitor generation are kept per camera on its CameraRoom
 
 # --- Notification configuration (fill with your keys/IDs) -----------------
 FCM_SERVER_KEY = None  # e.g. 'AAAA...'
@@ -333,7 +396,7 @@ def send_panic_alert(elder_id: int | str | None = None, note: str | None = None)
         return False
 
 
-def start_person_inactivity_monitor(person_id, person_name: str):
+def start_person_inactivity_monitor(person_id, person_name: str, room=None):
     """Start or restart the inactivity monitor after identifying a person.
     
     After INACTIVITY_TIMEOUT_SECONDS (default 10 min) with no activity,
@@ -343,31 +406,30 @@ def start_person_inactivity_monitor(person_id, person_name: str):
     This is called after:
     - Successful a/b/c person selection
     - Camera identification confirmation
+
+    Each camera room (default: the browser camera) runs at most one monitor;
+    starting a new one cancels the previous monitor of the same room only.
     """
-    global PERSON_IDENTIFIED_TS, PERSON_IDENTIFIED_ID, PERSON_IDENTIFIED_NAME
-    global PERSON_INACTIVITY_THREAD, PERSON_INACTIVITY_CANCELLED
-    
-    # Cancel any existing inactivity monitor
-    PERSON_INACTIVITY_CANCELLED = True
-    time.sleep(0.1)  # Brief pause to let existing thread notice cancellation
-    PERSON_INACTIVITY_CANCELLED = False
-    
-    # Record identification
-    PERSON_IDENTIFIED_TS = time.time()
-    PERSON_IDENTIFIED_ID = person_id
-    PERSON_IDENTIFIED_NAME = person_name
+    room = room or ROOMS.default
+    # Record identification and cancel any existing inactivity monitor of this room
+    identified_ts = time.time()
+    generation = room.begin_inactivity_monitor(person_id, person_name, identified_ts)
+
+    def cancelled():
+        return room.inactivity_generation != generation
+
+    room.last_identified = person_id
     globals()['LAST_IDENTIFIED'] = person_id
-    globals()['LAST_INPUT_TS'] = PERSON_IDENTIFIED_TS
+    # Operator activity for the start-up watchdog; room monitors watch room.activity_ts
+    globals()['LAST_INPUT_TS'] = identified_ts
     
     logging.getLogger(__name__).info(
-        "Person identified: %s (ID: %s) - starting %d-minute inactivity monitor",
-        person_name, person_id, INACTIVITY_TIMEOUT_SECONDS // 60
+        "Person identified: %s (ID: %s, camera %s) - starting %d-minute inactivity monitor",
+        person_name, person_id, room.name, INACTIVITY_TIMEOUT_SECONDS // 60
     )
     
     def _person_inactivity_watchdog():
         """Background thread that monitors for inactivity after person identification."""
-        global PERSON_INACTIVITY_CANCELLED
-        
         try:
             # Import msvcrt for Windows key detection
             try:
@@ -379,21 +441,20 @@ def start_person_inactivity_monitor(person_id, person_name: str):
             
             # Sleep in small increments to allow cancellation
             sleep_remaining = INACTIVITY_TIMEOUT_SECONDS
-            while sleep_remaining > 0 and not PERSON_INACTIVITY_CANCELLED:
+            while sleep_remaining > 0 and not cancelled():
                 time.sleep(min(5, sleep_remaining))
                 sleep_remaining -= 5
                 
-                # Check if there was any activity since identification
-                last_input = globals().get('LAST_INPUT_TS', 0)
-                if last_input > PERSON_IDENTIFIED_TS:
+                # Check if there was any activity in this room since identification
+                if (room.activity_ts or 0) > identified_ts:
                     logging.getLogger(__name__).info("Activity detected since identification; resetting timer")
                     return  # Activity detected, exit quietly
             
-            if PERSON_INACTIVITY_CANCELLED:
+            if cancelled():
                 return
             
             # No activity for the timeout period - prompt the user
-            person_name_display = PERSON_IDENTIFIED_NAME or "the identified person"
+            person_name_display = person_name or "the identified person"
             timeout_minutes = INACTIVITY_TIMEOUT_SECONDS // 60 if INACTIVITY_TIMEOUT_SECONDS >= 60 else 1
             
             # Get localized prompt message
@@ -423,7 +484,7 @@ def start_person_inactivity_monitor(person_id, person_name: str):
             # Windows: use msvcrt.kbhit
             if MSVCRT_AVAILABLE and _msvcrt is not None:
                 end_time = time.time() + INACTIVITY_PROMPT_TIMEOUT
-                while time.time() < end_time and not PERSON_INACTIVITY_CANCELLED:
+                while time.time() < end_time and not cancelled():
                     try:
                         if _msvcrt.kbhit():
                             try:
@@ -453,7 +514,7 @@ def start_person_inactivity_monitor(person_id, person_name: str):
                 except Exception:
                     responded = False
             
-            if PERSON_INACTIVITY_CANCELLED:
+            if cancelled():
                 return
             
             if responded:
@@ -467,9 +528,9 @@ def start_person_inactivity_monitor(person_id, person_name: str):
                 except Exception:
                     confirm_msg = "[OK] Response received - {} is confirmed present. Inactivity timer reset.".format(person_name_display)
                 print(confirm_msg)
-                globals()['LAST_INPUT_TS'] = time.time()
+                reset_inactivity_timer(room)
                 # Restart the monitor
-                start_person_inactivity_monitor(PERSON_IDENTIFIED_ID, PERSON_IDENTIFIED_NAME)
+                start_person_inactivity_monitor(person_id, person_name, room=room)
                 return
             
             # No response - trigger emergency alert!
@@ -489,7 +550,7 @@ def start_person_inactivity_monitor(person_id, person_name: str):
             try:
                 threading.Thread(
                     target=send_panic_alert,
-                    args=(PERSON_IDENTIFIED_ID, "No response to presence check after {} minutes of inactivity".format(INACTIVITY_TIMEOUT_SECONDS // 60)),
+                    args=(person_id, "No response to presence check after {} minutes of inactivity".format(INACTIVITY_TIMEOUT_SECONDS // 60)),
                     daemon=True
                 ).start()
             except Exception:
@@ -497,11 +558,15 @@ def start_person_inactivity_monitor(person_id, person_name: str):
                 
         except Exception:
             logging.getLogger(__name__).exception("Person inactivity watchdog failed")
+        finally:
+            # Unless a newer monitor of this room took over, stop reporting it as monitored
+            room.end_inactivity_monitor(generation)
     
     # Start the watchdog thread
     try:
-        PERSON_INACTIVITY_THREAD = threading.Thread(target=_person_inactivity_watchdog, daemon=True)
-        PERSON_INACTIVITY_THREAD.start()
+        threading.Thread(
+            target=_person_inactivity_watchdog, name="inactivity-{}".format(room.name), daemon=True
+        ).start()
         timeout_minutes = INACTIVITY_TIMEOUT_SECONDS // 60 if INACTIVITY_TIMEOUT_SECONDS >= 60 else 1
         try:
             started_template = PROMPTS.get(CURRENT_LANG, PROMPTS.get('en', {})).get('inactivity_started')
@@ -516,9 +581,15 @@ def start_person_inactivity_monitor(person_id, person_name: str):
         logging.getLogger(__name__).exception("Could not start person inactivity watchdog")
 
 
-def reset_inactivity_timer():
-    """Call this whenever there is user activity to reset the inactivity timer."""
-    globals()['LAST_INPUT_TS'] = time.time()
+def reset_inactivity_timer(room=None):
+    """Call this whenever there is user activity to reset the inactivity timer.
+
+    The activity ends the inactivity monitor of `room` only (default: the
+    browser camera, whose operator uses this console).
+    """
+    now = time.time()
+    globals()['LAST_INPUT_TS'] = now
+    (room or ROOMS.default).record_activity(now)
 
 
 def _missed_dose_monitor(manager, reminder, check_interval_seconds: int = 300, lookback_hours: int = 2):
@@ -576,103 +647,246 @@ def _missed_dose_monitor(manager, reminder, check_interval_seconds: int = 300, l
 
 
 
-def _normalize_confidence(value):
+def decode_frame_bytes(img_bytes):
+    """Decode JPEG/PNG bytes posted by the camera page into a BGR numpy array.
+
+    Returns None when OpenCV/NumPy are unavailable or the bytes cannot be decoded,
+    in which case callers fall back to the temp-file path.
+    """
+    if _cv2 is None or _np is None or not img_bytes:
+        return None
     try:
-        conf = float(value)
+        img = _cv2.imdecode(_np.frombuffer(img_bytes, dtype=_np.uint8), _cv2.IMREAD_COLOR)
     except Exception:
-        return 0.0
-    if conf < 0.0:
-        return 0.0
-    if conf > 1.0:
-        if conf <= 100.0:
-            conf = conf / 100.0
-        else:
-            conf = 1.0
-    if conf >= 1.0:
-        conf = 0.999
-    return conf
-
-
-def summarize_recent_identifications(max_entries=None, max_age=None):
-    samples = []
-    with RECENT_IDENTIFICATIONS_LOCK:
-        if RECENT_IDENTIFICATIONS:
-            samples = list(RECENT_IDENTIFICATIONS)
-    if not samples:
         return None
-
-    if max_entries is not None:
-        samples = samples[-int(max_entries):]
-
-    now_ts = time.time()
-    if max_age is not None:
-        filtered = []
-        for sample in samples:
-            ts = sample.get('ts') if isinstance(sample, dict) else None
-            if ts is None or now_ts - ts <= max_age:
-                filtered.append(sample)
-        samples = filtered
-    if not samples:
+    if img is None or not isinstance(img, _np.ndarray) or img.ndim < 2:
         return None
+    return img
 
-    stats = {}
-    for sample in samples:
-        pid = sample.get('person_id') if isinstance(sample, dict) else None
-        name = sample.get('name') if isinstance(sample, dict) else None
-        label = sample.get('label') if isinstance(sample, dict) else None
-        key = pid if pid is not None else (name or label or 'Unknown')
-        entry = stats.setdefault(
-            key,
-            {
-                'count': 0,
-                'conf_sum': 0.0,
-                'name': name or label or 'Unknown',
-                'person_id': pid,
-                'latest_ts': 0.0,
-            },
-        )
-        entry['count'] += 1
+
+def adjust_frame_brightness(img, target_mean: float = 120.0, max_factor: float = 2.0):
+    """Brighten a decoded frame in memory if it is too dark for detection.
+
+    Returns the adjusted frame, or the original frame when no change is needed.
+    """
+    if _cv2 is None or _np is None or img is None:
+        return img
+    try:
+        gray = img if img.ndim == 2 else _cv2.cvtColor(img, _cv2.COLOR_BGR2GRAY)
+        mean = float(_np.mean(gray))
+        if mean <= 0 or mean >= target_mean:
+            return img
+        factor = min(max_factor, target_mean / mean)
+        return _cv2.convertScaleAbs(img, alpha=factor, beta=0)
+    except Exception:
+        logging.getLogger(__name__).exception('Brightness adjustment failed')
+        return img
+
+
+def summarize_recent_identifications(max_entries=None, max_age=None, room=None):
+    """Leading identity in the identification window of `room` (default: the browser camera)."""
+    room = room or ROOMS.default
+    return room.summarize(max_entries=max_entries, max_age=max_age)
+
+
+def record_identifications(identified, room=None):
+    """Feed one frame's identifications into the confirmation flow of `room`.
+
+    Appends them to the room's identification window, counts the camera shot,
+    queues a pending confirmation for the leading candidate and triggers the
+    room's auto-stop after CAMERA_AUTOSTOP_N shots. Used by /detect and by the
+    video sources; returns the summary payload (or None).
+    """
+    room = room or ROOMS.default
+    autostop_n = room.autostop_n or globals().get('CAMERA_AUTOSTOP_N', 10)
+    summary_payload = None
+    leading_candidate = None
+    cur = 0
+    try:
+        samples = []
+        for item in identified:
+            conf = None
+            name = None
+            pid = None
+            track_id = None
+            if isinstance(item, dict):
+                conf = item.get('confidence') or item.get('detection_confidence') or item.get('score')
+                name = item.get('person_name') or item.get('person') or item.get('name')
+                pid = item.get('person_id') or item.get('elder_id')
+                track_id = item.get('track_id')
+            else:
+                name = str(item)
+            conf = _normalize_confidence(conf)
+            samples.append({'person_id': pid, 'name': name, 'confidence': conf, 'track_id': track_id, 'ts': time.time()})
+        cur = room.add_identifications(samples)
+        logging.getLogger(__name__).debug("Camera %s shot %d/%d", room.name, cur, autostop_n)
+    except Exception:
+        cur = 0
+
+    try:
+        leading_candidate = room.summarize(max_entries=autostop_n, max_age=SUMMARY_MAX_AGE_SECONDS)
+    except Exception:
+        leading_candidate = None
+
+    if leading_candidate:
+        summary_payload = dict(leading_candidate)
+        summary_payload['support_percent'] = round(summary_payload.get('support', 0.0) * 100.0, 1)
+        summary_payload['avg_confidence_percent'] = round(summary_payload.get('avg_confidence', 0.0) * 100.0, 1)
+        summary_payload['camera'] = room.name
+        # Camera pages streaming over /ws get the summary as it happens
+        room.publish(dict(summary_payload, type='summary'))
+        summary_key = (summary_payload.get('person_id'), summary_payload.get('name'))
+        now_summary = time.time()
         try:
-            entry['conf_sum'] += _normalize_confidence(sample.get('confidence'))
+            if (
+                summary_key != room.last_confirmation_key
+                or (now_summary - room.last_confirmation_ts) >= CONFIRMATION_REPEAT_SECONDS
+            ):
+                entry = {
+                    'client_confirmed': False,
+                    'elder_id': summary_payload.get('person_id'),
+                    'name': summary_payload.get('name'),
+                    'label': summary_payload.get('name'),
+                    'confidence': summary_payload.get('avg_confidence'),
+                    'count': summary_payload.get('count'),
+                    'support': summary_payload.get('support'),
+                    'camera': room.name,
+                }
+                PENDING_CONFIRMATIONS.put_nowait(entry)
+                room.last_confirmation_key = summary_key
+                room.last_confirmation_ts = now_summary
         except Exception:
             pass
-        ts = sample.get('ts') if isinstance(sample, dict) else None
-        if isinstance(ts, (int, float)):
-            entry['latest_ts'] = max(entry['latest_ts'], ts)
 
-    total = sum(v['count'] for v in stats.values())
-    if total == 0:
-        return None
+        logging.getLogger(__name__).info(
+            "[SUMMARY] IDENTIFICATION COMPLETE: %s -- SUPPORT %.0f%%, AVG_CONF %.1f%% ACROSS %d SAMPLES (camera %s)",
+            (summary_payload.get('name') or 'Unknown').upper(),
+            summary_payload.get('support_percent', 0.0),
+            summary_payload.get('avg_confidence_percent', 0.0),
+            summary_payload.get('total_samples', 0),
+            room.name,
+        )
+        try:
+            msg = PROMPTS.get(CURRENT_LANG, PROMPTS.get('en', {})).get('press_enter_to_proceed')
+            if not msg:
+                msg = PROMPTS['en'].get('press_enter_to_proceed', 'Press Enter to proceed to the next step...')
+            print(msg)
+        except Exception:
+            print('Press Enter to proceed to the next step...')
+    else:
+        summary_payload = None
+        try:
+            first = identified[0]
+            pid = first.get('person_id') if isinstance(first, dict) else None
+            name = first.get('person_name') if isinstance(first, dict) else str(first)
+            entry = {'client_confirmed': False, 'elder_id': pid, 'name': name, 'label': name, 'camera': room.name}
+            PENDING_CONFIRMATIONS.put_nowait(entry)
+        except Exception:
+            pass
 
-    best = None
-    for data in stats.values():
-        avg_conf = data['conf_sum'] / data['count'] if data['count'] else 0.0
-        candidate = {
-            'person_id': data['person_id'],
-            'name': data['name'],
-            'count': data['count'],
-            'avg_confidence': avg_conf,
-            'support': data['count'] / total,
-            'total_samples': total,
-            'latest_timestamp': data['latest_ts'] or None,
-        }
-        if best is None:
-            best = candidate
-            continue
-        if candidate['count'] > best['count']:
-            best = candidate
-            continue
-        if candidate['count'] == best['count'] and candidate['avg_confidence'] > best['avg_confidence']:
-            best = candidate
+    try:
+        if room.should_auto_stop(autostop_n):
+            if room is ROOMS.default:
+                # The browser camera is the server's session: the main loop stops it
+                globals()['CAMERA_AUTO_STOP_TRIGGERED'] = True
+            best = leading_candidate or room.summarize(max_entries=autostop_n, max_age=SUMMARY_MAX_AGE_SECONDS)
+            room.publish({'type': 'auto_stop', 'shots': cur, 'candidate': best})
+            if best:
+                person_id = best.get('person_id')
+                name = best.get('name') or 'Unknown'
+                confidence = best.get('avg_confidence', 0.0)
+                support_pct = (best.get('support', 0.0) or 0.0) * 100.0
+                logging.getLogger(__name__).info(
+                    "AUTO-STOP IDENTIFICATION COMPLETE AFTER %d SHOTS: %s -- SUPPORT %.0f%%, AVG_CONF %.1f%% (camera %s)",
+                    cur,
+                    name.upper(),
+                    support_pct,
+                    confidence * 100.0,
+                    room.name,
+                )
+                try:
+                    msg = PROMPTS.get(CURRENT_LANG, PROMPTS.get('en', {})).get('press_enter_to_proceed')
+                    if not msg:
+                        msg = PROMPTS['en'].get('press_enter_to_proceed', 'Press Enter to proceed to the next step...')
+                    print(msg)
+                except Exception:
+                    print('Press Enter to proceed to the next step...')
+                if person_id:
+                    room.last_identified = person_id
+                    globals()['LAST_IDENTIFIED'] = person_id
+                    # Start inactivity monitor for the auto-stop identified person
+                    try:
+                        start_person_inactivity_monitor(person_id, name, room=room)
+                    except Exception:
+                        logging.getLogger(__name__).exception("Failed to start inactivity monitor for auto-stop ID")
+                globals()['SKIP_PENDING_PROMPT'] = True
+                globals()['SKIP_PENDING_PRINTED'] = False
+            else:
+                logging.getLogger(__name__).info("Auto-stop (%s): no candidate selected after %d shots", room.name, cur)
+    except Exception:
+        logging.getLogger(__name__).exception("Error selecting candidate during auto-stop")
+    return summary_payload
+
+
+def _video_result(result):
+    # Video frames go through the same confirmation flow as /detect frames, in their own room
+    room = ROOMS.get(result.get('source'))
+    room.record_frame()
+    identified = result.get('identified') or []
+    if identified:
+        record_identifications(identified, room=room)
+    if room.auto_stop_triggered:
+        # Identification for this room is complete: stop reading its camera
+        for video in list(VIDEO_SOURCES):
+            if video.name == room.name:
+                VIDEO_SOURCES.remove(video)
+                video.stop(timeout=0)
+
+
+def start_video_sources(sources=None, target_fps=None):
+    """Start a VideoSource per entry of `sources` (default CAMERA_VIDEO_SOURCES) on DETECTOR."""
+    if sources is None:
+        sources = [s.strip() for s in CAMERA_VIDEO_SOURCES.split(',') if s.strip()]
+    if not sources:
+        return []
+    detector = globals().get('DETECTOR')
+    if detector is None or not hasattr(detector, 'detect_all'):
+        logging.getLogger(__name__).warning("Video sources need the YOLO detector; not started")
+        return []
+    from yoloV4.video_source import VideoSource
+    started = []
+    for source in sources:
+        name = None
+        match = re.match(r'^(\w[\w-]*)=(.+)$', source)
+        if match:
+            name, source = match.group(1), match.group(2)
+        try:
+            video = VideoSource(
+                source,
+                detector,
+                identifier=globals().get('IDENTIFIER'),
+                on_result=_video_result,
+                name=name,
+                target_fps=target_fps or CAMERA_VIDEO_FPS,
+            )
+            video.priority = ROOMS.get(video.name).priority
+            video.start()
+        except Exception as _e:
+            print("[WARN] Could not start video source {}: {}".format(source, _e))
             continue
-        if (
-            candidate['count'] == best['count']
-            and abs(candidate['avg_confidence'] - best['avg_confidence']) < 1e-6
-            and (candidate['latest_timestamp'] or 0.0) > (best['latest_timestamp'] or 0.0)
-        ):
-            best = candidate
+        VIDEO_SOURCES.append(video)
+        started.append(video)
+        print("[OK] Video source started: {}".format(video.name))
+    return started
 
-    return best
+
+def stop_video_sources():
+    while VIDEO_SOURCES:
+        video = VIDEO_SOURCES.pop()
+        try:
+            video.stop()
+        except Exception:
+            logging.getLogger(__name__).exception("Failed to stop video source %s", video.name)
 
 
 def _last4_match(elder: dict | None, code: str) -> bool:
@@ -737,8 +951,8 @@ class Application:
     def last4_match(self, elder: dict | None, code: str) -> bool:
         return globals().get('_orig__last4_match', _last4_match)(elder, code)
 
-    def summarize_recent_identifications(self, max_entries=None, max_age=None):
-        return globals().get('_orig_summarize_recent_identifications', summarize_recent_identifications)(max_entries=max_entries, max_age=max_age)
+    def summarize_recent_identifications(self, max_entries=None, max_age=None, room=None):
+        return globals().get('_orig_summarize_recent_identifications', summarize_recent_identifications)(max_entries=max_entries, max_age=max_age, room=room)
 
 
 # Create a single application object for easier consumption by readers/tools
@@ -1138,54 +1352,91 @@ def main():
             print("[INFO] Camera server already running on port {}".format(_httpd.server_address[1]))
             return
         root = Path(__file__).parent.resolve()
-        # Initialize (or reuse) the detector and optional identifier used by the /detect endpoint
-        global DETECTOR, IDENTIFIER
-        try:
-            DETECTOR
-        except NameError:
+        def prepare_detector():
+            # Initialize (or reuse) the detector and optional identifier used by the /detect
+            # endpoint, then warm it up. Runs in the background while the server already
+            # answers /status; /detect returns 503 until DETECTOR_READY is set.
+            global DETECTOR, IDENTIFIER
+            readiness = DETECTOR_READINESS
+            readiness.update({'state': 'loading', 'started_at': time.time(), 'finished_at': None,
+                              'load_ms': None, 'warmup': None, 'error': None})
+            _t0 = time.perf_counter()
             try:
-                # Try to prepare YOLOv4 config & weights if helper is available
-                from yoloV4.yolov4_detector import YOLOv4PersonDetector, setup_yolov4_config, download_yolov4_weights
-                try:
-                    # Ensure config files (cfg, names) exist; this is small and fast
-                    setup_yolov4_config()
-                except Exception as _e:
-                    print("[YOLOV4] Could not ensure config files: {}".format(_e))
-                # If weights are missing, attempt a best-effort download (may be large)
-                weights_path = os.path.join(str(Path(__file__).parent.resolve()), 'yoloV4', 'yolov4.weights')
-                if not os.path.exists(weights_path):
+                if globals().get('DETECTOR') is None:
                     try:
-                        print("[YOLOV4] Weights missing, attempting download (this may take several minutes)...")
-                        download_yolov4_weights()
+                        # Try to prepare YOLOv4 config & weights if helper is available
+                        from yoloV4.yolov4_detector import YOLOv4PersonDetector, setup_yolov4_config, download_yolov4_weights, MODEL_VARIANT, model_files
+                        try:
+                            # Ensure config files (cfg, names) exist; this is small and fast
+                            setup_yolov4_config()
+                        except Exception as _e:
+                            print("[YOLOV4] Could not ensure config files: {}".format(_e))
+                        # If weights are missing, attempt a best-effort download (may be large)
+                        weights_path = os.path.join(str(Path(__file__).parent.resolve()), 'yoloV4', model_files(MODEL_VARIANT)[1])
+                        if not os.path.exists(weights_path):
+                            try:
+                                print("[YOLOV4] Weights missing, attempting download (this may take several minutes)...")
+                                download_yolov4_weights()
+                            except Exception as _e:
+                                print("[YOLOV4] Could not download weights automatically: {}".format(_e))
+                        # Instantiate the real detector (it will choose fallback if required)
+                        DETECTOR = YOLOv4PersonDetector()
                     except Exception as _e:
-                        print("[YOLOV4] Could not download weights automatically: {}".format(_e))
-                # Instantiate the real detector (it will choose fallback if required)
-                DETECTOR = YOLOv4PersonDetector()
+                        print("[WARN] Real YOLOv4 detector not available: {}\n[FALLBACK] Using demo/mock detector".format(_e))
+                        # If the real detector can't be created, fall back to the demo/mock detector
+                        DETECTOR = YOLOv4Detector()
+                # Log which detector implementation was created
+                try:
+                    logging.getLogger(__name__).info("DETECTOR instantiated: %s", type(DETECTOR))
+                except Exception:
+                    pass
+                # Try to create a higher-level identifier (an object that can identify persons or medications)
+                if 'IDENTIFIER' not in globals() or IDENTIFIER is None:
+                    try:
+                        from yoloV4.yolov4_detector import YOLOv4MedicationDetector, YOLOv4PersonDetector
+                        # Share the detector's network so each frame is only run through YOLO once
+                        shared = DETECTOR if isinstance(DETECTOR, YOLOv4PersonDetector) else None
+                        IDENTIFIER = YOLOv4MedicationDetector(detector=shared)
+                    except Exception:
+                        try:
+                            from yoloV4.yolov4_demo import YOLOv4withML
+                            IDENTIFIER = YOLOv4withML(DETECTOR)
+                        except Exception:
+                            IDENTIFIER = None
+                # Log which identifier (if any) is being used
+                try:
+                    logging.getLogger(__name__).info("IDENTIFIER instantiated: %s", type(IDENTIFIER) if IDENTIFIER is not None else None)
+                except Exception:
+                    pass
+                readiness['load_ms'] = round((time.perf_counter() - _t0) * 1000.0, 1)
+                # Synthetic forwards so the first real frame does not pay for graph setup
+                readiness['state'] = 'warming_up'
+                if hasattr(DETECTOR, 'warm_up'):
+                    readiness['warmup'] = DETECTOR.warm_up(runs=CAMERA_WARMUP_RUNS)
+                # Skip YOLO on near-identical frames (an empty room, a still elder)
+                if CAMERA_CHANGE_THRESHOLD > 0 and getattr(DETECTOR, 'change_gate', True) is None:
+                    DETECTOR.enable_change_gate(CAMERA_CHANGE_THRESHOLD)
+                # Track persons between keyframes instead of running YOLO on every frame
+                if CAMERA_KEYFRAME_INTERVAL > 1 and getattr(DETECTOR, 'keyframe_interval', 2) <= 1:
+                    DETECTOR.enable_tracking(CAMERA_KEYFRAME_INTERVAL)
             except Exception as _e:
-                print("[WARN] Real YOLOv4 detector not available: {}\n[FALLBACK] Using demo/mock detector".format(_e))
-                # If the real detector can't be created, fall back to the demo/mock detector
-                DETECTOR = YOLOv4Detector()
-        # Log which detector implementation was created
-        try:
-            logging.getLogger(__name__).info("DETECTOR instantiated: %s", type(DETECTOR))
-        except Exception:
-            pass
-        # Try to create a higher-level identifier (an object that can identify persons or medications)
-        if 'IDENTIFIER' not in globals() or IDENTIFIER is None:
-            try:
-                from yoloV4.yolov4_detector import YOLOv4MedicationDetector
-                IDENTIFIER = YOLOv4MedicationDetector()
-            except Exception:
+                # Serve anyway: the detectors have their own cascade/simulated fallbacks
+                readiness['error'] = str(_e)
+                print("[WARN] Detector preparation failed: {}".format(_e))
+            finally:
+                # /detect is served either way; 'degraded' tells /status readers setup failed
+                readiness['state'] = 'degraded' if readiness.get('error') else 'ready'
+                readiness['finished_at'] = time.time()
+                readiness['total_ms'] = round((time.perf_counter() - _t0) * 1000.0, 1)
+                DETECTOR_READY.set()
+                logging.getLogger(__name__).info("Detector %s in %.0f ms", readiness['state'], readiness['total_ms'])
                 try:
-                    from yoloV4.yolov4_demo import YOLOv4withML
-                    IDENTIFIER = YOLOv4withML(DETECTOR)
+                    start_video_sources()
                 except Exception:
-                    IDENTIFIER = None
-        # Log which identifier (if any) is being used
-        try:
-            logging.getLogger(__name__).info("IDENTIFIER instantiated: %s", type(IDENTIFIER) if IDENTIFIER is not None else None)
-        except Exception:
-            pass
+                    logging.getLogger(__name__).exception("Failed to start video sources")
+
+        DETECTOR_READY.clear()
+        threading.Thread(target=prepare_detector, name="detector-warmup", daemon=True).start()
         # Create a tiny favicon if one doesn't exist so the browser won't request a missing file
         try:
             favicon_path = root / "favicon.ico"
@@ -1195,7 +1446,558 @@ def main():
         except Exception as _e:
             print("[WARN] Could not create favicon.ico: {}".format(_e))
 
-        # HTTP handler for the camera UI. It accepts POST /detect with a base64 image payload.
+        def analyze_frame(img_bytes, room):
+            """Detect and identify one posted frame for `room`; returns ``(status, payload)``.
+
+            Shared by POST /detect and the /ws stream. 503 means every inference
+            context is busy (retry later), 500 that detection failed.
+            """
+            # Decode the JPEG once; the same buffer is passed through brightness
+            # correction, detection, identification and fall detection. A temp
+            # file is only written if a detector without an in-memory API needs one.
+            frame = adjust_frame_brightness(decode_frame_bytes(img_bytes))
+            tmp_name = None
+
+            def frame_path():
+                # Lazily save the (brightened) frame to a temporary JPEG for path-only
+                # detectors; bytes that could not be decoded are written as posted
+                nonlocal tmp_name
+                if tmp_name is None:
+                    tmp_name = str(root / "frame_{}.jpg".format(uuid.uuid4().hex))
+                    data = img_bytes
+                    if frame is not None:
+                        ok, buf = _cv2.imencode('.jpg', frame)
+                        if ok:
+                            data = buf.tobytes()
+                    with open(tmp_name, 'wb') as f:
+                        f.write(data)
+                return tmp_name
+
+            # Result of DETECTOR.detect_all(frame): one forward pass shared by the
+            # person boxes, the identifier and the medication lookup.
+            all_detections = None
+
+            def identify():
+                # The medication ROI crops also go through the pool as this camera
+                with inference_client(room.name, room.priority):
+                    if frame is not None and hasattr(IDENTIFIER, 'detect_and_identify_in_array'):
+                        return IDENTIFIER.detect_and_identify_in_array(frame, detections=all_detections)
+                    return IDENTIFIER.detect_and_identify(frame_path())
+
+            # Run the detector. Prefer a method that returns person boxes if available.
+            try:
+                if hasattr(DETECTOR, 'detect_persons_in_image'):
+                    try:
+                        if frame is not None and hasattr(DETECTOR, 'detect_all'):
+                            # Queue for the shared inference pool as this camera
+                            with inference_client(room.name, room.priority):
+                                all_detections = DETECTOR.detect_all(frame, stream_id=room.name)
+                            raw = all_detections.get('persons')
+                        elif frame is not None and hasattr(DETECTOR, 'detect_persons_in_array'):
+                            raw = DETECTOR.detect_persons_in_array(frame)
+                        else:
+                            raw = DETECTOR.detect_persons_in_image(frame_path())
+                    except InferencePoolBusy:
+                        # Overloaded, not broken: don't retry through IDENTIFIER
+                        raise
+                    except Exception as _inner_e:
+                        # If DETECTOR fails, attempt IDENTIFIER as a fallback
+                        logging.getLogger(__name__).warning('DETECTOR failed: %s - trying IDENTIFIER fallback', _inner_e)
+                        raw = None
+                        if IDENTIFIER is not None and hasattr(IDENTIFIER, 'detect_and_identify'):
+                            try:
+                                id_results = identify()
+                                # Map identifier results into the `raw` format expected below
+                                raw = []
+                                if isinstance(id_results, list):
+                                    for it in id_results:
+                                        # tag fields to match expected shape
+                                        raw.append({'class': 'person', 'confidence': it.get('detection_confidence') or it.get('confidence') or 0.0, 'box': [0,0,0,0], 'person_id': it.get('person_id'), 'person_name': it.get('person_name')})
+                                elif isinstance(id_results, dict):
+                                    for it in id_results.get('identified_persons', []):
+                                        raw.append({'class': 'person', 'confidence': it.get('detection_confidence') or it.get('confidence') or 0.0, 'box': [0,0,0,0], 'person_id': it.get('person_id'), 'person_name': it.get('person_name')})
+                            except InferencePoolBusy:
+                                raise
+                            except Exception:
+                                raw = None
+
+                    # Expect `raw` to be a list of detections like {'class','confidence','box':[x,y,w,h]}
+                    objects = []
+                    if raw:
+                        for item in raw:
+                            box = None
+                            if isinstance(item, dict):
+                                box = item.get('box') or item.get('bbox')
+                            if box and len(box) >= 4:
+                                x, y, w, h = box[0], box[1], box[2], box[3]
+                            else:
+                                x = item.get('x', 0) if isinstance(item, dict) else 0
+                                y = item.get('y', 0) if isinstance(item, dict) else 0
+                                w = item.get('width', 0) if isinstance(item, dict) else 0
+                                h = item.get('height', 0) if isinstance(item, dict) else 0
+                            objects.append({
+                                'class': (item.get('class') if isinstance(item, dict) else 'person') or 'person',
+                                'confidence': float(item.get('confidence', 0) if isinstance(item, dict) else 0),
+                                'x': int(x), 'y': int(y), 'width': int(w), 'height': int(h)
+                            })
+                            if isinstance(item, dict) and item.get('track_id') is not None:
+                                objects[-1]['track_id'] = item.get('track_id')
+                    results = {'image_path': tmp_name, 'objects': objects, 'count': len(objects)}
+                else:
+                    # If the detector only provides a generic `detect` method, use that form instead
+                    results = DETECTOR.detect(frame_path())
+                    # ensure results contains 'objects' list
+                    if 'objects' not in results and isinstance(results, list):
+                        results = {'image_path': tmp_name, 'objects': results, 'count': len(results)}
+            except InferencePoolBusy as e:
+                # Admission control: every inference context is busy, so shed this
+                # frame instead of parking another thread on the network.
+                try:
+                    if tmp_name:
+                        os.remove(tmp_name)
+                except Exception:
+                    pass
+                return 503, {'error': 'busy', 'details': str(e)}
+            except Exception as e:
+                import traceback as _tb
+                tb = _tb.format_exc()
+                # Also write the traceback to a local debug file for inspection; the
+                # recorder writes it off-thread, once per interval for repeated failures
+                logged = True
+                if get_error_recorder is not None:
+                    logged = get_error_recorder().record('DETECT ERROR', root / 'detect_error.log', e)
+                if logged:
+                    logging.getLogger(__name__).exception('Detection error: %s', e)
+                else:
+                    logging.getLogger(__name__).warning('Detection error: %s', e)
+                # cleanup tmp
+                try:
+                    if tmp_name:
+                        os.remove(tmp_name)
+                except Exception:
+                    pass
+                return 500, {'error': 'detection failed', 'details': str(e), 'traceback': tb}
+
+            # If an identifier object is available, try to map detected boxes to known persons
+            identified = []
+            summary_payload = None
+            try:
+                if IDENTIFIER is not None and hasattr(IDENTIFIER, 'detect_and_identify'):
+                    id_results = identify()
+                    # YOLOv4withML returns dict with 'identified_persons' or YOLOv4MedicationDetector returns list
+                    if isinstance(id_results, dict):
+                        identified = id_results.get('identified_persons', [])
+                    elif isinstance(id_results, list):
+                        identified = id_results
+            except InferencePoolBusy as e:
+                # The identifier's crops were shed by the pool: this frame was not
+                # analyzed, so answer busy like the detection step does
+                try:
+                    if tmp_name:
+                        os.remove(tmp_name)
+                except Exception:
+                    pass
+                return 503, {'error': 'busy', 'details': str(e)}
+            except Exception as _e:
+                logging.getLogger(__name__).warning("Identification failed: %s", _e)
+
+            # If identification data was returned, annotate detection objects with friendly labels
+            if identified:
+                # Build a mapping from person id to a readable label (e.g. "person1 (Name)")
+                mapping = {}
+                for i, item in enumerate(identified, start=1):
+                    pid = None
+                    person_name = None
+                    if isinstance(item, dict):
+                        pid = item.get('person_id') or item.get('person_id')
+                        person_name = item.get('person_name') or item.get('person_name')
+                        if not person_name and 'database_info' in item and isinstance(item['database_info'], dict):
+                            person_name = item['database_info'].get('name')
+                    if pid is None:
+                        pid = i
+                    if person_name:
+                        mapping[pid] = "person{} ({})".format(pid, person_name)
+                    else:
+                        mapping[pid] = "person{}".format(pid)
+
+                for idx, obj in enumerate(results.get('objects', []), start=1):
+                    if obj.get('class') == 'person' or str(obj.get('class')).lower().startswith('person'):
+                        label = mapping.get(idx, "person{}".format(idx))
+                        obj['class'] = label
+
+                # Conservative fall-detection hook: if the detector exposes a
+                # `detect_fall` (or `detect_fallen_posture`) method, call it
+                # with the temporary image. If a fall is detected, trigger a
+                # panic alert in a background thread. This is opt-in and
+                # requires the detector implementation to provide the method.
+                try:
+                    fallen = False
+                    D = globals().get('DETECTOR')
+                    if D is not None:
+                        if hasattr(D, 'detect_fall') and callable(getattr(D, 'detect_fall')):
+                            try:
+                                fallen = bool(D.detect_fall(frame_path()))
+                            except Exception as _e:
+                                logging.getLogger(__name__).warning('Fall detection failed: %s', _e)
+                        elif hasattr(D, 'detect_fallen_posture') and callable(getattr(D, 'detect_fallen_posture')):
+                            try:
+                                fallen = bool(D.detect_fallen_posture(frame_path()))
+                            except Exception as _e:
+                                logging.getLogger(__name__).warning('Fall posture detection failed: %s', _e)
+                    if fallen:
+                        # Try to determine an elder id for the alert (prefer identified results)
+                        elder_for_alert = None
+                        try:
+                            if isinstance(identified, list) and len(identified) > 0:
+                                first = identified[0]
+                                if isinstance(first, dict):
+                                    elder_for_alert = first.get('person_id') or first.get('elder_id')
+                        except Exception:
+                            elder_for_alert = None
+                        if not elder_for_alert:
+                            elder_for_alert = globals().get('LAST_IDENTIFIED')
+                        try:
+                            threading.Thread(target=send_panic_alert, args=(elder_for_alert, 'Fall detected by camera'), daemon=True).start()
+                            logging.getLogger(__name__).warning('Fall detected; panic alert dispatched for elder=%s', elder_for_alert)
+                        except Exception:
+                            logging.getLogger(__name__).exception('Failed to dispatch panic alert for fall')
+                except Exception:
+                    logging.getLogger(__name__).exception('Error in fall-detection hook')
+
+                summary_payload = record_identifications(identified, room=room)
+
+            # Remove the temporary file (if one was needed) to avoid filling up disk space
+            try:
+                if tmp_name:
+                    os.remove(tmp_name)
+            except Exception:
+                pass
+
+            # respond with detections and any identified meta
+            try:
+                logging.getLogger(__name__).info("/detect -> detections=%d identified=%d", len(results.get('objects', [])) if isinstance(results, dict) else 0, len(identified) if identified else 0)
+            except Exception:
+                pass
+            payload = {'detections': results, 'identified': identified,
+                       'camera': room.name, 'auto_stop': room.auto_stop_triggered}
+            return 200, payload
+
+        # Route logic shared by both HTTP servers: plain functions of the request body
+        # and headers returning (status, payload); 503 responses get Retry-After.
+        def camera_room(payload, camera_header=None):
+            # Camera id from the JSON body or an X-Camera header; none = the default room
+            camera = payload.get('camera') if isinstance(payload, dict) else None
+            return ROOMS.get(camera or camera_header)
+
+        def status_payload():
+            """The /status document the camera page polls."""
+            det_info = None
+            id_info = None
+            yolo_loaded = False
+            use_cascade = False
+            use_simulated = False
+            batching = None
+            process_workers = None
+            change_gate = None
+            tracking = None
+            preprocess = None
+            model_info = None
+            video_sources = [v.info() for v in list(VIDEO_SOURCES)]
+            rooms = ROOMS.info()
+            room_limits = ROOMS.limits_info()
+            if 'DETECTOR' in globals() and globals().get('DETECTOR') is not None:
+                D = globals().get('DETECTOR')
+                det_info = str(type(D))
+                workers = getattr(D, 'process_backend', None)
+                yolo_loaded = bool(getattr(D, 'net', None) is not None or workers is not None)
+                if workers is not None:
+                    try:
+                        process_workers = workers.info()
+                    except Exception:
+                        pass
+                use_cascade = bool(getattr(D, 'use_cascade', False))
+                use_simulated = bool(getattr(D, 'use_simulated', False))
+                # Model variant / input size actually being served
+                try:
+                    if hasattr(D, 'model_info'):
+                        model_info = D.model_info()
+                except Exception:
+                    pass
+                # Micro-batching stats (None when batching is disabled)
+                try:
+                    if hasattr(D, 'batching_info'):
+                        batching = D.batching_info()
+                except Exception:
+                    pass
+                # Frames answered from the previous detections by the change gate
+                try:
+                    if hasattr(D, 'gate_info'):
+                        change_gate = D.gate_info()
+                except Exception:
+                    pass
+                # Keyframes vs tracked frames (None when tracking is off)
+                try:
+                    if hasattr(D, 'tracking_info'):
+                        tracking = D.tracking_info()
+                except Exception:
+                    pass
+                # Input buffer allocations and per-stage timings
+                try:
+                    if hasattr(D, 'preprocess_info'):
+                        preprocess = D.preprocess_info()
+                except Exception:
+                    pass
+            if 'IDENTIFIER' in globals() and globals().get('IDENTIFIER') is not None:
+                id_info = str(type(globals().get('IDENTIFIER')))
+            # Shared YOLO networks and their memory footprint
+            models = None
+            try:
+                from yoloV4.model_registry import get_model_registry
+                models = get_model_registry().memory_usage()
+            except Exception:
+                pass
+            # Results reused for frames seen before (retries, replays)
+            detection_cache = None
+            try:
+                from yoloV4.detection_cache import get_detection_cache
+                detection_cache = get_detection_cache().info()
+            except Exception:
+                pass
+            # Detection failures counted by traceback signature
+            errors = None
+            try:
+                if get_error_recorder is not None:
+                    errors = get_error_recorder().info()
+            except Exception:
+                pass
+            # HTTP server implementation and, for asyncio, its connection/queue counters
+            server = {'impl': CAMERA_SERVER}
+            try:
+                if hasattr(_httpd, 'info'):
+                    server.update(_httpd.info())
+            except Exception:
+                pass
+            # Camera pages streaming over /ws (frames dropped as stale, events pushed)
+            websocket = None
+            try:
+                websocket = STREAM_STATS.info()
+            except Exception:
+                pass
+            # Load behind the capture hints (per-camera hints are in 'rooms')
+            capture_hints = None
+            try:
+                capture_hints = dict(SERVER_LOAD.info(), target_ms=TARGET_LATENCY_MS)
+            except Exception:
+                pass
+            return {
+                'ready': DETECTOR_READY.is_set(),
+                'readiness': DETECTOR_READINESS,
+                'detector': det_info,
+                'identifier': id_info,
+                'yolo_loaded': yolo_loaded,
+                'use_cascade': use_cascade,
+                'use_simulated': use_simulated,
+                'model': model_info,
+                'models': models,
+                'batching': batching,
+                'process_workers': process_workers,
+                'change_gate': change_gate,
+                'tracking': tracking,
+                'preprocess': preprocess,
+                'video_sources': video_sources,
+                'rooms': rooms,
+                'room_limits': room_limits,
+                'detection_cache': detection_cache,
+                'errors': errors,
+                'websocket': websocket,
+                'capture_hints': capture_hints,
+                'server': server
+            }
+
+        def confirm_request(body):
+            """POST /confirm: the operator answered "Is this person ...?" in the camera UI."""
+            try:
+                payload = json.loads(body.decode('utf-8'))
+            except Exception as e:
+                return 400, {'error': 'invalid json', 'details': str(e)}
+            confirmed = bool(payload.get('confirmed'))
+            info = payload.get('info') or {}
+            raw_label = ''
+            if isinstance(info, dict):
+                raw_label = info.get('label') or ''
+            elif isinstance(info, str):
+                raw_label = info
+            logging.getLogger(__name__).info("Identification confirmation received: confirmed=%s info=%s", confirmed, raw_label)
+
+            # Normalize label and strip trailing confidence tokens like ' 86%'
+            name_candidate = raw_label
+            try:
+                if isinstance(name_candidate, str) and name_candidate.startswith('Is this person:'):
+                    name_candidate = name_candidate.replace('Is this person:', '').replace('?', '').strip()
+            except Exception:
+                pass
+            import re as _re
+            if isinstance(name_candidate, str):
+                name_candidate = _re.sub(r"\s+\d+%$", '', name_candidate).strip()
+
+            elder = None
+            if name_candidate:
+                try:
+                    elder = manager.get_elder_by_name(name_candidate)
+                except Exception as _e:
+                    logging.getLogger(__name__).warning("Name lookup failed: %s", _e)
+
+            # Enqueue the confirmation (client may have clicked yes or no).
+            entry = {
+                'client_confirmed': confirmed,
+                'elder_id': elder['elder_id'] if elder else None,
+                'label': name_candidate
+            }
+            try:
+                PENDING_CONFIRMATIONS.put(entry)
+            except Exception as _e:
+                logging.getLogger(__name__).exception("Could not enqueue pending confirmation: %s", _e)
+
+            return 200, {'status': 'ok', 'confirmed': confirmed}
+
+        def stop_request(body, camera_header=None):
+            """POST /stop: the page stopped its camera; finalize that camera's identification."""
+            # Optional {"camera": ...} body: finalize that camera's room only
+            try:
+                stop_payload = json.loads(body.decode('utf-8')) if body else {}
+            except Exception:
+                stop_payload = {}
+            room = camera_room(stop_payload, camera_header)
+            try:
+                room.auto_stop_triggered = True
+                if room is ROOMS.default:
+                    globals()['CAMERA_AUTO_STOP_TRIGGERED'] = True
+                    logging.getLogger(__name__).info("/stop received: set CAMERA_AUTO_STOP_TRIGGERED=True")
+                else:
+                    logging.getLogger(__name__).info("/stop received for camera %s", room.name)
+                candidate = summarize_recent_identifications(
+                    max_entries=room.autostop_n or globals().get('CAMERA_AUTOSTOP_N', 10),
+                    max_age=SUMMARY_MAX_AGE_SECONDS,
+                    room=room,
+                )
+            except Exception:
+                logging.getLogger(__name__).exception("Error summarizing recent identifications during /stop")
+                candidate = None
+
+            if candidate:
+                person_id = candidate.get('person_id')
+                name = candidate.get('name') or candidate.get('label') or 'Unknown'
+                confidence = candidate.get('avg_confidence', 0.0) or candidate.get('confidence', 0.0)
+                support_pct = (candidate.get('support', 0.0) or 0.0) * 100.0
+                logging.getLogger(__name__).info(
+                    "/STOP IDENTIFICATION COMPLETE: %s (ID=%s, SUPPORT=%.0f%%, AVG_CONF=%.1f%%)",
+                    name.upper(),
+                    person_id,
+                    support_pct,
+                    confidence * 100.0,
+                )
+                try:
+                    msg = PROMPTS.get(CURRENT_LANG, PROMPTS.get('en', {})).get('press_enter_to_proceed')
+                    if not msg:
+                        msg = PROMPTS['en'].get('press_enter_to_proceed', 'Press Enter to proceed to the next step...')
+                    print(msg)
+                except Exception:
+                    print('Press Enter to proceed to the next step...')
+                if person_id:
+                    room.last_identified = person_id
+                    globals()['LAST_IDENTIFIED'] = person_id
+                    # Start inactivity monitor for the camera-identified person
+                    try:
+                        start_person_inactivity_monitor(person_id, name, room=room)
+                    except Exception:
+                        logging.getLogger(__name__).exception("Failed to start inactivity monitor for camera ID")
+                globals()['SKIP_PENDING_PROMPT'] = True
+                globals()['SKIP_PENDING_PRINTED'] = False
+            else:
+                logging.getLogger(__name__).info("/stop: no candidate selected")
+            return 200, {'status': 'ok', 'auto_stop': True, 'camera': room.name}
+
+        def analyze_with_hints(img_bytes, room, started, rtt_ms=None):
+            """`analyze_frame`, adding the room's capture ``hints`` to analyzed and busy answers.
+
+            `started` is the perf_counter() when the frame reached the server, so
+            time spent queued counts towards the latency target; `rtt_ms` is the
+            page's round trip for its previous frame (X-Frame-RTT), if it sent one.
+            """
+            SERVER_LOAD.begin()
+            analysis_started = time.perf_counter()
+            status = None
+            try:
+                status, payload = analyze_frame(img_bytes, room)
+            finally:
+                # Only analyzed frames tell how long an analysis takes
+                SERVER_LOAD.end((time.perf_counter() - analysis_started) * 1000.0 if status == 200 else None)
+            if status == 200:
+                hints = room.hints.observe((time.perf_counter() - started) * 1000.0, rtt_ms)
+            elif status == 503:
+                hints = room.hints.back_off()
+            else:
+                return status, payload
+            return status, dict(payload, hints=hints)
+
+        def frame_rtt(value):
+            # X-Frame-RTT header: milliseconds, or None when missing or malformed
+            try:
+                return float(value) if value else None
+            except ValueError:
+                return None
+
+        def detect_request(content_type, body, camera_header=None, coalesce=CAMERA_COALESCE,
+                           received_at=None, rtt_header=None):
+            """POST /detect: one frame as a raw image, multipart form or JSON data URL.
+
+            With `coalesce`, frames of one camera wait in its room's mailbox and only
+            the newest waiting one is analyzed (the asyncio server coalesces on its
+            loop instead and passes False). Answers carry the camera's capture hints.
+            """
+            if received_at is None:
+                received_at = time.perf_counter()
+            # Until the detector is loaded and warmed up, ask the client to retry
+            if not DETECTOR_READY.is_set():
+                return 503, {'error': 'warming up', 'readiness': DETECTOR_READINESS}
+            try:
+                img_bytes, payload = parse_detect_upload(content_type, body)
+            except UploadError as e:
+                return 400, e.response()
+            # Each camera has its own identification window and auto-stop
+            room = camera_room(payload, camera_header)
+            room.record_frame()
+            rtt_ms = frame_rtt(rtt_header)
+            if not coalesce:
+                return analyze_with_hints(img_bytes, room, received_at, rtt_ms)
+            if not room.mailbox.enter():
+                # A newer frame from this camera arrived while this one waited: skip it
+                return 200, {'superseded': True, 'camera': room.name, 'hints': room.hints.superseded()}
+            try:
+                return analyze_with_hints(img_bytes, room, received_at, rtt_ms)
+            finally:
+                room.mailbox.leave()
+
+        def stream_room(query, camera_header=None):
+            # GET /ws?camera=<id>
+            return ROOMS.get((query.get('camera') or [None])[0] or camera_header)
+
+        def serve_stream(room, rfile, sock):
+            """Run an upgraded /ws connection for `room` until it closes."""
+            logging.getLogger(__name__).info("WebSocket stream opened for camera %s", room.name)
+
+            def ready():
+                return True if DETECTOR_READY.is_set() else DETECTOR_READINESS
+
+            def analyze(img_bytes, room):
+                # A stream frame waits at most one analysis in its slot; time the analysis itself
+                return analyze_with_hints(img_bytes, room, time.perf_counter())
+
+            CameraStream(sock, rfile, room, analyze, ready=ready).serve()
+            logging.getLogger(__name__).info("WebSocket stream closed for camera %s", room.name)
+
+        # HTTP handler for the camera UI. It accepts POST /detect with a raw JPEG, a multipart
+        # form or a base64 JSON payload (see camera_upload.py).
         class CameraRequestHandler(http.server.SimpleHTTPRequestHandler):
             def _set_json_headers(self, code=200):
                 self.send_response(code)
@@ -1203,37 +2005,48 @@ def main():
                 self.send_header('Access-Control-Allow-Origin', '*')
                 self.end_headers()
 
+            def _send_retry_later(self, payload):
+                # 503 + Retry-After: the server is healthy but cannot take this frame now
+                self.send_response(503)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Access-Control-Allow-Origin', '*')
+                self.send_header('Retry-After', str(DETECT_RETRY_AFTER))
+                self.end_headers()
+                payload = dict(payload, retry_after=DETECT_RETRY_AFTER)
+                self.wfile.write(json.dumps(payload).encode('utf-8'))
+
+            def _send_json(self, status, payload):
+                if status == 503:
+                    self._send_retry_later(payload)
+                    return
+                self._set_json_headers(status)
+                self.wfile.write(json.dumps(payload).encode('utf-8'))
+
             def do_OPTIONS(self):
                 self.send_response(200)
                 self.send_header('Access-Control-Allow-Origin', '*')
                 self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
-                self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+                self.send_header('Access-Control-Allow-Headers', 'Content-Type, X-Camera, X-Frame-RTT')
                 self.end_headers()
 
             def do_GET(self):
+                if self.path.split('?', 1)[0] == '/ws':
+                    headers = handshake_headers(self.headers)
+                    if headers is None:
+                        self._send_json(400, {'error': 'websocket upgrade required'})
+                        return
+                    self.send_response(101, 'Switching Protocols')
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.end_headers()
+                    self.close_connection = True
+                    query = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+                    serve_stream(stream_room(query, self.headers.get('X-Camera')), self.rfile, self.connection)
+                    return
                 # Provide a simple status endpoint the camera page can poll
                 if self.path.startswith('/status'):
                     try:
-                        det_info = None
-                        id_info = None
-                        yolo_loaded = False
-                        use_cascade = False
-                        use_simulated = False
-                        if 'DETECTOR' in globals() and globals().get('DETECTOR') is not None:
-                            D = globals().get('DETECTOR')
-                            det_info = str(type(D))
-                            yolo_loaded = bool(getattr(D, 'net', None) is not None)
-                            use_cascade = bool(getattr(D, 'use_cascade', False))
-                            use_simulated = bool(getattr(D, 'use_simulated', False))
-                        if 'IDENTIFIER' in globals() and globals().get('IDENTIFIER') is not None:
-                            id_info = str(type(globals().get('IDENTIFIER')))
-                        payload = {
-                            'detector': det_info,
-                            'identifier': id_info,
-                            'yolo_loaded': yolo_loaded,
-                            'use_cascade': use_cascade,
-                            'use_simulated': use_simulated
-                        }
+                        payload = status_payload()
                         self._set_json_headers(200)
                         self.wfile.write(json.dumps(payload).encode('utf-8'))
                         return
@@ -1255,101 +2068,14 @@ def main():
                     # Support a confirmation endpoint used by the Camera UI
                     if self.path == '/confirm':
                         length = int(self.headers.get('Content-Length', 0))
-                        body = self.rfile.read(length)
-                        try:
-                            payload = json.loads(body.decode('utf-8'))
-                        except Exception as e:
-                            self._set_json_headers(400)
-                            self.wfile.write(json.dumps({'error': 'invalid json', 'details': str(e)}).encode('utf-8'))
-                            return
-                        confirmed = bool(payload.get('confirmed'))
-                        info = payload.get('info') or {}
-                        raw_label = ''
-                        if isinstance(info, dict):
-                            raw_label = info.get('label') or ''
-                        elif isinstance(info, str):
-                            raw_label = info
-                        logging.getLogger(__name__).info("Identification confirmation received: confirmed=%s info=%s", confirmed, raw_label)
-
-                        # Normalize label and strip trailing confidence tokens like ' 86%'
-                        name_candidate = raw_label
-                        try:
-                            if isinstance(name_candidate, str) and name_candidate.startswith('Is this person:'):
-                                name_candidate = name_candidate.replace('Is this person:', '').replace('?', '').strip()
-                        except Exception:
-                            pass
-                        import re as _re
-                        if isinstance(name_candidate, str):
-                            name_candidate = _re.sub(r"\s+\d+%$", '', name_candidate).strip()
-
-                        elder = None
-                        if name_candidate:
-                            try:
-                                elder = manager.get_elder_by_name(name_candidate)
-                            except Exception as _e:
-                                logging.getLogger(__name__).warning("Name lookup failed: %s", _e)
-
-                        # Enqueue the confirmation (client may have clicked yes or no).
-                        entry = {
-                            'client_confirmed': confirmed,
-                            'elder_id': elder['elder_id'] if elder else None,
-                            'label': name_candidate
-                        }
-                        try:
-                            PENDING_CONFIRMATIONS.put(entry)
-                        except Exception as _e:
-                            logging.getLogger(__name__).exception("Could not enqueue pending confirmation: %s", _e)
-
-                        self._set_json_headers(200)
-                        self.wfile.write(json.dumps({'status': 'ok', 'confirmed': confirmed}).encode('utf-8'))
+                        self._send_json(*confirm_request(self.rfile.read(length)))
                         return
 
                     # Support a stop endpoint so the web UI can request the server
                     # to finalize analysis and stop the camera cleanly.
                     if self.path == '/stop':
-                        try:
-                            globals()['CAMERA_AUTO_STOP_TRIGGERED'] = True
-                            logging.getLogger(__name__).info("/stop received: set CAMERA_AUTO_STOP_TRIGGERED=True")
-                            candidate = summarize_recent_identifications(
-                                max_entries=globals().get('CAMERA_AUTOSTOP_N', 10),
-                                max_age=SUMMARY_MAX_AGE_SECONDS,
-                            )
-                        except Exception:
-                            logging.getLogger(__name__).exception("Error summarizing recent identifications during /stop")
-                            candidate = None
-
-                        if candidate:
-                            person_id = candidate.get('person_id')
-                            name = candidate.get('name') or candidate.get('label') or 'Unknown'
-                            confidence = candidate.get('avg_confidence', 0.0) or candidate.get('confidence', 0.0)
-                            support_pct = (candidate.get('support', 0.0) or 0.0) * 100.0
-                            logging.getLogger(__name__).info(
-                                "/STOP IDENTIFICATION COMPLETE: %s (ID=%s, SUPPORT=%.0f%%, AVG_CONF=%.1f%%)",
-                                name.upper(),
-                                person_id,
-                                support_pct,
-                                confidence * 100.0,
-                            )
-                            try:
-                                msg = PROMPTS.get(CURRENT_LANG, PROMPTS.get('en', {})).get('press_enter_to_proceed')
-                                if not msg:
-                                    msg = PROMPTS['en'].get('press_enter_to_proceed', 'Press Enter to proceed to the next step...')
-                                print(msg)
-                            except Exception:
-                                print('Press Enter to proceed to the next step...')
-                            if person_id:
-                                globals()['LAST_IDENTIFIED'] = person_id
-                                # Start inactivity monitor for the camera-identified person
-                                try:
-                                    start_person_inactivity_monitor(person_id, name)
-                                except Exception:
-                                    logging.getLogger(__name__).exception("Failed to start inactivity monitor for camera ID")
-                            globals()['SKIP_PENDING_PROMPT'] = True
-                            globals()['SKIP_PENDING_PRINTED'] = False
-                        else:
-                            logging.getLogger(__name__).info("/stop: no candidate selected")
-                        self._set_json_headers(200)
-                        self.wfile.write(json.dumps({'status': 'ok', 'auto_stop': True}).encode('utf-8'))
+                        length = int(self.headers.get('Content-Length', 0) or 0)
+                        self._send_json(*stop_request(self.rfile.read(length) if length else b'', self.headers.get('X-Camera')))
                         return
 
                     if self.path != '/detect':
@@ -1365,429 +2091,12 @@ def main():
                                 pass
                         return
 
-                    # Read and parse the JSON request body for /detect
+                    # Read the /detect body: a raw image, a multipart form or the JSON data URL
                     length = int(self.headers.get('Content-Length', 0))
                     body = self.rfile.read(length)
-                    try:
-                        payload = json.loads(body.decode('utf-8'))
-                        data_url = payload.get('image')
-                    except Exception as e:
-                        self._set_json_headers(400)
-                        self.wfile.write(json.dumps({'error': 'invalid json', 'details': str(e)}).encode('utf-8'))
-                        return
-
-                    if not data_url or not data_url.startswith('data:'):
-                        self._set_json_headers(400)
-                        self.wfile.write(json.dumps({'error': 'missing image data'}).encode('utf-8'))
-                        return
 
-                    # Decode the data URL payload into raw image bytes
-                    header, b64 = data_url.split(',', 1)
-                    try:
-                        img_bytes = base64.b64decode(b64)
-                    except Exception as e:
-                        self._set_json_headers(400)
-                        self.wfile.write(json.dumps({'error': 'bad base64', 'details': str(e)}).encode('utf-8'))
-                        return
-
-                    # Save the image bytes to a temporary JPEG file on disk
-                    tmp_name = str(root / "frame_{}.jpg".format(uuid.uuid4().hex))
-                    try:
-                        with open(tmp_name, 'wb') as f:
-                            f.write(img_bytes)
-                    except Exception as e:
-                        self._set_json_headers(500)
-                        self.wfile.write(json.dumps({'error': 'could not save file', 'details': str(e)}).encode('utf-8'))
-                        return
-
-                    # Adjust brightness if the image is too dark to improve detection
-                    def adjust_image_brightness(path: str, target_mean: float = 120.0, max_factor: float = 2.0) -> bool:
-                        """Try to increase brightness of image at `path`.
-
-                        Uses OpenCV+NumPy when available; falls back to Pillow when not.
-                        This implementation reads raw bytes and decodes them to avoid
-                        issues with `np.fromfile` and ensures a NumPy array is passed
-                        to OpenCV functions so cv2._InputArray assertions won't fail.
-                        """
-                        try:
-                            if _cv2 is not None and _np is not None:
-                                # Read bytes reliably (works with unicode paths)
-                                try:
-                                    with open(path, 'rb') as _f:
-                                        img_bytes = _f.read()
-                                except Exception:
-                                    return False
-                                if not img_bytes:
-                                    return False
-                                arr = _np.frombuffer(img_bytes, dtype=_np.uint8)
-                                img = _cv2.imdecode(arr, _cv2.IMREAD_COLOR)
-                                if img is None or not isinstance(img, _np.ndarray):
-                                    return False
-                                # Ensure image has at least 2 dims
-                                if img.ndim < 2:
-                                    return False
-                                # If image is grayscale (H,W), convert to BGR first
-                                if img.ndim == 2:
-                                    gray = img
-                                else:
-                                    try:
-                                        gray = _cv2.cvtColor(img, _cv2.COLOR_BGR2GRAY)
-                                    except Exception:
-                                        # Defensive: convert array to uint8 and retry
-                                        try:
-                                            img = img.astype(_np.uint8, copy=False)
-                                            gray = _cv2.cvtColor(img, _cv2.COLOR_BGR2GRAY)
-                                        except Exception:
-                                            return False
-                                mean = float(_np.mean(gray))
-                                if mean <= 0:
-                                    return False
-                                if mean < target_mean:
-                                    factor = min(max_factor, target_mean / mean)
-                                    adjusted = _cv2.convertScaleAbs(img, alpha=factor, beta=0)
-                                    ok, buf = _cv2.imencode('.jpg', adjusted)
-                                    if ok:
-                                        with open(path, 'wb') as _f:
-                                            _f.write(buf.tobytes())
-                                        return True
-                                return False
-                            else:
-                                # Pillow fallback (lazy import)
-                                try:
-                                    import importlib, importlib.util
-                                    if importlib.util.find_spec('PIL') is None:
-                                        return False
-                                    PIL_Image = importlib.import_module('PIL.Image')
-                                    PIL_ImageEnhance = importlib.import_module('PIL.ImageEnhance')
-                                except Exception:
-                                    return False
-                                try:
-                                    img = PIL_Image.open(path)
-                                    gray = img.convert('L')
-                                    if _np is not None:
-                                        mean = float(_np.array(gray).mean())
-                                    else:
-                                        mean = float(sum(gray.getdata()) / (gray.width * gray.height))
-                                    if mean <= 0:
-                                        return False
-                                    if mean < target_mean:
-                                        factor = min(max_factor, target_mean / mean)
-                                        enhancer = PIL_ImageEnhance.Brightness(img)
-                                        adjusted = enhancer.enhance(factor)
-                                        adjusted.save(path, format='JPEG')
-                                        return True
-                                except Exception:
-                                    return False
-                                return False
-                        except Exception:
-                            logging.getLogger(__name__).exception('Brightness adjustment failed')
-                            return False
-
-                    try:
-                        adjust_image_brightness(tmp_name)
-                    except Exception:
-                        pass
-
-                    # Run the detector. Prefer a method that returns person boxes if available.
-                    try:
-                        if hasattr(DETECTOR, 'detect_persons_in_image'):
-                            try:
-                                raw = DETECTOR.detect_persons_in_image(tmp_name)
-                            except Exception as _inner_e:
-                                # If DETECTOR fails, attempt IDENTIFIER as a fallback
-                                logging.getLogger(__name__).warning('DETECTOR failed: %s - trying IDENTIFIER fallback', _inner_e)
-                                raw = None
-                                if IDENTIFIER is not None and hasattr(IDENTIFIER, 'detect_and_identify'):
-                                    try:
-                                        id_results = IDENTIFIER.detect_and_identify(tmp_name)
-                                        # Map identifier results into the `raw` format expected below
-                                        raw = []
-                                        if isinstance(id_results, list):
-                                            for it in id_results:
-                                                # tag fields to match expected shape
-                                                raw.append({'class': 'person', 'confidence': it.get('detection_confidence') or it.get('confidence') or 0.0, 'box': [0,0,0,0], 'person_id': it.get('person_id'), 'person_name': it.get('person_name')})
-                                        elif isinstance(id_results, dict):
-                                            for it in id_results.get('identified_persons', []):
-                                                raw.append({'class': 'person', 'confidence': it.get('detection_confidence') or it.get('confidence') or 0.0, 'box': [0,0,0,0], 'person_id': it.get('person_id'), 'person_name': it.get('person_name')})
-                                    except Exception:
-                                        raw = None
-
-                            # Expect `raw` to be a list of detections like {'class','confidence','box':[x,y,w,h]}
-                            objects = []
-                            if raw:
-                                for item in raw:
-                                    box = None
-                                    if isinstance(item, dict):
-                                        box = item.get('box') or item.get('bbox')
-                                    if box and len(box) >= 4:
-                                        x, y, w, h = box[0], box[1], box[2], box[3]
-                                    else:
-                                        x = item.get('x', 0) if isinstance(item, dict) else 0
-                                        y = item.get('y', 0) if isinstance(item, dict) else 0
-                                        w = item.get('width', 0) if isinstance(item, dict) else 0
-                                        h = item.get('height', 0) if isinstance(item, dict) else 0
-                                    objects.append({
-                                        'class': (item.get('class') if isinstance(item, dict) else 'person') or 'person',
-                                        'confidence': float(item.get('confidence', 0) if isinstance(item, dict) else 0),
-                                        'x': int(x), 'y': int(y), 'width': int(w), 'height': int(h)
-                                    })
-                            results = {'image_path': tmp_name, 'objects': objects, 'count': len(objects)}
-                        else:
-                            # If the detector only provides a generic `detect` method, use that form instead
-                            results = DETECTOR.detect(tmp_name)
-                            # ensure results contains 'objects' list
-                            if 'objects' not in results and isinstance(results, list):
-                                results = {'image_path': tmp_name, 'objects': results, 'count': len(results)}
-                    except Exception as e:
-                        import traceback as _tb
-                        tb = _tb.format_exc()
-                        logging.getLogger(__name__).exception('Detection error: %s', e)
-                        # Also write traceback to a local debug file for inspection
-                        try:
-                            with open(str(root / 'detect_error.log'), 'a', encoding='utf-8') as _f:
-                                _f.write('\n--- DETECT ERROR ---\n')
-                                _f.write(tb)
-                        except Exception:
-                            pass
-                        try:
-                            self._set_json_headers(500)
-                            self.wfile.write(json.dumps({'error': 'detection failed', 'details': str(e), 'traceback': tb}).encode('utf-8'))
-                        except Exception:
-                            try:
-                                self.send_response(500)
-                                self.end_headers()
-                                try:
-                                    self.wfile.write(tb.encode('utf-8'))
-                                except Exception:
-                                    pass
-                            except Exception:
-                                pass
-                        # cleanup tmp
-                        try:
-                            os.remove(tmp_name)
-                        except Exception:
-                            pass
-                        return
-
-                    # If an identifier object is available, try to map detected boxes to known persons
-                    identified = []
-                    summary_payload = None
-                    try:
-                        if IDENTIFIER is not None and hasattr(IDENTIFIER, 'detect_and_identify'):
-                            id_results = IDENTIFIER.detect_and_identify(tmp_name)
-                            # YOLOv4withML returns dict with 'identified_persons' or YOLOv4MedicationDetector returns list
-                            if isinstance(id_results, dict):
-                                identified = id_results.get('identified_persons', [])
-                            elif isinstance(id_results, list):
-                                identified = id_results
-                    except Exception as _e:
-                        logging.getLogger(__name__).warning("Identification failed: %s", _e)
-
-                    # If identification data was returned, annotate detection objects with friendly labels
-                    if identified:
-                        # Build a mapping from person id to a readable label (e.g. "person1 (Name)")
-                        mapping = {}
-                        for i, item in enumerate(identified, start=1):
-                            pid = None
-                            person_name = None
-                            if isinstance(item, dict):
-                                pid = item.get('person_id') or item.get('person_id')
-                                person_name = item.get('person_name') or item.get('person_name')
-                                if not person_name and 'database_info' in item and isinstance(item['database_info'], dict):
-                                    person_name = item['database_info'].get('name')
-                            if pid is None:
-                                pid = i
-                            if person_name:
-                                mapping[pid] = "person{} ({})".format(pid, person_name)
-                            else:
-                                mapping[pid] = "person{}".format(pid)
-
-                        for idx, obj in enumerate(results.get('objects', []), start=1):
-                            if obj.get('class') == 'person' or str(obj.get('class')).lower().startswith('person'):
-                                label = mapping.get(idx, "person{}".format(idx))
-                                obj['class'] = label
-
-                        # Conservative fall-detection hook: if the detector exposes a
-                        # `detect_fall` (or `detect_fallen_posture`) method, call it
-                        # with the temporary image. If a fall is detected, trigger a
-                        # panic alert in a background thread. This is opt-in and
-                        # requires the detector implementation to provide the method.
-                        try:
-                            fallen = False
-                            D = globals().get('DETECTOR')
-                            if D is not None:
-                                if hasattr(D, 'detect_fall') and callable(getattr(D, 'detect_fall')):
-                                    try:
-                                        fallen = bool(D.detect_fall(tmp_name))
-                                    except Exception as _e:
-                                        logging.getLogger(__name__).warning('Fall detection failed: %s', _e)
-                                elif hasattr(D, 'detect_fallen_posture') and callable(getattr(D, 'detect_fallen_posture')):
-                                    try:
-                                        fallen = bool(D.detect_fallen_posture(tmp_name))
-                                    except Exception as _e:
-                                        logging.getLogger(__name__).warning('Fall posture detection failed: %s', _e)
-                            if fallen:
-                                # Try to determine an elder id for the alert (prefer identified results)
-                                elder_for_alert = None
-                                try:
-                                    if isinstance(identified, list) and len(identified) > 0:
-                                        first = identified[0]
-                                        if isinstance(first, dict):
-                                            elder_for_alert = first.get('person_id') or first.get('elder_id')
-                                except Exception:
-                                    elder_for_alert = None
-                                if not elder_for_alert:
-                                    elder_for_alert = globals().get('LAST_IDENTIFIED')
-                                try:
-                                    threading.Thread(target=send_panic_alert, args=(elder_for_alert, 'Fall detected by camera'), daemon=True).start()
-                                    logging.getLogger(__name__).warning('Fall detected; panic alert dispatched for elder=%s', elder_for_alert)
-                                except Exception:
-                                    logging.getLogger(__name__).exception('Failed to dispatch panic alert for fall')
-                        except Exception:
-                            logging.getLogger(__name__).exception('Error in fall-detection hook')
-
-                        leading_candidate = None
-                        cur = 0
-                        try:
-                            with RECENT_IDENTIFICATIONS_LOCK:
-                                for item in identified:
-                                    conf = None
-                                    name = None
-                                    pid = None
-                                    if isinstance(item, dict):
-                                        conf = item.get('confidence') or item.get('detection_confidence') or item.get('score')
-                                        name = item.get('person_name') or item.get('person') or item.get('name')
-                                        pid = item.get('person_id') or item.get('elder_id')
-                                    else:
-                                        name = str(item)
-                                    conf = _normalize_confidence(conf)
-                                    RECENT_IDENTIFICATIONS.append({'person_id': pid, 'name': name, 'confidence': conf, 'ts': time.time()})
-                                    if len(RECENT_IDENTIFICATIONS) > RECENT_MAX:
-                                        RECENT_IDENTIFICATIONS.pop(0)
-                        except Exception:
-                            pass
-
-                        try:
-                            with CAMERA_SHOT_LOCK:
-                                globals()['CAMERA_SHOT_COUNTER'] = globals().get('CAMERA_SHOT_COUNTER', 0) + 1
-                                cur = globals().get('CAMERA_SHOT_COUNTER', 0)
-                            logging.getLogger(__name__).debug("Camera shot %d/%d", cur, globals().get('CAMERA_AUTOSTOP_N', 10))
-                        except Exception:
-                            cur = 0
-
-                        try:
-                            leading_candidate = summarize_recent_identifications(
-                                max_entries=globals().get('CAMERA_AUTOSTOP_N', 10),
-                                max_age=SUMMARY_MAX_AGE_SECONDS,
-                            )
-                        except Exception:
-                            leading_candidate = None
-
-                        if leading_candidate:
-                            summary_payload = dict(leading_candidate)
-                            summary_payload['support_percent'] = round(summary_payload.get('support', 0.0) * 100.0, 1)
-                            summary_payload['avg_confidence_percent'] = round(summary_payload.get('avg_confidence', 0.0) * 100.0, 1)
-                            summary_key = (summary_payload.get('person_id'), summary_payload.get('name'))
-                            now_summary = time.time()
-                            try:
-                                if (
-                                    summary_key != globals().get('LAST_CONFIRMATION_KEY')
-                                    or (now_summary - globals().get('LAST_CONFIRMATION_TS', 0.0)) >= CONFIRMATION_REPEAT_SECONDS
-                                ):
-                                    entry = {
-                                        'client_confirmed': False,
-                                        'elder_id': summary_payload.get('person_id'),
-                                        'name': summary_payload.get('name'),
-                                        'label': summary_payload.get('name'),
-                                        'confidence': summary_payload.get('avg_confidence'),
-                                        'count': summary_payload.get('count'),
-                                        'support': summary_payload.get('support'),
-                                    }
-                                    PENDING_CONFIRMATIONS.put_nowait(entry)
-                                    globals()['LAST_CONFIRMATION_KEY'] = summary_key
-                                    globals()['LAST_CONFIRMATION_TS'] = now_summary
-                            except Exception:
-                                pass
-
-                            logging.getLogger(__name__).info(
-                                "[SUMMARY] IDENTIFICATION COMPLETE: %s -- SUPPORT %.0f%%, AVG_CONF %.1f%% ACROSS %d SAMPLES",
-                                (summary_payload.get('name') or 'Unknown').upper(),
-                                summary_payload.get('support_percent', 0.0),
-                                summary_payload.get('avg_confidence_percent', 0.0),
-                                summary_payload.get('total_samples', 0),
-                            )
-                            try:
-                                msg = PROMPTS.get(CURRENT_LANG, PROMPTS.get('en', {})).get('press_enter_to_proceed')
-                                if not msg:
-                                    msg = PROMPTS['en'].get('press_enter_to_proceed', 'Press Enter to proceed to the next step...')
-                                print(msg)
-                            except Exception:
-                                print('Press Enter to proceed to the next step...')
-                        else:
-                            summary_payload = None
-                            try:
-                                first = identified[0]
-                                pid = first.get('person_id') if isinstance(first, dict) else None
-                                name = first.get('person_name') if isinstance(first, dict) else str(first)
-                                entry = {'client_confirmed': False, 'elder_id': pid, 'name': name, 'label': name}
-                                PENDING_CONFIRMATIONS.put_nowait(entry)
-                            except Exception:
-                                pass
-
-                        try:
-                            if cur >= globals().get('CAMERA_AUTOSTOP_N', 10) and not globals().get('CAMERA_AUTO_STOP_TRIGGERED'):
-                                globals()['CAMERA_AUTO_STOP_TRIGGERED'] = True
-                                best = leading_candidate or summarize_recent_identifications(
-                                    max_entries=globals().get('CAMERA_AUTOSTOP_N', 10),
-                                    max_age=SUMMARY_MAX_AGE_SECONDS,
-                                )
-                                if best:
-                                    person_id = best.get('person_id')
-                                    name = best.get('name') or 'Unknown'
-                                    confidence = best.get('avg_confidence', 0.0)
-                                    support_pct = (best.get('support', 0.0) or 0.0) * 100.0
-                                    logging.getLogger(__name__).info(
-                                        "AUTO-STOP IDENTIFICATION COMPLETE AFTER %d SHOTS: %s -- SUPPORT %.0f%%, AVG_CONF %.1f%%",
-                                        cur,
-                                        name.upper(),
-                                        support_pct,
-                                        confidence * 100.0,
-                                    )
-                                    try:
-                                        msg = PROMPTS.get(CURRENT_LANG, PROMPTS.get('en', {})).get('press_enter_to_proceed')
-                                        if not msg:
-                                            msg = PROMPTS['en'].get('press_enter_to_proceed', 'Press Enter to proceed to the next step...')
-                                        print(msg)
-                                    except Exception:
-                                        print('Press Enter to proceed to the next step...')
-                                    if person_id:
-                                        globals()['LAST_IDENTIFIED'] = person_id
-                                        # Start inactivity monitor for the auto-stop identified person
-                                        try:
-                                            start_person_inactivity_monitor(person_id, name)
-                                        except Exception:
-                                            logging.getLogger(__name__).exception("Failed to start inactivity monitor for auto-stop ID")
-                                    globals()['SKIP_PENDING_PROMPT'] = True
-                                    globals()['SKIP_PENDING_PRINTED'] = False
-                                else:
-                                    logging.getLogger(__name__).info("Auto-stop: no candidate selected after %d shots", cur)
-                        except Exception:
-                            logging.getLogger(__name__).exception("Error selecting candidate during auto-stop")
-
-                    # Remove the temporary file to avoid filling up disk space
-                    try:
-                        os.remove(tmp_name)
-                    except Exception:
-                        pass
-
-                    # respond with detections and any identified meta
-                    try:
-                        logging.getLogger(__name__).info("/detect -> detections=%d identified=%d", len(results.get('objects', [])) if isinstance(results, dict) else 0, len(identified) if identified else 0)
-                    except Exception:
-                        pass
-                    payload = {'detections': results, 'identified': identified}
-                    self._set_json_headers(200)
-                    self.wfile.write(json.dumps(payload).encode('utf-8'))
+                    self._send_json(*detect_request(self.headers.get('Content-Type', ''), body, self.headers.get('X-Camera'),
+                                                    rtt_header=self.headers.get('X-Frame-RTT')))
                 except Exception:
                     logging.getLogger(__name__).exception("Unhandled exception in do_POST handler")
                     import traceback as _tb
@@ -1806,12 +2115,58 @@ def main():
                         except Exception:
                             pass
 
-        handler = functools.partial(CameraRequestHandler, directory=str(root))
+        if CAMERA_SERVER == 'threading':
+            handler = functools.partial(CameraRequestHandler, directory=str(root))
+
+            def make_server(address):
+                return http.server.ThreadingHTTPServer(address, handler)
+        else:
+            def request_camera(request):
+                # Camera named outside the body: X-Camera header or /detect?camera=
+                return request.headers.get('X-Camera') or (request.query.get('camera') or [None])[0]
+
+            def detect_route(request):
+                # Posts the loop did not coalesce (camera only in the body) use the room's mailbox
+                # once the body is parsed, here on the executor
+                return detect_request(request.headers.get('Content-Type', ''), request.body,
+                                      request_camera(request),
+                                      coalesce=CAMERA_COALESCE and request.coalesce_key is None,
+                                      received_at=request.received_at, rtt_header=request.headers.get('X-Frame-RTT'))
+
+            def detect_client(request):
+                # Coalescing key of a /detect post, from headers only (this runs on the loop).
+                # A raw image cannot name its camera in the body, so without a header it is
+                # the default room's; JSON and multipart posts without one are keyed later.
+                camera = request_camera(request)
+                if camera:
+                    return ROOMS.get(camera).name
+                if media_type(request.headers.get('Content-Type', '')) in IMAGE_TYPES:
+                    return ROOMS.default.name
+                return None
+
+            def detect_refused(request, payload):
+                # Superseded or refused on the loop: this camera sends faster than it is served
+                hints = ROOMS.get(payload.get('camera') or request_camera(request)).hints
+                return dict(payload, hints=hints.superseded() if payload.get('superseded') else hints.back_off())
+
+            def stream_route(request, rfile, sock):
+                serve_stream(stream_room(request.query, request.headers.get('X-Camera')), rfile, sock)
+
+            def make_server(address):
+                # Keep-alive, request limits and a bounded inference executor (camera_aioserver.py)
+                server = AsyncCameraServer(address, static_root=root, retry_after=DETECT_RETRY_AFTER)
+                server.route('GET', '/status', lambda request: (200, status_payload()))
+                server.route('POST', '/confirm', lambda request: confirm_request(request.body))
+                server.route('POST', '/stop', lambda request: stop_request(request.body, request.headers.get('X-Camera')))
+                server.route('POST', '/detect', detect_route, inference=True,
+                             coalesce=detect_client if CAMERA_COALESCE else None, on_refused=detect_refused)
+                server.upgrade('/ws', lambda request: handshake_headers(request.headers), stream_route)
+                return server
         try:
-            httpd = http.server.ThreadingHTTPServer(("127.0.0.1", port), handler)
+            httpd = make_server(("127.0.0.1", port))
         except Exception:
             # If binding to localhost fails, bind to all interfaces as a fallback
-            httpd = http.server.ThreadingHTTPServer(("", port), handler)
+            httpd = make_server(("", port))
 
         def serve():
             # Run the HTTP server loop; allow it to exit silently if the thread is stopped
@@ -1827,15 +2182,15 @@ def main():
         logging.getLogger(__name__).info("Camera server build: %s", SERVER_BUILD_ID)
         # Give the server a short moment to start before opening the browser
         time.sleep(0.2)
-        # Reset camera shot counter and auto-stop trigger for this session
+        # Reset every room's shot counter and auto-stop trigger for this session
         try:
-            globals()['CAMERA_SHOT_COUNTER'] = 0
+            ROOMS.reset()
             globals()['CAMERA_AUTO_STOP_TRIGGERED'] = False
             globals()['SKIP_PENDING_PROMPT'] = False
             globals()['SKIP_PENDING_PRINTED'] = False
         except Exception:
             pass
-        url = "http://127.0.0.1:{}/Camera.html?autocamera=1".format(port) #The port no. here is assumed as 8000
+        url = "http://127.0.0.1:{}/Camera.html?autocamera=1".format(port)  # CAMERA_PORT, 8000 by default
         print("[OK] Camera server started at {}".format(url))
         webbrowser.open(url)
 
@@ -1870,6 +2225,7 @@ def main():
         # Clear local server references immediately so prompt is responsive
         _httpd = None
         _server_thread = None
+        stop_video_sources()
         print("[OK] Camera server stopped (shutdown in background)")
 
         # When the camera is stopped by the operator, pick the highest-confidence
@@ -1978,7 +2334,7 @@ def main():
                 cmd = ''
             # Record that some input activity occurred (even if empty newline)
             try:
-                globals()['LAST_INPUT_TS'] = time.time()
+                reset_inactivity_timer()
             except Exception:
                 pass
             if cmd is None:
@@ -2124,32 +2480,10 @@ def main():
                 continue
             elif cmd == "camera":
                 try:
-                    # Try to pre-instantiate YOLOv4 detector/identifier so recognition
-                    # is available immediately when the camera starts. This makes
-                    # failures visible here rather than later in the HTTP handler.
-                    try:
-                        if globals().get('DETECTOR') is None or globals().get('IDENTIFIER') is None:
-                            from yoloV4.yolov4_detector import YOLOv4PersonDetector, YOLOv4MedicationDetector, setup_yolov4_config, download_yolov4_weights
-                            # Ensure config files exist and try to download weights if missing
-                            try:
-                                setup_yolov4_config()
-                            except Exception as _e:
-                                print("[YOLOV4] setup config failed: {}".format(_e))
-                            weights_path = os.path.join(str(Path(__file__).parent.resolve()), 'yoloV4', 'yolov4.weights')
-                            if not os.path.exists(weights_path):
-                                print('[YOLOV4] Weights appear missing; downloading now (this may take several minutes)...')
-                                try:
-                                    download_yolov4_weights()
-                                except Exception as _e:
-                                    print("[YOLOV4] Auto-download failed: {}".format(_e))
-
-                            # create detector and identifier (identifier may create its own detector)
-                            globals()['DETECTOR'] = globals().get('DETECTOR') or YOLOv4PersonDetector()
-                            globals()['IDENTIFIER'] = globals().get('IDENTIFIER') or YOLOv4MedicationDetector()
-                            logging.getLogger(__name__).info("Pre-instantiated DETECTOR=%s IDENTIFIER=%s", type(globals().get('DETECTOR')), type(globals().get('IDENTIFIER')))
-                    except Exception as _e:
-                        print("[WARN] Could not pre-instantiate YOLOv4 detector/identifier: {}".format(_e))
-                    start_camera_server(port=8000)
+                    # The detector/identifier are loaded and warmed up in the background by
+                    # start_camera_server; /status reports progress and /detect answers 503
+                    # until they are ready.
+                    start_camera_server(port=CAMERA_PORT)
                 except Exception as e:
                     print("[ERROR] Could not start camera server: {}".format(e))
                 continue
@@ -2189,6 +2523,20 @@ def main():
                 except Exception as _e:
                     print('[ERROR] YOLO helpers not available: {}'.format(_e))
                 continue
+            elif cmd == 'unloadyolo':
+                # Free the shared YOLO network(s); the next `camera` command reloads them
+                if _httpd is not None:
+                    print('[INFO] Stop the camera server first (stopcamera).')
+                    continue
+                try:
+                    from yoloV4.model_registry import get_model_registry
+                    count = get_model_registry().unload()
+                    globals()['DETECTOR'] = None
+                    globals()['IDENTIFIER'] = None
+                    print('[YOLOV4] Unloaded {} model(s).'.format(count))
+                except Exception as _e:
+                    print('[ERROR] Could not unload YOLO models: {}'.format(_e))
+                continue
             elif cmd == 'process':
                 # Process one pending confirmation (if any) — prompts the operator
                 if PENDING_CONFIRMATIONS.empty():
@@ -0,0 +1,489 @@
+"""
+Asyncio HTTP server for the camera UI (stdlib only).
+
+`ThreadingHTTPServer` gives every connection its own thread, keeps no limit
+on how many requests wait for the detector and accepts bodies of any size.
+`AsyncCameraServer` runs the connections on one event loop instead:
+
+* HTTP/1.1 keep-alive with an idle timeout (``Keep-Alive: timeout=N``), so
+  a camera posting every 250 ms reuses one connection;
+* limits on header size (431), body size (413) and open connections (503);
+* route handlers are plain blocking functions. Inference routes run on a
+  bounded executor of `workers` threads with at most `max_queue` more
+  requests waiting; beyond that a request gets 503 + Retry-After straight
+  from the loop, without touching a thread. A coalescing route keeps one
+  request per client running and one waiting on the loop: a newer request
+  replaces the waiting one, which is answered ``{"superseded": true}``
+  (``on_refused`` can add to those loop-made answers). Other routes (/status,
+  /confirm, /stop, static files) use a small separate executor so they stay
+  responsive while the detector is saturated;
+* WebSocket upgrades (/ws) are handed to a blocking handler on a stream
+  thread with file/socket adapters over the connection (see camera_stream.py).
+
+The object mimics the parts of ``socketserver`` the main programme uses
+(``server_address``, ``serve_forever``, ``shutdown``, ``server_close``).
+Configure with ``CAMERA_SERVER_WORKERS``, ``CAMERA_SERVER_QUEUE``,
+``CAMERA_MAX_BODY``, ``CAMERA_MAX_CONNECTIONS``, ``CAMERA_MAX_STREAMS`` and
+``CAMERA_KEEPALIVE``.
+"""
+import asyncio
+import json
+import logging
+import mimetypes
+import os
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+from http import HTTPStatus
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlsplit
+
+LOGGER = logging.getLogger(__name__)
+
+SERVER_WORKERS = int(os.environ.get("CAMERA_SERVER_WORKERS", "8"))
+SERVER_QUEUE = int(os.environ.get("CAMERA_SERVER_QUEUE", "16"))
+MAX_BODY_BYTES = int(os.environ.get("CAMERA_MAX_BODY", str(8 * 1024 * 1024)))
+MAX_HEADER_BYTES = 64 * 1024
+MAX_CONNECTIONS = int(os.environ.get("CAMERA_MAX_CONNECTIONS", "256"))
+MAX_STREAMS = int(os.environ.get("CAMERA_MAX_STREAMS", "32"))
+KEEPALIVE_SECONDS = float(os.environ.get("CAMERA_KEEPALIVE", "15"))
+CONTROL_WORKERS = 4
+
+
+class Headers(dict):
+    """Request headers with case-insensitive `get` / `[]` (keys stored lower-case)."""
+
+    def __getitem__(self, name):
+        return dict.__getitem__(self, name.lower())
+
+    def get(self, name, default=None):
+        return dict.get(self, name.lower(), default)
+
+    def __contains__(self, name):
+        return dict.__contains__(self, name.lower())
+
+
+class Request:
+    __slots__ = ("method", "target", "path", "query", "version", "headers", "body", "client", "received_at",
+                 "coalesce_key")
+
+    def __init__(self, method, target, version, headers, body=b"", client=None):
+        self.method = method
+        self.target = target
+        parts = urlsplit(target)
+        self.path = unquote(parts.path)
+        self.query = parse_qs(parts.query)
+        self.version = version
+        self.headers = headers
+        self.body = body
+        self.client = client
+        # perf_counter() once the request was read, so handlers can count time spent queued
+        self.received_at = time.perf_counter()
+        # Client key a coalescing route ran this request under (None: not coalesced on the loop)
+        self.coalesce_key = None
+
+    @property
+    def keep_alive(self):
+        connection = (self.headers.get("Connection") or "").lower()
+        if self.version == "HTTP/1.0":
+            return "keep-alive" in connection
+        return "close" not in connection
+
+
+class Response:
+    """Status, body and headers; `payload` is sent as JSON (with CORS, like the threaded server)."""
+
+    __slots__ = ("status", "body", "headers")
+
+    def __init__(self, status=200, payload=None, body=b"", content_type=None, headers=None):
+        self.status = int(status)
+        self.headers = dict(headers or {})
+        if payload is not None:
+            body = json.dumps(payload, default=str).encode("utf-8")
+            content_type = content_type or "application/json"
+            self.headers.setdefault("Access-Control-Allow-Origin", "*")
+        self.body = body
+        if content_type:
+            self.headers["Content-Type"] = content_type
+
+
+class _Route:
+    __slots__ = ("handler", "inference", "coalesce", "on_refused")
+
+    def __init__(self, handler, inference, coalesce=None, on_refused=None):
+        self.handler = handler
+        self.inference = inference
+        self.coalesce = coalesce
+        self.on_refused = on_refused
+
+
+class _Turn:
+    """Per-client state of a coalescing route: whether a request runs, and the one waiting."""
+
+    __slots__ = ("running", "waiting")
+
+    def __init__(self):
+        self.running = False
+        self.waiting = None
+
+
+class _BlockingReader:
+    """``read(n)`` for a stream thread, served by the connection's StreamReader on the loop."""
+
+    def __init__(self, reader, loop):
+        self.reader = reader
+        self.loop = loop
+
+    def read(self, n):
+        try:
+            return asyncio.run_coroutine_threadsafe(self._read(n), self.loop).result()
+        except Exception:
+            # Loop closed or the read was cancelled at shutdown: same as a lost connection
+            return b""
+
+    async def _read(self, n):
+        try:
+            return await self.reader.readexactly(n)
+        except asyncio.IncompleteReadError as e:
+            return e.partial
+
+
+class _BlockingSocket:
+    """``sendall`` / ``shutdown`` for a stream thread; sends wait for the transport to drain."""
+
+    def __init__(self, writer, loop):
+        self.writer = writer
+        self.loop = loop
+
+    def sendall(self, data):
+        try:
+            asyncio.run_coroutine_threadsafe(self._send(data), self.loop).result()
+        except OSError:
+            raise
+        except Exception as e:  # loop closed, send cancelled at shutdown
+            raise OSError(str(e))
+
+    async def _send(self, data):
+        if self.writer.is_closing():
+            raise ConnectionResetError("connection closed")
+        self.writer.write(data)
+        await self.writer.drain()
+
+    def shutdown(self, how=None):
+        self.loop.call_soon_threadsafe(self.writer.close)
+
+
+class AsyncCameraServer:
+    """Event-loop HTTP server dispatching to blocking route handlers; see the module docstring."""
+
+    def __init__(self, address, static_root=None, workers=SERVER_WORKERS, max_queue=SERVER_QUEUE,
+                 max_body=MAX_BODY_BYTES, max_connections=MAX_CONNECTIONS, max_streams=MAX_STREAMS,
+                 keepalive=KEEPALIVE_SECONDS, retry_after=1):
+        # Bind now so the caller can fall back to another address, as with HTTPServer
+        self.socket = socket.create_server(address, reuse_port=False)
+        self.server_address = self.socket.getsockname()[:2]
+        self.static_root = Path(static_root).resolve() if static_root else None
+        self.workers = max(1, int(workers))
+        self.max_queue = max(0, int(max_queue))
+        self.max_body = int(max_body)
+        self.max_connections = int(max_connections)
+        self.max_streams = int(max_streams)
+        self.keepalive = float(keepalive)
+        self.retry_after = retry_after
+        self._routes = {}
+        self._upgrades = {}
+        self._inference = ThreadPoolExecutor(self.workers, thread_name_prefix="camera-inference")
+        self._control = ThreadPoolExecutor(CONTROL_WORKERS, thread_name_prefix="camera-control")
+        self._streams = ThreadPoolExecutor(max(1, self.max_streams), thread_name_prefix="camera-stream")
+        self._loop = None
+        self._stop = None
+        self._stopped = threading.Event()
+        self._connections = set()
+        # Coalescing routes: (route, client key) -> _Turn
+        self._turns = {}
+        # Counters (only touched on the loop thread)
+        self.inference_pending = 0
+        self.streams_active = 0
+        self.stats = {"connections": 0, "requests": 0, "reused": 0, "rejected_busy": 0,
+                      "rejected_connections": 0, "too_large": 0, "superseded": 0, "errors": 0}
+
+    # -- configuration -------------------------------------------------------------
+    def route(self, method, path, handler, inference=False, coalesce=None, on_refused=None):
+        """Serve ``method path`` with ``handler(request)`` -> `Response` or ``(status, payload)``.
+
+        `inference` handlers run on the bounded inference executor (and are
+        refused with 503 when it is full); the others on the control executor.
+        A ``(503, payload)`` result is sent with Retry-After. With
+        ``coalesce(request)`` -> client key, only the newest waiting request
+        of a client runs (latest frame wins); it runs on the loop, so it must
+        only look at headers, and a None key leaves the request to the
+        handler (``request.coalesce_key`` tells which). ``on_refused(request, payload)``
+        -> payload may extend the answers the loop gives by itself (superseded,
+        queue full); it runs on the loop, so it must be cheap.
+        """
+        self._routes[(method.upper(), path)] = _Route(handler, inference, coalesce, on_refused)
+
+    def upgrade(self, path, accept, handler):
+        """WebSocket route: ``accept(request)`` returns the 101 headers (or None to refuse);
+        ``handler(request, rfile, sock)`` then owns the connection on a stream thread."""
+        self._upgrades[path] = (accept, handler)
+
+    # -- socketserver-like interface -------------------------------------------
+    def serve_forever(self):
+        try:
+            asyncio.run(self._serve())
+        finally:
+            self._stopped.set()
+
+    def shutdown(self):
+        loop, stop = self._loop, self._stop
+        if loop is not None and stop is not None:
+            try:
+                loop.call_soon_threadsafe(stop.set)
+            except RuntimeError:
+                pass  # loop already closed
+            self._stopped.wait(timeout=5.0)
+
+    def server_close(self):
+        for executor in (self._inference, self._control, self._streams):
+            executor.shutdown(wait=False)
+        try:
+            self.socket.close()
+        except OSError:
+            pass
+
+    def info(self):
+        return dict(self.stats, open_connections=len(self._connections), coalescing_clients=len(self._turns), workers=self.workers,
+                    max_queue=self.max_queue, inference_pending=self.inference_pending,
+                    streams_active=self.streams_active, keepalive_s=self.keepalive)
+
+    # -- connections ---------------------------------------------------------------
+    async def _serve(self):
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        server = await asyncio.start_server(self._connection, sock=self.socket, limit=MAX_HEADER_BYTES)
+        async with server:
+            await self._stop.wait()
+            server.close()
+            for writer in list(self._connections):
+                writer.close()
+
+    async def _connection(self, reader, writer):
+        self.stats["connections"] += 1
+        if len(self._connections) >= self.max_connections:
+            self.stats["rejected_connections"] += 1
+            await self._write(writer, Response(503, {"error": "too many connections"}), keep_alive=False)
+            writer.close()
+            return
+        self._connections.add(writer)
+        client = writer.get_extra_info("peername")
+        served = 0
+        try:
+            while True:
+                request, error = await self._read_request(reader, writer, client)
+                if request is None:
+                    if error is not None:
+                        await self._write(writer, error, keep_alive=False)
+                    break
+                served += 1
+                self.stats["requests"] += 1
+                if served > 1:
+                    self.stats["reused"] += 1
+                if request.path in self._upgrades:
+                    await self._upgrade(request, reader, writer)
+                    return
+                response = await self._dispatch(request)
+                keep_alive = request.keep_alive and not self._stop.is_set()
+                await self._write(writer, response, keep_alive, head=request.method == "HEAD")
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    async def _read_request(self, reader, writer, client):
+        """Next request on the connection: ``(request, None)``, ``(None, error response)`` or ``(None, None)`` at EOF."""
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.keepalive)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError):
+            return None, None
+        except asyncio.LimitOverrunError:
+            return None, Response(431, {"error": "request headers too large"})
+        try:
+            lines = head.decode("latin-1").split("\r\n")
+            method, target, version = lines[0].split(" ", 2)
+            headers = Headers()
+            for line in lines[1:]:
+                if line:
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+        except ValueError:
+            return None, Response(400, {"error": "malformed request"})
+        if "chunked" in (headers.get("Transfer-Encoding") or "").lower():
+            return None, Response(411, {"error": "chunked bodies are not supported; send Content-Length"})
+        # Digits only: int() would also take "-1" (readexactly then raises) or "+1_0"
+        length = (headers.get("Content-Length") or "0").strip()
+        if not (length.isascii() and length.isdigit()):
+            return None, Response(400, {"error": "bad Content-Length"})
+        length = int(length)
+        if length > self.max_body:
+            self.stats["too_large"] += 1
+            return None, Response(413, {"error": "request body too large", "max_bytes": self.max_body})
+        body = b""
+        if length:
+            if (headers.get("Expect") or "").lower() == "100-continue":
+                writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+            try:
+                body = await asyncio.wait_for(reader.readexactly(length), self.keepalive)
+            except (asyncio.TimeoutError, asyncio.IncompleteReadError):
+                return None, None
+        return Request(method.upper(), target, version, headers, body, client), None
+
+    async def _dispatch(self, request):
+        if request.method == "OPTIONS":
+            return Response(200, headers={
+                "Access-Control-Allow-Origin": "*",
+                "Access-Control-Allow-Methods": "POST, OPTIONS",
+                "Access-Control-Allow-Headers": "Content-Type, X-Camera, X-Frame-RTT",
+            })
+        route = self._routes.get((request.method, request.path))
+        if route is None and request.method == "HEAD":
+            route = self._routes.get(("GET", request.path))
+        if route is None:
+            if request.method in ("GET", "HEAD") and self.static_root is not None:
+                return await self._loop.run_in_executor(self._control, self._static, request.path)
+            if request.method == "POST":
+                return Response(404, {"error": "unsupported path", "path": request.path})
+            return Response(404, {"error": "not found", "path": request.path})
+        if not route.inference:
+            return await self._run(self._control, route.handler, request)
+        if route.coalesce is None:
+            return await self._infer(route, request)
+        try:
+            # Runs on the loop: header lookups only, never the body
+            key = route.coalesce(request)
+        except Exception:
+            LOGGER.exception("coalesce key failed for %s %s", request.method, request.path)
+            key = None
+        if key is None:
+            return await self._infer(route, request)
+        request.coalesce_key = key
+        turn_key = (route, key)
+        turn = self._turns.get(turn_key)
+        if turn is None:
+            turn = self._turns[turn_key] = _Turn()
+        if turn.running:
+            if turn.waiting is not None and not turn.waiting.done():
+                turn.waiting.set_result(False)
+                self.stats["superseded"] += 1
+            waiting = turn.waiting = self._loop.create_future()
+            if not await waiting:
+                return Response(200, self._refused(route, request, {"superseded": True, "camera": key}))
+        turn.running = True
+        try:
+            return await self._infer(route, request)
+        finally:
+            if turn.waiting is not None and not turn.waiting.done():
+                # Hand the turn straight to the newest waiting request
+                turn.waiting.set_result(True)
+                turn.waiting = None
+            else:
+                turn.running = False
+                del self._turns[turn_key]
+
+    async def _infer(self, route, request):
+        if self.inference_pending >= self.workers + self.max_queue:
+            # Admission control on the loop: no thread is spent on a frame we cannot serve soon
+            self.stats["rejected_busy"] += 1
+            payload = {"error": "busy", "details": "server queue full", "retry_after": self.retry_after}
+            return Response(503, self._refused(route, request, payload), headers={"Retry-After": str(self.retry_after)})
+        self.inference_pending += 1
+        try:
+            return await self._run(self._inference, route.handler, request)
+        finally:
+            self.inference_pending -= 1
+
+    def _refused(self, route, request, payload):
+        if route.on_refused is None:
+            return payload
+        try:
+            return route.on_refused(request, payload)
+        except Exception:
+            LOGGER.exception("on_refused failed for %s %s", request.method, request.path)
+            return payload
+
+    async def _run(self, executor, handler, request):
+        try:
+            result = await self._loop.run_in_executor(executor, handler, request)
+        except Exception:
+            self.stats["errors"] += 1
+            LOGGER.exception("Unhandled exception serving %s %s", request.method, request.path)
+            return Response(500, {"error": "internal server error", "details": traceback.format_exc()})
+        if isinstance(result, Response):
+            return result
+        status, payload = result
+        if status == 503:
+            # The handler cannot take the request now (warming up, pool busy): ask to retry
+            return Response(503, dict(payload, retry_after=self.retry_after),
+                            headers={"Retry-After": str(self.retry_after)})
+        return Response(status, payload)
+
+    def _static(self, path):
+        # Files under static_root only; "/" serves index.html when there is one
+        relative = path.lstrip("/") or "index.html"
+        target = (self.static_root / relative).resolve()
+        if target != self.static_root and self.static_root not in target.parents:
+            return Response(404, body=b"", content_type="text/plain")
+        if not target.is_file():
+            return Response(404, body=b"File not found", content_type="text/plain")
+        content_type = mimetypes.guess_type(str(target))[0] or "application/octet-stream"
+        if content_type.startswith("text/") or content_type == "application/javascript":
+            content_type += "; charset=utf-8"
+        return Response(200, body=target.read_bytes(), content_type=content_type, headers={
+            "Last-Modified": formatdate(target.stat().st_mtime, usegmt=True),
+        })
+
+    async def _write(self, writer, response, keep_alive, head=False):
+        try:
+            phrase = HTTPStatus(response.status).phrase
+        except ValueError:
+            phrase = ""
+        lines = ["HTTP/1.1 {} {}".format(response.status, phrase),
+                 "Date: " + formatdate(time.time(), usegmt=True),
+                 "Content-Length: {}".format(len(response.body))]
+        lines.extend("{}: {}".format(k, v) for k, v in response.headers.items())
+        if keep_alive:
+            lines.append("Connection: keep-alive")
+            lines.append("Keep-Alive: timeout={}".format(int(self.keepalive)))
+        else:
+            lines.append("Connection: close")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        if not head and response.body:
+            writer.write(response.body)
+        await writer.drain()
+
+    async def _upgrade(self, request, reader, writer):
+        accept, handler = self._upgrades[request.path]
+        if self.streams_active >= self.max_streams:
+            await self._write(writer, Response(503, {"error": "too many streams"}), keep_alive=False)
+            return
+        headers = accept(request)
+        if headers is None:
+            await self._write(writer, Response(400, {"error": "websocket upgrade required"}), keep_alive=False)
+            return
+        lines = ["HTTP/1.1 101 Switching Protocols"] + ["{}: {}".format(k, v) for k, v in headers.items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        await writer.drain()
+        self.streams_active += 1
+        try:
+            await self._loop.run_in_executor(
+                self._streams, handler, request, _BlockingReader(reader, self._loop), _BlockingSocket(writer, self._loop))
+        except Exception:
+            LOGGER.exception("Stream handler for %s failed", request.path)
+        finally:
+            self.streams_active -= 1
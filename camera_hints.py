@@ -0,0 +1,164 @@
+"""
+Capture hints: how often, how large and how compressed a camera page should
+send its frames so results stay within a latency target.
+
+Camera.html used to capture a 416 px frame at JPEG quality 0.6 every 250 ms
+whatever the load. Every /detect answer (and /ws detections message) now
+carries ``hints`` - ``interval_ms``, ``width`` and ``quality`` - which the
+page's capture loop follows. Each camera room has a `CaptureHints` that turns
+what the server sees into those hints:
+
+* the frame's time in the server (queueing included) and, when the page
+  reports it with ``X-Frame-RTT``, the round trip of its previous frame; the
+  difference is the network/encode share of the latency;
+* `SERVER_LOAD`: the average analysis time, which grows as cameras share
+  the inference pool. A camera has at most one frame analyzed at a time
+  (the rest are superseded), so that is the shortest useful interval.
+
+When latency is above the target and mostly outside the server, the camera
+steps down to a smaller, more compressed frame; once well below the target
+it gets its resolution back. Otherwise the interval is scaled by latency /
+set point (``SETPOINT`` of the target), never below one analysis: cameras
+sharing a loaded server converge on the rate that keeps them at the set
+point, and on an idle server they get frames as fast as they are analyzed.
+A superseded frame lifts the interval to one analysis; a refused one (503)
+backs off further.
+
+Configure with ``CAMERA_TARGET_LATENCY_MS`` (default 400).
+"""
+import os
+import threading
+import time
+
+TARGET_LATENCY_MS = float(os.environ.get("CAMERA_TARGET_LATENCY_MS", "400"))
+MIN_INTERVAL_MS = 100
+MAX_INTERVAL_MS = 2000
+DEFAULT_INTERVAL_MS = 250
+# (width, JPEG quality) from best to cheapest; level 0 is what Camera.html used to send
+QUALITY_LEVELS = ((416, 0.6), (352, 0.55), (288, 0.5), (224, 0.45))
+# Seconds between two resolution/quality changes, so one slow frame cannot flap them
+LEVEL_COOLDOWN = 2.0
+# Latency the interval control aims for, as a fraction of the target
+SETPOINT = 0.75
+# Weight of the newest sample in the moving averages
+EWMA_ALPHA = 0.3
+# A camera idle this long (seconds) starts over: its old latencies say nothing about now
+IDLE_RESET = 5.0
+
+
+def _ewma(current, sample):
+    return sample if current is None else current + EWMA_ALPHA * (sample - current)
+
+
+class ServerLoad:
+    """Frames in analysis right now and the moving average of one analysis, over all cameras."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.service_ms = None
+
+    def begin(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def end(self, service_ms=None):
+        """One analysis finished; `service_ms` (None for failed frames) updates the average."""
+        with self._lock:
+            self.in_flight -= 1
+            if service_ms is not None:
+                self.service_ms = _ewma(self.service_ms, service_ms)
+
+    def info(self):
+        with self._lock:
+            return {
+                'in_flight': self.in_flight,
+                'service_ms': round(self.service_ms, 1) if self.service_ms is not None else None,
+            }
+
+
+SERVER_LOAD = ServerLoad()
+
+
+class CaptureHints:
+    """Interval / width / quality suggested to one camera; see the module docstring."""
+
+    def __init__(self, target_ms=TARGET_LATENCY_MS, load=None):
+        self.target_ms = float(target_ms)
+        self.load = load or SERVER_LOAD
+        self._lock = threading.Lock()
+        self.interval_ms = float(DEFAULT_INTERVAL_MS)
+        self.level = 0
+        self.server_ms = None
+        self.network_ms = None
+        self._level_changed = 0.0
+        self._last_seen = None
+
+    def _floor_ms(self):
+        # Frames sent faster than one analysis would only be superseded
+        service_ms = self.load.info()['service_ms']
+        if service_ms is None:
+            return MIN_INTERVAL_MS
+        return min(MAX_INTERVAL_MS, max(MIN_INTERVAL_MS, service_ms))
+
+    def _set_level(self, level, now):
+        level = max(0, min(len(QUALITY_LEVELS) - 1, level))
+        if level == self.level or now - self._level_changed < LEVEL_COOLDOWN:
+            return False
+        self.level = level
+        self._level_changed = now
+        return True
+
+    def observe(self, server_ms, rtt_ms=None):
+        """Account for one analyzed frame; returns the updated hints."""
+        floor = self._floor_ms()
+        now = time.monotonic()
+        with self._lock:
+            if self._last_seen is not None and now - self._last_seen > IDLE_RESET:
+                self.interval_ms = float(DEFAULT_INTERVAL_MS)
+                self.level = 0
+                self.server_ms = self.network_ms = None
+            self._last_seen = now
+            self.server_ms = _ewma(self.server_ms, float(server_ms))
+            if rtt_ms is not None and rtt_ms > 0:
+                self.network_ms = _ewma(self.network_ms, max(0.0, float(rtt_ms) - float(server_ms)))
+            network = self.network_ms or 0.0
+            latency = self.server_ms + network
+            if latency > self.target_ms and network > self.server_ms and self._set_level(self.level + 1, now):
+                pass  # network-bound: cheaper frames first
+            elif latency < 0.6 * self.target_ms and network < 0.3 * self.target_ms \
+                    and self._set_level(self.level - 1, now):
+                pass  # room to spare: resolution back first
+            else:
+                ratio = min(1.5, max(0.5, latency / (SETPOINT * self.target_ms)))
+                self.interval_ms = min(MAX_INTERVAL_MS, max(floor, self.interval_ms * ratio))
+            return self._hints()
+
+    def superseded(self):
+        """A newer frame replaced one still waiting: the camera sends faster than one analysis."""
+        floor = self._floor_ms()
+        with self._lock:
+            self.interval_ms = max(self.interval_ms, floor)
+            return self._hints()
+
+    def back_off(self):
+        """The frame was refused (503, every inference context busy)."""
+        with self._lock:
+            self.interval_ms = min(MAX_INTERVAL_MS, max(self.interval_ms * 1.25, self._floor_ms()))
+            return self._hints()
+
+    def hints(self):
+        with self._lock:
+            return self._hints()
+
+    def _hints(self):
+        width, quality = QUALITY_LEVELS[self.level]
+        return {'interval_ms': int(round(self.interval_ms)), 'width': width, 'quality': quality,
+                'target_ms': int(self.target_ms)}
+
+    def info(self):
+        with self._lock:
+            info = self._hints()
+            info['server_ms'] = round(self.server_ms, 1) if self.server_ms is not None else None
+            info['network_ms'] = round(self.network_ms, 1) if self.network_ms is not None else None
+            return info
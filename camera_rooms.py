@@ -0,0 +1,453 @@
+"""
+Camera rooms: per-camera identification state for the camera server.
+
+Each camera (a browser tab posting to /detect with a ``camera`` id, or a fixed
+video source) gets a `CameraRoom` with its own identification window, shot
+counter / auto-stop flag, last confirmation and inactivity monitor, so two
+cameras never vote in each other's summary or trip each other's auto-stop.
+The room's name is also the stream id given to the detector (change gate,
+tracker) and the client tag used to share the inference pool fairly, and its
+priority decides which camera is served first when the pool is saturated.
+Rooms also publish their summary and auto-stop events to listeners such as
+the /ws streams of camera pages (see camera_stream.py), and each has a
+`FrameMailbox` so a camera's /detect posts never pile up behind the detector
+and a `CaptureHints` telling its page how fast and how large to capture
+(see camera_hints.py).
+
+Camera names come from clients, so `RoomManager` keeps at most
+``CAMERA_MAX_ROOMS`` rooms (frames for further names go to the default room)
+and evicts rooms idle for ``CAMERA_ROOM_TTL`` seconds; its ``on_evict``
+callback lets the server drop the per-stream detector state of those rooms.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from camera_hints import CaptureHints
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_ROOM = "default"
+MAX_ROOMS = int(os.environ.get("CAMERA_MAX_ROOMS", "64"))
+ROOM_IDLE_TTL = float(os.environ.get("CAMERA_ROOM_TTL", "600"))
+
+
+def normalize_confidence(value):
+    """Clamp a confidence (0..1 or a 0..100 percentage) into [0, 0.999]."""
+    try:
+        conf = float(value)
+    except Exception:
+        return 0.0
+    if conf < 0.0:
+        return 0.0
+    if conf > 1.0:
+        if conf <= 100.0:
+            conf = conf / 100.0
+        else:
+            conf = 1.0
+    if conf >= 1.0:
+        conf = 0.999
+    return conf
+
+
+def summarize_identifications(samples, max_entries=None, max_age=None):
+    """Leading identity among `samples` (dicts with person_id/name/confidence/ts/track_id).
+
+    Only the last `max_entries` samples younger than `max_age` seconds vote;
+    samples sharing a track_id vote for the identity their track got most often.
+    """
+    samples = list(samples or [])
+    if not samples:
+        return None
+
+    if max_entries is not None:
+        samples = samples[-int(max_entries):]
+
+    now_ts = time.time()
+    if max_age is not None:
+        filtered = []
+        for sample in samples:
+            ts = sample.get('ts') if isinstance(sample, dict) else None
+            if ts is None or now_ts - ts <= max_age:
+                filtered.append(sample)
+        samples = filtered
+    if not samples:
+        return None
+
+    # Samples that share a track_id are the same person seen in consecutive
+    # frames: every one of them votes for the identity the track got most often
+    track_votes = {}
+    for sample in samples:
+        tid = sample.get('track_id') if isinstance(sample, dict) else None
+        if tid is None:
+            continue
+        key = sample.get('person_id') or sample.get('name') or sample.get('label') or 'Unknown'
+        vote = track_votes.setdefault(tid, {}).setdefault(key, [0, 0.0, sample])
+        vote[0] += 1
+        vote[1] += normalize_confidence(sample.get('confidence'))
+    track_identity = {
+        tid: max(votes.values(), key=lambda v: (v[0], v[1]))[2] for tid, votes in track_votes.items()
+    }
+
+    stats = {}
+    for sample in samples:
+        ident = sample
+        if isinstance(sample, dict) and sample.get('track_id') in track_identity:
+            ident = track_identity[sample['track_id']]
+        pid = ident.get('person_id') if isinstance(ident, dict) else None
+        name = ident.get('name') if isinstance(ident, dict) else None
+        label = ident.get('label') if isinstance(ident, dict) else None
+        key = pid if pid is not None else (name or label or 'Unknown')
+        entry = stats.setdefault(
+            key,
+            {
+                'count': 0,
+                'conf_sum': 0.0,
+                'name': name or label or 'Unknown',
+                'person_id': pid,
+                'latest_ts': 0.0,
+            },
+        )
+        entry['count'] += 1
+        try:
+            entry['conf_sum'] += normalize_confidence(sample.get('confidence'))
+        except Exception:
+            pass
+        ts = sample.get('ts') if isinstance(sample, dict) else None
+        if isinstance(ts, (int, float)):
+            entry['latest_ts'] = max(entry['latest_ts'], ts)
+
+    total = sum(v['count'] for v in stats.values())
+    if total == 0:
+        return None
+
+    best = None
+    for data in stats.values():
+        avg_conf = data['conf_sum'] / data['count'] if data['count'] else 0.0
+        candidate = {
+            'person_id': data['person_id'],
+            'name': data['name'],
+            'count': data['count'],
+            'avg_confidence': avg_conf,
+            'support': data['count'] / total,
+            'total_samples': total,
+            'latest_timestamp': data['latest_ts'] or None,
+        }
+        if best is None:
+            best = candidate
+            continue
+        if candidate['count'] > best['count']:
+            best = candidate
+            continue
+        if candidate['count'] == best['count'] and candidate['avg_confidence'] > best['avg_confidence']:
+            best = candidate
+            continue
+        if (
+            candidate['count'] == best['count']
+            and abs(candidate['avg_confidence'] - best['avg_confidence']) < 1e-6
+            and (candidate['latest_timestamp'] or 0.0) > (best['latest_timestamp'] or 0.0)
+        ):
+            best = candidate
+
+    return best
+
+
+class FrameMailbox:
+    """Latest-frame-wins admission for one camera's /detect requests.
+
+    One request runs at a time and at most one waits. A new request replaces
+    the waiting one, whose `enter` returns False at once so it can be answered
+    as superseded; the newest frame is analyzed next and older ones never are.
+    """
+
+    def __init__(self, wait_seconds=10.0):
+        self.wait_seconds = wait_seconds
+        self._cond = threading.Condition()
+        self._busy = False
+        self._waiting = None
+        self.processed = 0
+        self.superseded = 0
+
+    def enter(self):
+        """Wait for this request's turn; False when a newer frame took its place (or the wait timed out)."""
+        token = object()
+        deadline = time.monotonic() + self.wait_seconds
+        with self._cond:
+            if not self._busy:
+                self._busy = True
+                return True
+            if self._waiting is not None:
+                self.superseded += 1
+            self._waiting = token
+            self._cond.notify_all()
+            while self._waiting is token:
+                if not self._busy:
+                    self._busy = True
+                    self._waiting = None
+                    return True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._waiting = None
+                    self.superseded += 1
+                    return False
+                self._cond.wait(remaining)
+            return False
+
+    def leave(self):
+        with self._cond:
+            self._busy = False
+            self.processed += 1
+            self._cond.notify_all()
+
+    def info(self):
+        with self._cond:
+            return {'processed': self.processed, 'superseded': self.superseded,
+                    'busy': self._busy, 'waiting': self._waiting is not None}
+
+
+class CameraRoom:
+    """Identification window, auto-stop counter and inactivity state of one camera."""
+
+    def __init__(self, name, priority=0, autostop_n=None, window_max=128, identifications=None, lock=None):
+        self.name = name
+        self.priority = int(priority)
+        # None: follow the server-wide CAMERA_AUTOSTOP_N
+        self.autostop_n = autostop_n
+        self.window_max = int(window_max)
+        # The default room shares RECENT_IDENTIFICATIONS (and its lock) with older code
+        self.identifications: List[Dict[str, Any]] = identifications if identifications is not None else []
+        self.lock = lock or threading.Lock()
+        self.shot_counter = 0
+        self.auto_stop_triggered = False
+        self.last_identified = None
+        self.last_confirmation_key = None
+        self.last_confirmation_ts = 0.0
+        # Inactivity monitor: starting a new one bumps the generation, which
+        # cancels the previous monitor of this room only
+        self.inactivity_generation = 0
+        self.identified_ts: Optional[float] = None
+        self.identified_id = None
+        self.identified_name: Optional[str] = None
+        # time() of the last sign that someone is there; a running monitor ends when it moves
+        self.activity_ts: Optional[float] = None
+        self.frames = 0
+        self.last_frame_ts: Optional[float] = None
+        # monotonic() of the last lookup or frame, for idle eviction
+        self.last_used = time.monotonic()
+        # Callbacks receiving this room's events (summary, auto_stop), e.g. /ws streams
+        self._listeners: List[Any] = []
+        self.mailbox = FrameMailbox()
+        self.hints = CaptureHints()
+
+    def subscribe(self, callback):
+        with self.lock:
+            self._listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        with self.lock:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    def publish(self, event):
+        """Pass `event` (a dict with a ``type``) to every listener; listeners must not block."""
+        with self.lock:
+            listeners = list(self._listeners)
+        for callback in listeners:
+            try:
+                callback(dict(event, camera=self.name))
+            except Exception:
+                pass
+        return len(listeners)
+
+    def add_identifications(self, samples):
+        """Append identification samples to the window and count one camera shot; returns the count."""
+        with self.lock:
+            self.identifications.extend(samples)
+            if len(self.identifications) > self.window_max:
+                del self.identifications[:-self.window_max]
+            self.shot_counter += 1
+            return self.shot_counter
+
+    def should_auto_stop(self, limit):
+        """True exactly once per session, when the shot counter first reaches `limit`."""
+        with self.lock:
+            if self.shot_counter >= limit and not self.auto_stop_triggered:
+                self.auto_stop_triggered = True
+                return True
+            return False
+
+    def record_frame(self):
+        self.frames += 1
+        self.last_frame_ts = time.time()
+        self.last_used = time.monotonic()
+
+    def is_idle(self, ttl, now=None):
+        """True when the room went unused for `ttl` seconds and nothing still relies on it
+        (an open stream, a frame in analysis, a running inactivity monitor)."""
+        now = time.monotonic() if now is None else now
+        if now - self.last_used < ttl or self.identified_name is not None:
+            return False
+        with self.lock:
+            if self._listeners:
+                return False
+        mailbox = self.mailbox.info()
+        return not (mailbox['busy'] or mailbox['waiting'])
+
+    def samples(self):
+        with self.lock:
+            return list(self.identifications)
+
+    def summarize(self, max_entries=None, max_age=None):
+        return summarize_identifications(self.samples(), max_entries=max_entries, max_age=max_age)
+
+    def best_recent(self):
+        """Highest-confidence sample in the window (used when a camera is stopped by hand)."""
+        samples = self.samples()
+        if not samples:
+            return None
+        return max(samples, key=lambda x: (x.get('confidence', 0.0) or 0.0))
+
+    def begin_inactivity_monitor(self, person_id, person_name, ts):
+        """Record an identification at `ts` and cancel this room's previous monitor;
+        returns the generation of the new one."""
+        with self.lock:
+            self.inactivity_generation += 1
+            self.identified_ts = self.activity_ts = ts
+            self.identified_id = person_id
+            self.identified_name = person_name
+            return self.inactivity_generation
+
+    def end_inactivity_monitor(self, generation):
+        """The monitor of `generation` stopped; unless a newer one took over, the room
+        no longer monitors anyone (and can be evicted once idle)."""
+        with self.lock:
+            if generation != self.inactivity_generation:
+                return False
+            self.identified_ts = self.identified_id = self.identified_name = None
+            return True
+
+    def record_activity(self, ts=None):
+        self.activity_ts = time.time() if ts is None else ts
+
+    def reset(self):
+        """Start a new identification session (counter and auto-stop flag, not the window)."""
+        with self.lock:
+            self.shot_counter = 0
+            self.auto_stop_triggered = False
+
+    def info(self):
+        with self.lock:
+            window = len(self.identifications)
+        return {
+            'priority': self.priority,
+            'window': window,
+            'shots': self.shot_counter,
+            'autostop_n': self.autostop_n,
+            'auto_stop_triggered': self.auto_stop_triggered,
+            'last_identified': self.last_identified,
+            'frames': self.frames,
+            'last_frame_ts': self.last_frame_ts,
+            'monitoring': self.identified_name,
+            'listeners': len(self._listeners),
+            'mailbox': self.mailbox.info(),
+            'hints': self.hints.info(),
+        }
+
+
+class RoomManager:
+    """Named camera rooms, created on first use, at most `max_rooms` at a time.
+
+    Rooms unused for `idle_ttl` seconds are evicted (never the default room
+    or one that is still in use, see `CameraRoom.is_idle`); `on_evict(room)`
+    is then called for each, outside the manager's lock.
+    """
+
+    def __init__(self, default=None, priorities=None, max_rooms=MAX_ROOMS, idle_ttl=ROOM_IDLE_TTL, on_evict=None):
+        self._lock = threading.Lock()
+        self._rooms: Dict[str, CameraRoom] = {}
+        # Initial priority per room name (higher is served first by the inference pool)
+        self.priorities = dict(priorities or {})
+        self.default = default or CameraRoom(DEFAULT_ROOM)
+        self._rooms[self.default.name] = self.default
+        self.max_rooms = max(1, int(max_rooms))
+        self.idle_ttl = float(idle_ttl)
+        self.on_evict = on_evict
+        self.evicted = 0
+        # Lookups of new names sent to the default room because the cap was reached
+        self.redirected = 0
+        self._next_sweep = time.monotonic()
+
+    def get(self, name=None, priority=None):
+        """Room called `name` (the default room for empty names); `priority` updates it when given.
+
+        A new name while `max_rooms` rooms are in use gets the default room.
+        """
+        name = str(name).strip() if name is not None else ''
+        evicted = []
+        if not name or name == self.default.name:
+            room = self.default
+        else:
+            with self._lock:
+                now = time.monotonic()
+                room = self._rooms.get(name)
+                if room is None or now >= self._next_sweep:
+                    evicted = self._evict_idle(now, keep=room)
+                if room is None and len(self._rooms) >= self.max_rooms:
+                    if not self.redirected:
+                        LOGGER.warning("More than %d camera rooms; frames for new cameras go to the default room",
+                                       self.max_rooms)
+                    self.redirected += 1
+                    room, priority = self.default, None
+                elif room is None:
+                    room = self._rooms[name] = CameraRoom(name, priority=self.priorities.get(name, 0))
+        room.last_used = time.monotonic()
+        if priority is not None:
+            room.priority = int(priority)
+        self._notify_evicted(evicted)
+        return room
+
+    def _evict_idle(self, now, keep=None):
+        # Caller holds _lock; a sweep at most every tenth of the TTL keeps lookups cheap
+        self._next_sweep = now + max(1.0, self.idle_ttl / 10.0)
+        if self.idle_ttl <= 0:
+            return []
+        idle = [room for room in self._rooms.values()
+                if room is not self.default and room is not keep and room.is_idle(self.idle_ttl, now)]
+        for room in idle:
+            del self._rooms[room.name]
+        self.evicted += len(idle)
+        return idle
+
+    def evict_idle(self):
+        """Evict idle rooms now; returns their names."""
+        with self._lock:
+            evicted = self._evict_idle(time.monotonic())
+        self._notify_evicted(evicted)
+        return [room.name for room in evicted]
+
+    def _notify_evicted(self, rooms):
+        for room in rooms:
+            LOGGER.info("Camera room %s evicted after %.0f s idle", room.name, self.idle_ttl)
+            if self.on_evict is not None:
+                try:
+                    self.on_evict(room)
+                except Exception:
+                    LOGGER.exception("on_evict failed for camera room %s", room.name)
+
+    def limits_info(self):
+        with self._lock:
+            return {'rooms': len(self._rooms), 'max_rooms': self.max_rooms, 'idle_ttl': self.idle_ttl,
+                    'evicted': self.evicted, 'redirected': self.redirected}
+
+    def rooms(self):
+        with self._lock:
+            return list(self._rooms.values())
+
+    def reset(self):
+        for room in self.rooms():
+            room.reset()
+
+    def info(self):
+        return {room.name: room.info() for room in self.rooms()}
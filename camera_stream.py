@@ -0,0 +1,350 @@
+"""
+WebSocket stream between Camera.html and the camera server (``GET /ws``).
+
+Posting every frame to /detect costs a request (headers, a fresh handler
+thread, often a new connection) and lets the server answer only the frame it
+was sent. Over one WebSocket the page pushes JPEG frames as binary messages
+and the server pushes JSON messages back as they happen:
+
+* ``detections`` - the /detect response for a processed frame, plus ``seq``
+  (the frame's number on this connection) and the connection's drop count;
+* ``summary`` / ``auto_stop`` - published by the camera's room
+  (`CameraRoom.publish`) whichever path fed it, so a page also hears about
+  identifications from a video source in the same room;
+* ``busy`` / ``warming_up`` / ``error`` - a frame that was not analyzed.
+
+Backpressure: the socket is read as fast as frames arrive and each one
+replaces the frame waiting in a one-slot mailbox (`FrameSlot`); a single
+worker per connection analyzes the newest frame when it is free. A camera
+faster than the detector therefore loses stale frames instead of queuing
+them, and results never lag behind the picture.
+
+Only the parts of RFC 6455 the page needs are implemented: masked client
+frames, fragmentation, ping/pong and close; no extensions.
+"""
+import base64
+import hashlib
+import json
+import logging
+import socket
+import struct
+import threading
+import time
+from collections import deque
+
+LOGGER = logging.getLogger(__name__)
+
+WS_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+# Larger messages close the stream (1009); a 416x240 JPEG is ~20 KB
+MAX_MESSAGE_BYTES = 8 * 1024 * 1024
+# Room events waiting for the worker; the oldest are dropped beyond this
+MAX_PENDING_EVENTS = 32
+
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+
+class WebSocketClosed(Exception):
+    """The peer closed the stream or sent something we cannot accept."""
+
+    def __init__(self, code=1000, reason=''):
+        super().__init__(reason or str(code))
+        self.code = code
+        self.reason = reason
+
+
+def is_upgrade_request(headers):
+    """True for a WebSocket handshake (``Upgrade: websocket`` with a key)."""
+    return (
+        'websocket' in (headers.get('Upgrade') or '').lower()
+        and 'upgrade' in (headers.get('Connection') or '').lower()
+        and bool(headers.get('Sec-WebSocket-Key'))
+    )
+
+
+def accept_key(key):
+    """Sec-WebSocket-Accept value for the client's Sec-WebSocket-Key."""
+    digest = hashlib.sha1((key.strip() + WS_GUID).encode('ascii')).digest()
+    return base64.b64encode(digest).decode('ascii')
+
+
+def handshake_headers(headers):
+    """Headers of the 101 response accepting `headers`, or None when they are not a WebSocket upgrade."""
+    if not is_upgrade_request(headers):
+        return None
+    return {
+        'Upgrade': 'websocket',
+        'Connection': 'Upgrade',
+        'Sec-WebSocket-Accept': accept_key(headers.get('Sec-WebSocket-Key')),
+    }
+
+
+def encode_frame(opcode, payload=b''):
+    """One unmasked, unfragmented server frame."""
+    n = len(payload)
+    if n < 126:
+        header = struct.pack('!BB', 0x80 | opcode, n)
+    elif n < 1 << 16:
+        header = struct.pack('!BBH', 0x80 | opcode, 126, n)
+    else:
+        header = struct.pack('!BBQ', 0x80 | opcode, 127, n)
+    return header + payload
+
+
+def _unmask(payload, mask):
+    # XOR as one big integer: a per-byte loop costs milliseconds for a JPEG
+    n = len(payload)
+    if not n:
+        return b''
+    key = (mask * (n // 4 + 1))[:n]
+    return (int.from_bytes(payload, 'little') ^ int.from_bytes(key, 'little')).to_bytes(n, 'little')
+
+
+def _read_exact(rfile, n):
+    data = rfile.read(n)
+    if data is None or len(data) < n:
+        raise WebSocketClosed(1006, 'connection lost')
+    return data
+
+
+def read_frame(rfile):
+    """Next frame from the client as ``(fin, opcode, payload)``."""
+    b0, b1 = _read_exact(rfile, 2)
+    if b0 & 0x70:
+        raise WebSocketClosed(1002, 'extensions are not supported')
+    if not b1 & 0x80:
+        raise WebSocketClosed(1002, 'client frames must be masked')
+    n = b1 & 0x7F
+    if n == 126:
+        n = struct.unpack('!H', _read_exact(rfile, 2))[0]
+    elif n == 127:
+        n = struct.unpack('!Q', _read_exact(rfile, 8))[0]
+    if n > MAX_MESSAGE_BYTES:
+        raise WebSocketClosed(1009, 'message too big')
+    mask = _read_exact(rfile, 4)
+    return bool(b0 & 0x80), b0 & 0x0F, _unmask(_read_exact(rfile, n), mask)
+
+
+def read_message(rfile, on_control):
+    """Next data message as ``(opcode, payload)``, joining fragments.
+
+    Control frames in between are passed to ``on_control(opcode, payload)``.
+    """
+    parts = []
+    opcode = None
+    size = 0
+    while True:
+        fin, op, payload = read_frame(rfile)
+        if op >= OP_CLOSE:
+            on_control(op, payload)
+            continue
+        if op == OP_CONTINUATION:
+            if opcode is None:
+                raise WebSocketClosed(1002, 'unexpected continuation frame')
+        elif opcode is not None:
+            raise WebSocketClosed(1002, 'expected a continuation frame')
+        else:
+            opcode = op
+        size += len(payload)
+        if size > MAX_MESSAGE_BYTES:
+            raise WebSocketClosed(1009, 'message too big')
+        parts.append(payload)
+        if fin:
+            return opcode, parts[0] if len(parts) == 1 else b''.join(parts)
+
+
+class FrameSlot:
+    """One-slot mailbox: `put` replaces a frame nobody has taken yet.
+
+    `put` returns the replaced (dropped) frame or None; `take` waits for a
+    frame or for `close`, returning None once closed.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item = None
+        self._closed = False
+
+    def put(self, item):
+        with self._cond:
+            replaced, self._item = self._item, item
+            self._cond.notify()
+            return replaced
+
+    def take(self, timeout=None):
+        with self._cond:
+            if self._item is None and not self._closed:
+                self._cond.wait(timeout)
+            item, self._item = self._item, None
+            return item
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def wake(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+
+class StreamStats:
+    """Counters over every stream of the server (``websocket`` in /status)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.active = 0
+        self.opened = 0
+        self.frames_received = 0
+        self.frames_processed = 0
+        self.frames_dropped = 0
+        self.events_sent = 0
+        self.events_dropped = 0
+
+    def add(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def info(self):
+        with self._lock:
+            return {
+                'active': self.active,
+                'opened': self.opened,
+                'frames_received': self.frames_received,
+                'frames_processed': self.frames_processed,
+                'frames_dropped': self.frames_dropped,
+                'events_sent': self.events_sent,
+                'events_dropped': self.events_dropped,
+            }
+
+
+STREAM_STATS = StreamStats()
+
+
+class CameraStream:
+    """One upgraded connection: reads frames, analyzes the newest, pushes results and room events.
+
+    `analyze(frame_bytes, room)` returns ``(status, payload)`` like /detect;
+    `ready()` tells whether the detector can take frames yet (its falsy
+    result is sent as ``warming_up``). Call `serve` on the handler thread
+    after the 101 response; it returns when the stream is closed.
+    """
+
+    def __init__(self, sock, rfile, room, analyze, ready=None, stats=None):
+        self.sock = sock
+        self.rfile = rfile
+        self.room = room
+        self.analyze = analyze
+        self.ready = ready
+        self.stats = stats or STREAM_STATS
+        self.slot = FrameSlot()
+        self._send_lock = threading.Lock()
+        self._events = deque(maxlen=MAX_PENDING_EVENTS)
+        self.received = 0
+        self.dropped = 0
+
+    # -- sending ---------------------------------------------------------------
+    def _send(self, opcode, payload=b''):
+        with self._send_lock:
+            self.sock.sendall(encode_frame(opcode, payload))
+
+    def send_json(self, message):
+        self._send(OP_TEXT, json.dumps(message, default=str).encode('utf-8'))
+
+    def on_room_event(self, event):
+        # Called from whichever thread fed the room: hand over to the worker, never block
+        if len(self._events) == self._events.maxlen:
+            self.stats.add(events_dropped=1)
+        self._events.append(event)
+        self.slot.wake()
+
+    # -- reading ---------------------------------------------------------------
+    def _on_control(self, opcode, payload):
+        if opcode == OP_PING:
+            self._send(OP_PONG, payload)
+        elif opcode == OP_CLOSE:
+            code = struct.unpack('!H', payload[:2])[0] if len(payload) >= 2 else 1000
+            raise WebSocketClosed(code, 'closed by client')
+
+    def serve(self):
+        worker = threading.Thread(target=self._work, name='ws-' + str(self.room.name), daemon=True)
+        self.room.subscribe(self.on_room_event)
+        self.stats.add(active=1, opened=1)
+        worker.start()
+        code = 1000
+        try:
+            self.send_json({'type': 'hello', 'camera': self.room.name})
+            while True:
+                opcode, payload = read_message(self.rfile, self._on_control)
+                if opcode != OP_BINARY:
+                    continue  # text messages are reserved; frames are binary JPEGs
+                self.received += 1
+                self.stats.add(frames_received=1)
+                if self.slot.put((self.received, time.perf_counter(), payload)) is not None:
+                    # The worker was still busy with an older frame: this one is newer
+                    self.dropped += 1
+                    self.stats.add(frames_dropped=1)
+        except WebSocketClosed as e:
+            code = e.code
+            if code not in (1000, 1001, 1005, 1006):
+                LOGGER.info('WebSocket for camera %s closed: %s (%d)', self.room.name, e.reason, code)
+        except (OSError, ValueError) as e:
+            code = 1006
+            LOGGER.debug('WebSocket for camera %s failed: %s', self.room.name, e)
+        finally:
+            self.room.unsubscribe(self.on_room_event)
+            self.slot.close()
+            worker.join(timeout=5.0)
+            if code != 1006:
+                try:
+                    self._send(OP_CLOSE, struct.pack('!H', 1000 if code == 1005 else code))
+                except OSError:
+                    pass
+            self.stats.add(active=-1)
+
+    # -- worker ----------------------------------------------------------------
+    def _work(self):
+        try:
+            while True:
+                while self._events:
+                    self.send_json(self._events.popleft())
+                    self.stats.add(events_sent=1)
+                item = self.slot.take(timeout=1.0)
+                if item is None:
+                    if self.slot.closed:
+                        return
+                    continue
+                self._process(*item)
+        except OSError:
+            # The peer went away; unblock the reader too
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def _process(self, seq, received_at, frame):
+        if self.ready is not None:
+            readiness = self.ready()
+            if readiness is not True:
+                self.send_json({'type': 'warming_up', 'seq': seq, 'readiness': readiness})
+                return
+        self.room.record_frame()
+        try:
+            status, payload = self.analyze(frame, self.room)
+        except Exception as e:
+            LOGGER.exception('Stream frame analysis failed')
+            status, payload = 500, {'error': 'detection failed', 'details': str(e)}
+        self.stats.add(frames_processed=1)
+        kind = {200: 'detections', 503: 'busy'}.get(status, 'error')
+        message = dict(payload, type=kind, seq=seq, dropped=self.dropped,
+                       latency_ms=round((time.perf_counter() - received_at) * 1000.0, 1))
+        self.send_json(message)
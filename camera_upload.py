@@ -0,0 +1,110 @@
+"""
+Frame uploads accepted by the camera server's /detect endpoint.
+
+Three request bodies carry the same frame:
+
+* ``application/json`` - ``{"image": "data:image/jpeg;base64,...", "camera": ...}``,
+  what Camera.html used to post (kept for older pages and scripts);
+* ``image/jpeg`` (or png/webp/octet-stream) - the encoded frame itself, e.g.
+  the Blob from ``canvas.toBlob``; the camera comes from the X-Camera header;
+* ``multipart/form-data`` - a FormData with an ``image`` file part and an
+  optional ``camera`` field.
+
+The binary forms skip base64 (a third smaller on the wire) and the JSON
+parse; the image bytes are handed to ``cv2.imdecode`` without being copied.
+"""
+import base64
+import json
+import re
+
+IMAGE_TYPES = ('image/jpeg', 'image/jpg', 'image/png', 'image/webp', 'application/octet-stream')
+
+_BOUNDARY_RE = re.compile(r'boundary="?([^";]+)"?', re.I)
+_NAME_RE = re.compile(r'\bname="([^"]*)"', re.I)
+
+
+class UploadError(ValueError):
+    """Unusable /detect body; `response()` is the JSON error sent back with a 400."""
+
+    def __init__(self, error, details=None):
+        super().__init__(details or error)
+        self.error = error
+        self.details = details
+
+    def response(self):
+        body = {'error': self.error}
+        if self.details:
+            body['details'] = self.details
+        return body
+
+
+def media_type(content_type):
+    """Lower-case media type of a Content-Type header, without parameters."""
+    return (content_type or '').split(';', 1)[0].strip().lower()
+
+
+def parse_detect_upload(content_type, body):
+    """Split a /detect request body into ``(image_bytes, fields)``.
+
+    `image_bytes` is bytes or a memoryview into `body`; `fields` holds the
+    other values sent with the frame (``camera``) plus ``upload``, the form
+    that was used. Raises `UploadError` for malformed bodies.
+    """
+    kind = media_type(content_type)
+    if kind in IMAGE_TYPES:
+        if not body:
+            raise UploadError('missing image data')
+        return body, {'upload': 'raw'}
+    if kind == 'multipart/form-data':
+        return _parse_multipart(content_type, body)
+    return _parse_json(body)
+
+
+def _parse_json(body):
+    try:
+        payload = json.loads(body.decode('utf-8'))
+        data_url = payload.get('image')
+    except Exception as e:
+        raise UploadError('invalid json', str(e))
+    if not data_url or not isinstance(data_url, str) or not data_url.startswith('data:'):
+        raise UploadError('missing image data')
+    # Decode the data URL payload into raw image bytes
+    try:
+        header, b64 = data_url.split(',', 1)
+        img_bytes = base64.b64decode(b64)
+    except ValueError as e:  # also binascii.Error
+        raise UploadError('bad base64', str(e))
+    fields = {k: v for k, v in payload.items() if k != 'image'}
+    fields['upload'] = 'json'
+    return img_bytes, fields
+
+
+def _parse_multipart(content_type, body):
+    match = _BOUNDARY_RE.search(content_type or '')
+    if not match:
+        raise UploadError('invalid multipart', 'no boundary in Content-Type')
+    delimiter = b'--' + match.group(1).encode('latin-1')
+    view = memoryview(body)
+    image = None
+    fields = {'upload': 'multipart'}
+    pos = body.find(delimiter)
+    while pos != -1:
+        start = pos + len(delimiter)
+        if body[start:start + 2] == b'--':
+            break  # closing delimiter
+        head_start = body.find(b'\r\n', start) + 2
+        head_end = body.find(b'\r\n\r\n', head_start)
+        end = body.find(b'\r\n' + delimiter, head_end)
+        if head_start < 2 or head_end == -1 or end == -1:
+            raise UploadError('invalid multipart', 'truncated part')
+        headers = body[head_start:head_end].decode('latin-1')
+        name = _NAME_RE.search(headers)
+        content = view[head_end + 4:end]
+        if name is not None and name.group(1) == 'image':
+            image = content
+        elif name is not None:
+            fields[name.group(1)] = content.tobytes().decode('utf-8', 'replace')
+        pos = end + 2
+    if image is None or not len(image):
+        raise UploadError('missing image data')
+    return image, fields
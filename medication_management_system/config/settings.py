@@ -14,6 +14,11 @@ YOLO_CONFIG = 'models/yolov4/yolov4.cfg'
 YOLO_NAMES = 'models/yolov4/coco.names'
 YOLO_CONFIDENCE_THRESHOLD = 0.5
 YOLO_NMS_THRESHOLD = 0.4
+YOLO_MODEL_VARIANT = 'yolov4'  # or 'yolov4-tiny' (about 10x faster on CPU)
+YOLO_INPUT_SIZE = 416  # network input: 320 / 416 / 608 (multiple of 32)
+YOLO_BACKEND = 'opencv'  # 'opencv', 'openvino', 'opencv-int8' or 'onnxruntime'
+YOLO_TARGET = 'cpu'  # opencv: 'cpu', 'fp16', 'opencl', 'opencl_fp16'
+YOLO_LETTERBOX = True  # keep the aspect ratio (gray padding) instead of stretching to a square
 
 ## Database Settings
 DATABASE_PATH = 'data/medications.db'
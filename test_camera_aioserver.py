@@ -0,0 +1,154 @@
+"""
+Tests for camera_aioserver.py: keep-alive, request limits, bounded inference
+and latest-frame-wins coalescing on the asyncio camera server.
+
+Usage:
+    python -m pytest -q test_camera_aioserver.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+
+def test_async_camera_server_keeps_alive_and_bounds_inference(tmp_path):
+    import http.client
+    import json
+    import socket
+    import threading
+    import time
+
+    from camera_aioserver import AsyncCameraServer
+
+    (tmp_path / "Camera.html").write_text("<html></html>")
+    release = threading.Event()
+
+    def detect(request):
+        release.wait(5)
+        return 200, {"bytes": len(request.body), "camera": request.headers.get("x-camera")}
+
+    server = AsyncCameraServer(("127.0.0.1", 0), static_root=tmp_path, workers=1, max_queue=1, max_body=1024)
+    server.route("POST", "/detect", detect, inference=True)
+    server.route("GET", "/status", lambda request: (503, {"error": "warming up"}))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    port = server.server_address[1]
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        conn.request("GET", "/Camera.html")
+        assert conn.getresponse().read() == b"<html></html>"
+        conn.request("GET", "/../secret.txt")
+        response = conn.getresponse()
+        assert response.status == 404
+        response.read()
+        conn.request("POST", "/detect", body=b"x" * 2048)
+        response = conn.getresponse()
+        assert response.status == 413 and response.getheader("Connection") == "close"
+        response.read()
+        for length in ("-1", "ten", "+1_0"):
+            with socket.create_connection(("127.0.0.1", port), timeout=5) as raw:
+                raw.sendall("POST /detect HTTP/1.1\r\nContent-Length: {}\r\n\r\n".format(length).encode())
+                assert raw.recv(4096).startswith(b"HTTP/1.1 400 "), length
+
+        # One request runs and one waits; a third is refused at once with Retry-After
+        results = []
+
+        def post():
+            c = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            c.request("POST", "/detect", body=b"jpeg", headers={"X-Camera": "ward"})
+            r = c.getresponse()
+            results.append((r.status, json.loads(r.read())))
+
+        posters = [threading.Thread(target=post) for _ in range(2)]
+        for poster in posters:
+            poster.start()
+        deadline = time.time() + 5
+        while server.inference_pending < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        conn.request("POST", "/detect", body=b"jpeg")
+        response = conn.getresponse()
+        assert response.status == 503 and response.getheader("Retry-After") == "1"
+        assert json.loads(response.read())["error"] == "busy"
+        release.set()
+        for poster in posters:
+            poster.join(5)
+        assert results == [(200, {"bytes": 4, "camera": "ward"})] * 2
+
+        # Same connection, next request: keep-alive; 503 tuples get Retry-After too
+        conn.request("GET", "/status")
+        response = conn.getresponse()
+        assert response.status == 503 and json.loads(response.read())["retry_after"] == 1
+        info = server.info()
+        assert info["reused"] >= 2 and info["rejected_busy"] == 1 and info["too_large"] == 1
+        conn.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+    thread.join(5)
+    assert not thread.is_alive()
+
+
+def test_latest_frame_wins_per_camera():
+    import http.client
+    import json
+    import threading
+    import time
+
+    from camera_aioserver import AsyncCameraServer
+
+    # The loop lets one frame per client key run and the newest one wait, without holding threads
+    release = threading.Event()
+    analyzed = []
+    deadline = time.time() + 5
+    keys = {}
+
+    def detect(request):
+        analyzed.append(request.body)
+        keys[request.body] = request.coalesce_key
+        if request.body == b"frame-1":
+            release.wait(5)
+        return 200, {"frame": request.body.decode()}
+
+    server = AsyncCameraServer(("127.0.0.1", 0), workers=2, max_queue=0)
+    server.route("POST", "/detect", detect, inference=True, coalesce=lambda request: request.headers.get("X-Camera"))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    port = server.server_address[1]
+    replies = {}
+
+    def post(frame, camera="ward"):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        conn.request("POST", "/detect", body=frame, headers={"X-Camera": camera} if camera else {})
+        replies[frame] = json.loads(conn.getresponse().read())
+        conn.close()
+
+    try:
+        posters = [threading.Thread(target=post, args=(b"frame-1",))]
+        posters[0].start()
+        while analyzed != [b"frame-1"] and time.time() < deadline + 5:
+            time.sleep(0.01)
+        for frame in (b"frame-2", b"frame-3"):
+            posters.append(threading.Thread(target=post, args=(frame,)))
+            posters[-1].start()
+            time.sleep(0.1)
+        post(b"other", camera="kitchen")  # another camera is not held up
+        release.set()
+        for poster in posters:
+            poster.join(5)
+        post(b"unkeyed", camera=None)  # no key: left to the handler, not coalesced on the loop
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert replies[b"frame-2"] == {"superseded": True, "camera": "ward"}
+    assert replies[b"frame-3"] == {"frame": "frame-3"} and replies[b"other"] == {"frame": "other"}
+    assert b"frame-2" not in analyzed and server.info()["superseded"] == 1
+    assert replies[b"unkeyed"] == {"frame": "unkeyed"}
+    assert keys == {b"frame-1": "ward", b"frame-3": "ward", b"other": "kitchen", b"unkeyed": None}
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,60 @@
+"""
+Tests for camera_hints.py: capture hints that follow the server's latency.
+
+Usage:
+    python -m pytest -q test_camera_hints.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+
+def test_capture_hints_follow_latency():
+    from camera_hints import DEFAULT_INTERVAL_MS, MAX_INTERVAL_MS, MIN_INTERVAL_MS, QUALITY_LEVELS, CaptureHints, ServerLoad
+
+    load = ServerLoad()
+    load.begin()
+    load.end(300.0)
+    assert load.info() == {"in_flight": 0, "service_ms": 300.0}
+
+    # Server-bound and over target: fewer frames, same resolution
+    hints = CaptureHints(target_ms=400, load=load)
+    intervals = [hints.observe(900.0)["interval_ms"] for _ in range(20)]
+    assert intervals[0] > DEFAULT_INTERVAL_MS and intervals == sorted(intervals)
+    assert intervals[-1] == MAX_INTERVAL_MS and hints.hints()["width"] == QUALITY_LEVELS[0][0]
+
+    # Network-bound: a smaller, more compressed frame first (one step per cooldown)
+    hints = CaptureHints(target_ms=400, load=load)
+    first = hints.observe(100.0, rtt_ms=900.0)
+    assert (first["width"], first["quality"]) == QUALITY_LEVELS[1]
+    assert first["interval_ms"] == DEFAULT_INTERVAL_MS
+    second = hints.observe(100.0, rtt_ms=900.0)
+    assert second["width"] == QUALITY_LEVELS[1][0] and second["interval_ms"] > DEFAULT_INTERVAL_MS
+
+    # Back under target: resolution comes back once the cooldown has passed
+    for _ in range(10):
+        hints.observe(20.0, rtt_ms=30.0)
+    assert hints.hints()["width"] == QUALITY_LEVELS[1][0]
+    hints._level_changed = 0.0
+    hints.observe(20.0, rtt_ms=30.0)
+    assert hints.hints()["width"] == QUALITY_LEVELS[0][0]
+    # ...but never below one analysis: faster frames would only be superseded
+    assert hints.hints()["interval_ms"] == 300
+
+    fast = ServerLoad()
+    fast.begin()
+    fast.end(40.0)
+    hints = CaptureHints(target_ms=400, load=fast)
+    for _ in range(30):
+        hints.observe(60.0)
+    assert hints.hints()["interval_ms"] == MIN_INTERVAL_MS
+    assert hints.back_off()["interval_ms"] > MIN_INTERVAL_MS
+    assert hints.info()["server_ms"] is not None and hints.info()["network_ms"] is None
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
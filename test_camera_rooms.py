@@ -0,0 +1,99 @@
+"""
+Tests for camera_rooms.py: per-camera identification windows, the
+latest-frame mailbox, the room cap and idle eviction.
+
+Usage:
+    python -m pytest -q test_camera_rooms.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+
+def test_rooms_keep_identifications_and_auto_stop_per_camera():
+    import time
+
+    from camera_rooms import RoomManager
+
+    rooms = RoomManager(priorities={"kitchen": 2})
+    kitchen, hall = rooms.get("kitchen"), rooms.get("hall")
+    assert kitchen.priority == 2 and rooms.get("") is rooms.default
+    for _ in range(3):
+        kitchen.add_identifications([{"person_id": 1, "name": "Ann", "confidence": 0.9, "ts": time.time()}])
+    hall.add_identifications([{"person_id": 2, "name": "Bob", "confidence": 0.8, "ts": time.time()}])
+    assert kitchen.summarize()["name"] == "Ann" and hall.summarize()["name"] == "Bob"
+    assert [kitchen.should_auto_stop(3), kitchen.should_auto_stop(3), hall.should_auto_stop(3)] == [True, False, False]
+    rooms.reset()
+    assert kitchen.shot_counter == 0 and not kitchen.auto_stop_triggered
+
+
+def test_camera_rooms_are_capped_and_idle_ones_evicted():
+    from camera_rooms import RoomManager
+
+    evicted = []
+    rooms = RoomManager(max_rooms=3, idle_ttl=60, on_evict=evicted.append)
+    ward, hall = rooms.get("ward"), rooms.get("hall")
+    # A name beyond the cap shares the default room instead of growing memory
+    assert rooms.get("intruder-1") is rooms.default
+    assert rooms.limits_info()["redirected"] == 1 and "intruder-1" not in rooms.info()
+
+    # Only rooms unused for the TTL go, and never one with an open stream
+    hall.subscribe(lambda event: None)
+    ward.last_used -= 120
+    hall.last_used -= 120
+    assert rooms.evict_idle() == ["ward"] and evicted == [ward]
+    assert rooms.get("ward") is not ward and rooms.limits_info()["evicted"] == 1
+
+
+def test_room_is_evictable_again_once_its_monitor_ends():
+    import time
+
+    from camera_rooms import CameraRoom
+
+    room = CameraRoom("ward")
+    later = time.monotonic() + 60
+    first = room.begin_inactivity_monitor(1, "John Smith", time.time())
+    second = room.begin_inactivity_monitor(1, "John Smith", time.time())
+    assert not room.is_idle(10, now=later) and room.info()["monitoring"] == "John Smith"
+    # The cancelled monitor ending does not clear the one that replaced it
+    assert not room.end_inactivity_monitor(first) and room.identified_name == "John Smith"
+    assert room.end_inactivity_monitor(second)
+    assert room.is_idle(10, now=later) and room.info()["monitoring"] is None
+
+
+def test_frame_mailbox_lets_one_frame_run_and_the_newest_wait():
+    import threading
+    import time
+
+    from camera_rooms import FrameMailbox
+
+    # Threaded server: the room's mailbox lets one frame run and the newest one wait
+    mailbox = FrameMailbox()
+    assert mailbox.enter()
+    outcomes = {}
+
+    def wait_turn(name):
+        outcomes[name] = mailbox.enter()
+
+    second = threading.Thread(target=wait_turn, args=("second",))
+    second.start()
+    deadline = time.time() + 5
+    while not mailbox.info()["waiting"] and time.time() < deadline:
+        time.sleep(0.01)
+    third = threading.Thread(target=wait_turn, args=("third",))
+    third.start()
+    second.join(5)
+    assert outcomes == {"second": False}
+    mailbox.leave()
+    third.join(5)
+    assert outcomes == {"second": False, "third": True}
+    mailbox.leave()
+    assert mailbox.info() == {"processed": 2, "superseded": 1, "busy": False, "waiting": False}
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
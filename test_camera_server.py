@@ -0,0 +1,187 @@
+"""
+Tests for the camera server of the main programme: in-memory brightness
+correction and /detect readiness gating, run through the real 'camera' command.
+
+Usage:
+    python -m pytest -q test_camera_server.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+FRAME = np.full((240, 416, 3), 90, dtype=np.uint8)
+
+
+def load_programme():
+    # The main programme is a script with a space in its name: load it by path
+    import importlib.util
+
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "HK01 Competition 12-12-2025 main programme.py")
+    spec = importlib.util.spec_from_file_location("hk01_main_programme", path)
+    programme = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(programme)
+    return programme
+
+
+def test_frame_brightness_is_adjusted_in_memory():
+    programme = load_programme()
+    adjust = programme.adjust_frame_brightness
+
+    dark = np.full((24, 32, 3), 80, dtype=np.uint8)
+    brightened = adjust(dark)
+    assert brightened.shape == dark.shape and brightened.dtype == np.uint8
+    assert int(brightened.mean()) == 120 and int(dark.mean()) == 80  # scaled to the target, input untouched
+    # At most twice as bright, whatever the target; grayscale frames work too
+    assert int(adjust(np.full((24, 32), 20, dtype=np.uint8)).max()) == 40
+    bright = np.full((24, 32, 3), 200, dtype=np.uint8)
+    assert adjust(bright) is bright
+    assert adjust(np.zeros((24, 32, 3), dtype=np.uint8)).max() == 0
+    assert adjust(None) is None
+
+
+def test_inactivity_monitors_follow_activity_in_their_own_room(monkeypatch):
+    import time
+
+    programme = load_programme()
+    monkeypatch.setattr(programme, "INACTIVITY_TIMEOUT_SECONDS", 0.3)
+    monkeypatch.setattr(programme, "INACTIVITY_PROMPT_TIMEOUT", 0.1)
+    alerts = []
+    monkeypatch.setattr(programme, "send_panic_alert", lambda person_id, note=None: alerts.append(person_id))
+    read_fd, write_fd = os.pipe()  # nobody answers the presence check
+    monkeypatch.setattr(sys, "stdin", os.fdopen(read_fd))
+
+    ward, hall = programme.ROOMS.get("ward"), programme.ROOMS.get("hall")
+    programme.start_person_inactivity_monitor(1, "John Smith", room=ward)
+    programme.start_person_inactivity_monitor(2, "Mary Johnson", room=hall)
+    later = time.monotonic() + 3600
+    assert not ward.is_idle(60, now=later) and hall.info()["monitoring"] == "Mary Johnson"
+
+    time.sleep(0.01)
+    programme.reset_inactivity_timer(ward)
+    deadline = time.time() + 5
+    while (ward.identified_name or hall.identified_name or not alerts) and time.time() < deadline:
+        time.sleep(0.02)
+    # The ward's activity ended its monitor only; the hall's ran on to the alarm
+    assert alerts == [2]
+    assert ward.is_idle(60, now=later) and hall.is_idle(60, now=later)
+    os.close(write_fd)
+
+
+def test_detect_answers_503_until_the_detector_is_ready(monkeypatch):
+    import http.client
+    import json
+    import socket
+    import tempfile
+    import threading
+    import time
+    import webbrowser
+
+    from yoloV4.model_registry import InferencePoolBusy
+    from yoloV4.yolov4_detector import YOLOv4PersonDetector
+
+    class BusyIdentifier:
+        # Every inference context is taken when the identifier runs its crops
+        def detect_and_identify(self, path):
+            raise InferencePoolBusy("no free inference context")
+
+        def detect_and_identify_in_array(self, frame, detections=None):
+            raise InferencePoolBusy("no free inference context")
+
+    programme = load_programme()
+
+    # The 'camera' command's background preparation warms this detector up; hold it there
+    # (no weights here: the Haar cascade fallback answers)
+    warmed = threading.Event()
+    warm_up_error = {}
+    with tempfile.TemporaryDirectory() as empty_dir:
+        detector = YOLOv4PersonDetector(model_path=empty_dir, detection_cache=False)
+
+    def warm_up(runs=1):
+        warmed.wait(10)
+        if warm_up_error.get("message"):
+            raise RuntimeError(warm_up_error["message"])
+        return []
+
+    detector.warm_up = warm_up
+    programme.DETECTOR = detector
+    monkeypatch.setattr(webbrowser, "open", lambda url: True)
+    monkeypatch.setattr(sys, "argv", ["main", "--lang", "en"])
+    read_fd, write_fd = os.pipe()
+    monkeypatch.setattr(sys, "stdin", os.fdopen(read_fd))
+    commands = os.fdopen(write_fd, "w", buffering=1)
+    main = threading.Thread(target=programme.main, daemon=True)
+    main.start()
+    frame = cv2.imencode(".jpg", FRAME)[1].tobytes()
+
+    def request(port, method, path, body=None):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        headers = {"Content-Type": "image/jpeg", "X-Camera": "ward"} if body else {}
+        conn.request(method, path, body=body, headers=headers)
+        response = conn.getresponse()
+        reply = response.status, response.getheader("Retry-After"), json.loads(response.read())
+        conn.close()
+        return reply
+
+    try:
+        # A failed warm-up still serves /detect (through the fallbacks) but is reported as degraded
+        for server, error in (("asyncio", None), ("threading", "no GPU memory")):
+            warm_up_error["message"] = error
+            with socket.socket() as probe:
+                probe.bind(("127.0.0.1", 0))
+                port = probe.getsockname()[1]
+            monkeypatch.setattr(programme, "CAMERA_SERVER", server)
+            monkeypatch.setattr(programme, "CAMERA_PORT", port)
+            warmed.clear()
+            commands.write("camera\n")
+            deadline = time.time() + 10
+            while True:
+                try:
+                    status, _, payload = request(port, "GET", "/status")
+                    break
+                except ConnectionRefusedError:
+                    assert time.time() < deadline, server
+                    time.sleep(0.05)
+            assert status == 200 and payload["ready"] is False
+
+            status, retry_after, payload = request(port, "POST", "/detect", frame)
+            assert (status, retry_after) == (503, str(programme.DETECT_RETRY_AFTER)), server
+            assert payload["error"] == "warming up" and payload["retry_after"] == programme.DETECT_RETRY_AFTER
+
+            warmed.set()
+            while not programme.DETECTOR_READY.is_set() and time.time() < deadline:
+                time.sleep(0.02)
+            status, retry_after, payload = request(port, "POST", "/detect", frame)
+            assert (status, retry_after) == (200, None), server
+            assert payload["camera"] == "ward" and "detections" in payload
+            readiness = request(port, "GET", "/status")[2]["readiness"]
+            assert (readiness["state"], readiness["error"]) == (("degraded", error) if error else ("ready", None))
+
+            # Load shed while identifying is a busy answer too, not a frame analyzed without names
+            identifier, programme.IDENTIFIER = programme.IDENTIFIER, BusyIdentifier()
+            try:
+                status, retry_after, payload = request(port, "POST", "/detect", frame)
+            finally:
+                programme.IDENTIFIER = identifier
+            assert (status, retry_after, payload["error"]) == (503, str(programme.DETECT_RETRY_AFTER), "busy")
+            assert payload["hints"]["interval_ms"] > 0
+            # Identifications wait for the operator's y/n on stdin: not part of this test
+            while not programme.PENDING_CONFIRMATIONS.empty():
+                programme.PENDING_CONFIRMATIONS.get_nowait()
+            commands.write("stopcamera\n")
+    finally:
+        warmed.set()
+        commands.write("exit\n")
+        main.join(10)
+        commands.close()
+    assert not main.is_alive()
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,79 @@
+"""
+Tests for camera_stream.py: the /ws WebSocket stream of a camera room.
+
+Usage:
+    python -m pytest -q test_camera_stream.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+
+def test_stream_analyzes_only_the_newest_frame_and_pushes_room_events():
+    import json
+    import socket
+    import struct
+    import threading
+    import time
+
+    from camera_rooms import CameraRoom
+    from camera_stream import OP_BINARY, OP_CLOSE, CameraStream, accept_key
+
+    assert accept_key("dGhlIHNhbXBsZSBub25jZQ==") == "s3pPLMBiTxaQ9kYGzzhZRbK+xOo="  # RFC 6455 example
+
+    def client_frame(opcode, payload):
+        mask = b"\x01\x02\x03\x04"
+        masked = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+        return bytes([0x80 | opcode, 0x80 | len(payload)]) + mask + masked
+
+    def server_message(rfile):
+        opcode, length = rfile.read(2)
+        return opcode & 0x0F, rfile.read(length & 0x7F)
+
+    started, release = threading.Event(), threading.Event()
+    analyzed = []
+
+    def analyze(frame, room):
+        analyzed.append(bytes(frame))
+        started.set()
+        release.wait(5)
+        return 200, {"detections": {"objects": []}, "camera": room.name}
+
+    room = CameraRoom("ward")
+    client, server = socket.socketpair()
+    stream = CameraStream(server, server.makefile("rb"), room, analyze)
+    thread = threading.Thread(target=stream.serve, daemon=True)
+    thread.start()
+    replies = client.makefile("rb")
+    assert json.loads(server_message(replies)[1]) == {"type": "hello", "camera": "ward"}
+
+    client.sendall(client_frame(OP_BINARY, b"frame-1"))
+    assert started.wait(5)
+    # The detector is busy with frame 1: frames 2 and 3 wait in the one-slot mailbox, 3 replaces 2
+    client.sendall(client_frame(OP_BINARY, b"frame-2") + client_frame(OP_BINARY, b"frame-3"))
+    deadline = time.time() + 5
+    while stream.received < 3 and time.time() < deadline:
+        time.sleep(0.01)
+    assert room.publish({"type": "summary", "name": "John Smith"}) == 1
+    release.set()
+
+    messages = [json.loads(server_message(replies)[1]) for _ in range(3)]
+    assert [m["type"] for m in messages] == ["detections", "summary", "detections"]
+    assert messages[1] == {"type": "summary", "name": "John Smith", "camera": "ward"}
+    assert (messages[0]["seq"], messages[2]["seq"], messages[2]["dropped"]) == (1, 3, 1)
+    assert analyzed == [b"frame-1", b"frame-3"]
+
+    client.sendall(client_frame(OP_CLOSE, struct.pack("!H", 1000)))
+    assert server_message(replies) == (OP_CLOSE, struct.pack("!H", 1000))
+    thread.join(5)
+    assert not thread.is_alive() and room.publish({"type": "summary"}) == 0
+    client.close()
+    server.close()
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,57 @@
+"""
+Tests for camera_upload.py: the raw, multipart and JSON /detect upload forms.
+
+Usage:
+    python -m pytest -q test_camera_upload.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+FRAME = np.full((240, 416, 3), 90, dtype=np.uint8)
+
+
+def test_detect_upload_forms_yield_the_same_image():
+    import base64
+    import json
+
+    from camera_upload import UploadError, parse_detect_upload
+
+    jpeg = cv2.imencode(".jpg", FRAME)[1].tobytes()
+    data_url = "data:image/jpeg;base64," + base64.b64encode(jpeg).decode()
+    multipart = (
+        b'--xyz\r\nContent-Disposition: form-data; name="image"; filename="blob"\r\n'
+        b"Content-Type: image/jpeg\r\n\r\n" + jpeg + b'\r\n--xyz\r\nContent-Disposition: form-data; name="camera"'
+        b"\r\n\r\nkitchen\r\n--xyz--\r\n"
+    )
+    forms = [
+        ("application/json", json.dumps({"image": data_url, "camera": "kitchen"}).encode()),
+        ("image/jpeg", jpeg),
+        ("multipart/form-data; boundary=xyz", multipart),
+    ]
+    for content_type, body in forms:
+        image_bytes, fields = parse_detect_upload(content_type, body)
+        assert bytes(image_bytes) == jpeg
+        assert fields.get("camera", "kitchen") == "kitchen"
+    assert parse_detect_upload(*forms[2])[1] == {"upload": "multipart", "camera": "kitchen"}
+
+    for content_type, body, error in [
+        ("application/json", b"{", "invalid json"),
+        ("application/json", b'{"image": "data:image/jpeg;base64,abcde"}', "bad base64"),
+        ("image/jpeg", b"", "missing image data"),
+        ("multipart/form-data", multipart, "invalid multipart"),
+    ]:
+        with pytest.raises(UploadError) as info:
+            parse_detect_upload(content_type, body)
+        assert info.value.response()["error"] == error
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,89 @@
+"""
+Run detection and identification over a folder (or glob) of stored images.
+
+Images are decoded by a process pool ahead of the detector and run through
+the network in batches; results stream to a JSON lines file or a Parquet
+dataset directory in the detection_results.json layout. Interrupt and rerun
+the same command to resume: images already written are listed in
+``<output>.checkpoint``. Throughput is reported while running and at the end.
+
+Usage:
+    python tools/batch_detect.py archive/2025-12/ -o rescored.jsonl
+    python tools/batch_detect.py "archive/**/*.jpg" --recursive -o rescored.parquet --batch-size 16
+    python tools/batch_detect.py archive/ -o rescored.jsonl --variant yolov4-tiny --fresh
+"""
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from yoloV4.offline_batch import Checkpoint, find_images, open_writer, run_offline  # noqa: E402
+from yoloV4.yolov4_detector import YOLOv4MedicationDetector, YOLOv4PersonDetector  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch offline detection over image folders")
+    parser.add_argument("inputs", nargs="+", help="image files, directories or glob patterns")
+    parser.add_argument("-o", "--output", required=True, help=".jsonl file or .parquet dataset directory")
+    parser.add_argument("--format", choices=("jsonl", "parquet"), help="default: from the output extension")
+    parser.add_argument("--recursive", action="store_true", help="descend into subdirectories / ** globs")
+    parser.add_argument("--batch-size", type=int, default=8, help="images per forward pass")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1),
+                        help="decoder processes (0 = decode in the main process)")
+    parser.add_argument("--prefetch", type=int, default=0, help="decoded images in flight (default 2 batches)")
+    parser.add_argument("--checkpoint", help="default: <output>.checkpoint")
+    parser.add_argument("--fresh", action="store_true", help="ignore and remove an existing checkpoint")
+    parser.add_argument("--no-identify", action="store_true", help="detections only, skip the identifier")
+    parser.add_argument("--model-path", default=str(ROOT / "yoloV4"))
+    parser.add_argument("--variant", help="yolov4 or yolov4-tiny (default: YOLO_VARIANT)")
+    parser.add_argument("--input-size", type=int, help="network input size (default: YOLO_INPUT_SIZE)")
+    parser.add_argument("--limit", type=int, default=0, help="only the first N images")
+    args = parser.parse_args()
+
+    paths = find_images(args.inputs, recursive=args.recursive)
+    if args.limit > 0:
+        paths = paths[:args.limit]
+    if not paths:
+        parser.error("no images found in {}".format(" ".join(args.inputs)))
+
+    checkpoint_path = Path(args.checkpoint or str(args.output).rstrip("/\\") + ".checkpoint")
+    if args.fresh and checkpoint_path.exists():
+        checkpoint_path.unlink()
+    checkpoint = Checkpoint(checkpoint_path)
+    writer = open_writer(args.output, args.format)
+
+    # Stored images are not a stream: no change gate, tracking or micro-batching window
+    detector = YOLOv4PersonDetector(
+        model_path=args.model_path, variant=args.variant, input_size=args.input_size,
+        batch_window_ms=0, change_threshold=0, keyframe_interval=0,
+    )
+    identifier = None if args.no_identify else YOLOv4MedicationDetector(detector=detector)
+
+    def report(info):
+        done = info["skipped"] + info["processed"] + info["failed"]
+        print("[BATCH] {}/{} images  {:.1f} img/s  decode wait {:.1f}s".format(
+            done, info["total"], info["images_per_s"], info["decode_wait_s"]), file=sys.stderr)
+
+    print("[BATCH] {} images, {} already done".format(len(paths), sum(p in checkpoint for p in paths)), file=sys.stderr)
+    try:
+        info = run_offline(
+            paths, detector, writer, identifier=identifier, checkpoint=checkpoint,
+            batch_size=args.batch_size, workers=args.workers, prefetch=args.prefetch or None, progress=report,
+        )
+    finally:
+        # Parquet parts still buffered after an interrupt: write and checkpoint them
+        written = writer.flush()
+        if written:
+            checkpoint.mark(written)
+        writer.close()
+    info["model"] = detector.model_info()
+    info["preprocess"] = detector.preprocess_info()
+    print(json.dumps(info, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Side-by-side benchmark of the YOLO inference backends.
+
+Loads each backend:target pair from the same model folder, runs the warm-up
+pass, then times `detect_all` over the same frames and checks the person
+boxes against the first backend in the list.
+
+Usage:
+    python tools/bench_backends.py
+    python tools/bench_backends.py --specs opencv:cpu,opencv:fp16,onnxruntime:cpu --images frames/ --repeat 3
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import cv2  # noqa: E402
+
+from yoloV4.inference_backends import available_backends, get_backend  # noqa: E402
+from yoloV4.model_registry import get_model_registry  # noqa: E402
+from yoloV4.yolov4_detector import YOLOv4PersonDetector  # noqa: E402
+
+
+def load_frames(folder, count):
+    if folder:
+        frames = [cv2.imread(str(p)) for p in sorted(Path(folder).glob("*.jpg"))]
+        frames = [f for f in frames if f is not None]
+        if frames:
+            return frames
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 255, (480, 640, 3), dtype=np.uint8) for _ in range(count)]
+
+
+def person_boxes(detector, frame):
+    return [d["box"] for d in detector.detect_all(frame)["persons"]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare YOLO inference backends")
+    parser.add_argument("--model-path", default=str(ROOT / "yoloV4"))
+    parser.add_argument("--specs", default="opencv:cpu,opencv:fp16,openvino:cpu,opencv-int8:cpu,onnxruntime:cpu",
+                        help="comma separated backend:target pairs")
+    parser.add_argument("--variant", default="yolov4")
+    parser.add_argument("--size", type=int, default=416)
+    parser.add_argument("--images", help="folder of .jpg frames (default: random frames)")
+    parser.add_argument("--frames", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    frames = load_frames(args.images, args.frames)
+    print("Available: {}".format(available_backends()))
+    print("{} frames, {} @ {}".format(len(frames), args.variant, args.size))
+    print("  {:<18} {:>8} {:>10} {:>8} {:>8} {:>7} {:>10}".format(
+        "backend:target", "load ms", "warmup ms", "mean ms", "p95 ms", "fps", "same boxes"))
+
+    reference = None
+    for spec in args.specs.split(","):
+        backend, target = spec.split(":")
+        missing = [n for n in get_backend(backend).model_files(args.variant)
+                   if not (Path(args.model_path) / n).exists()]
+        if not get_backend(backend).available() or missing:
+            reason = "not installed" if not get_backend(backend).available() else "missing " + ", ".join(missing)
+            print("  {:<18} skipped ({})".format(spec, reason))
+            continue
+
+        t0 = time.perf_counter()
+        detector = YOLOv4PersonDetector(model_path=args.model_path, variant=args.variant, input_size=args.size,
+                                        backend=backend, target=target, pool_size=1,
+                                        batch_window_ms=0, process_workers=0)
+        load_ms = (time.perf_counter() - t0) * 1000.0
+        if detector.net is None:
+            print("  {:<18} failed to load".format(spec))
+            continue
+        warmup = detector.warm_up(runs=1)
+
+        times, boxes = [], []
+        for _ in range(args.repeat):
+            for frame in frames:
+                t0 = time.perf_counter()
+                boxes.append(person_boxes(detector, frame))
+                times.append((time.perf_counter() - t0) * 1000.0)
+        get_model_registry().unload(args.model_path, backend=backend, target=target)
+
+        if reference is None:
+            reference = boxes
+        same = sum(a == b for a, b in zip(boxes, reference)) / len(boxes)
+        times = np.array(times)
+        print("  {:<18} {:>8.0f} {:>10.1f} {:>8.1f} {:>8.1f} {:>7.1f} {:>9.0%}".format(
+            spec, load_ms, warmup["total_ms"], times.mean(), np.percentile(times, 95), 1000.0 / times.mean(), same))
+
+
+if __name__ == "__main__":
+    main()
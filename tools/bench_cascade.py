@@ -0,0 +1,108 @@
+"""
+Benchmark: Haar-cascade fallback (no YOLO weights) per-frame latency.
+
+Compares the old full-resolution ``detectMultiScale(gray, 1.1, 4)`` with the
+detector's fallback at different shrink widths, with and without the local
+search around the previous faces. Frames come from a folder (webcam captures)
+or, by default, a synthetic sequence of two drawn faces drifting across a
+640x480 frame, which the frontal-face cascade picks up.
+
+Usage:
+    python tools/bench_cascade.py
+    python tools/bench_cascade.py --frames captures/ --widths 480,320,240
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import cv2  # noqa: E402
+
+from yoloV4.yolov4_detector import YOLOv4PersonDetector, load_face_cascade  # noqa: E402
+
+
+def draw_face(image, cx, cy, size):
+    """A cartoon face (oval, brows, eyes, nose, mouth) the frontal-face cascade detects."""
+    cv2.ellipse(image, (cx, cy), (int(size * 0.8), size), 0, 0, 360, (150, 170, 200), -1)
+    for side in (-1, 1):
+        cv2.ellipse(image, (cx + side * int(size * 0.35), cy - int(size * 0.2)),
+                    (int(size * 0.2), int(size * 0.08)), 0, 0, 360, (30, 30, 30), -1)
+        cv2.line(image, (cx + side * int(size * 0.15), cy - int(size * 0.4)),
+                 (cx + side * int(size * 0.55), cy - int(size * 0.4)), (40, 40, 40), max(2, size // 15))
+    cv2.line(image, (cx, cy - int(size * 0.1)), (cx, cy + int(size * 0.25)), (110, 120, 150), max(2, size // 20))
+    cv2.ellipse(image, (cx, cy + int(size * 0.5)), (int(size * 0.3), int(size * 0.08)), 0, 0, 360, (60, 60, 120), -1)
+
+
+def synthetic_frames(count, width=640, height=480):
+    rng = np.random.default_rng(0)
+    frames = []
+    for i in range(count):
+        frame = np.full((height, width, 3), 200, dtype=np.uint8)
+        draw_face(frame, 200 + 2 * i, 220, 90)
+        draw_face(frame, 450 - i, 200, 70)
+        noise = rng.integers(-6, 7, frame.shape)
+        frames.append(cv2.GaussianBlur(np.clip(frame + noise, 0, 255).astype(np.uint8), (5, 5), 0))
+    return frames
+
+
+def load_frames(folder):
+    return [img for img in (cv2.imread(str(p)) for p in sorted(Path(folder).iterdir())) if img is not None]
+
+
+def time_frames(detect, frames):
+    faces, times = 0, []
+    for frame in frames:
+        t0 = time.perf_counter()
+        faces += len(detect(frame))
+        times.append((time.perf_counter() - t0) * 1000.0)
+    times = np.array(times)
+    return float(times.mean()), float(np.percentile(times, 95)), faces / len(frames)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Haar-cascade fallback")
+    parser.add_argument("--frames", help="folder of frames (default: synthetic drifting faces)")
+    parser.add_argument("--count", type=int, default=60, help="synthetic frame count")
+    parser.add_argument("--widths", default="480,320,240", help="comma separated shrink widths")
+    parser.add_argument("--full-scan-every", type=int, default=10)
+    args = parser.parse_args()
+
+    frames = load_frames(args.frames) if args.frames else synthetic_frames(args.count)
+    if not frames:
+        raise SystemExit("No frames found in {}".format(args.frames))
+    cascade = load_face_cascade()
+    if cascade is None:
+        raise SystemExit("Haar cascade not available in this OpenCV build")
+    height, width = frames[0].shape[:2]
+    print("Frames: {} at {}x{}".format(len(frames), width, height))
+    print("  {:<38} {:>9} {:>8} {:>11}".format("mode", "mean ms", "p95 ms", "faces/frame"))
+
+    def legacy(frame):
+        return cascade.detectMultiScale(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), 1.1, 4)
+
+    rows = [("full resolution (old fallback)", legacy)]
+    with tempfile.TemporaryDirectory() as empty_dir:
+        detector = YOLOv4PersonDetector(model_path=empty_dir, process_workers=0, detection_cache=False)
+    for shrink in (int(w) for w in args.widths.split(",")):
+        for every in (1, args.full_scan_every):
+            def run(frame, shrink=shrink, every=every):
+                detector.cascade_width = shrink
+                detector.cascade_full_scan_every = every
+                return detector._cascade_faces_in(frame)
+            label = "width {} {}".format(shrink, "full scan" if every == 1 else "local search, full every {}".format(every))
+            rows.append((label, run))
+
+    for label, detect in rows:
+        detector._cascade_states.clear()
+        mean_ms, p95_ms, faces = time_frames(detect, frames)
+        print("  {:<38} {:>9.2f} {:>8.2f} {:>11.2f}".format(label, mean_ms, p95_ms, faces))
+
+
+if __name__ == "__main__":
+    main()
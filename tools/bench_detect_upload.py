@@ -0,0 +1,130 @@
+"""
+Benchmark: /detect request size and server CPU per frame for each upload form.
+
+Builds the three bodies /detect accepts for the same JPEG frame (JSON with a
+base64 data URL, the raw JPEG, and a multipart form as sent by FormData) and
+reports the request size plus the CPU time the server spends turning each one
+into a decoded frame: `parse_detect_upload` followed by ``cv2.imdecode``. The
+client-side encode time is shown for reference. With ``--url`` the frames are
+also posted to a running camera server and the median round trip is shown.
+
+Usage:
+    python tools/bench_detect_upload.py
+    python tools/bench_detect_upload.py --image demo.jpg --quality 60 --count 500
+    python tools/bench_detect_upload.py --url http://127.0.0.1:8000/detect --count 50
+"""
+import argparse
+import base64
+import json
+import statistics
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import cv2  # noqa: E402
+
+from camera_upload import parse_detect_upload  # noqa: E402
+
+BOUNDARY = "----bench{}".format(int(time.time()))
+
+
+def build_bodies(jpeg):
+    """(name, content type, encode function) per upload form; each function returns the body."""
+    def as_json():
+        data_url = "data:image/jpeg;base64," + base64.b64encode(jpeg).decode("ascii")
+        return json.dumps({"image": data_url, "camera": "bench"}).encode("utf-8")
+
+    def as_raw():
+        return jpeg
+
+    def as_multipart():
+        return b"".join([
+            b"--" + BOUNDARY.encode() + b"\r\n",
+            b'Content-Disposition: form-data; name="image"; filename="blob"\r\n',
+            b"Content-Type: image/jpeg\r\n\r\n", jpeg, b"\r\n",
+            b"--" + BOUNDARY.encode() + b"\r\n",
+            b'Content-Disposition: form-data; name="camera"\r\n\r\nbench\r\n',
+            b"--" + BOUNDARY.encode() + b"--\r\n",
+        ])
+
+    return [
+        ("json (base64)", "application/json", as_json),
+        ("raw image/jpeg", "image/jpeg", as_raw),
+        ("multipart", "multipart/form-data; boundary=" + BOUNDARY, as_multipart),
+    ]
+
+
+def cpu_per_call(func, count):
+    """Mean CPU time of `func()` in microseconds."""
+    func()
+    start = time.process_time()
+    for _ in range(count):
+        func()
+    return (time.process_time() - start) * 1e6 / count
+
+
+def round_trip(url, content_type, body, count):
+    times = []
+    for _ in range(count):
+        request = urllib.request.Request(url, data=body, headers={"Content-Type": content_type})
+        start = time.perf_counter()
+        with urllib.request.urlopen(request, timeout=30) as response:
+            response.read()
+        times.append((time.perf_counter() - start) * 1000.0)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare /detect upload forms")
+    parser.add_argument("--image", help="JPEG/PNG to send (default: synthetic 416x240 frame)")
+    parser.add_argument("--quality", type=int, default=60, help="JPEG quality (Camera.html uses 0.6)")
+    parser.add_argument("--count", type=int, default=300)
+    parser.add_argument("--url", help="also post to a running server, e.g. http://127.0.0.1:8000/detect")
+    args = parser.parse_args()
+
+    if args.image:
+        frame = cv2.imread(args.image)
+        if frame is None:
+            parser.error("cannot read {}".format(args.image))
+    else:
+        # Smooth gradient plus noise: compresses roughly like a camera frame
+        rng = np.random.default_rng(0)
+        y, x = np.mgrid[0:240, 0:416]
+        frame = np.dstack([(x * 0.6) % 255, (y * 1.0) % 255, ((x + y) * 0.3) % 255]).astype(np.uint8)
+        frame = cv2.add(frame, rng.integers(0, 24, frame.shape, dtype=np.uint8))
+    ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, args.quality])
+    jpeg = buf.tobytes()
+
+    print("Frame {}x{}, JPEG q{} = {} bytes, {} runs".format(
+        frame.shape[1], frame.shape[0], args.quality, len(jpeg), args.count))
+    header = "  {:<16} {:>10} {:>8} {:>12} {:>12} {:>12}".format(
+        "form", "bytes", "vs raw", "encode us", "parse us", "parse+decode")
+    if args.url:
+        header += " {:>10}".format("RTT ms")
+    print(header)
+    for name, content_type, encode in build_bodies(jpeg):
+        body = encode()
+
+        def parse():
+            return parse_detect_upload(content_type, body)
+
+        def parse_and_decode():
+            image_bytes, _ = parse_detect_upload(content_type, body)
+            return cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+        line = "  {:<16} {:>10} {:>7.0f}% {:>12.1f} {:>12.1f} {:>12.1f}".format(
+            name, len(body), 100.0 * len(body) / len(jpeg), cpu_per_call(encode, args.count),
+            cpu_per_call(parse, args.count), cpu_per_call(parse_and_decode, args.count))
+        if args.url:
+            line += " {:>10.1f}".format(round_trip(args.url, content_type, body, args.count))
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
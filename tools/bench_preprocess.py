@@ -0,0 +1,84 @@
+"""
+Benchmark: network input preprocessing per frame.
+
+Compares the old ``cv2.dnn.blobFromImage`` call (stretches the frame and
+allocates a new float32 tensor every time) with `LetterboxBuffer`, which
+letterboxes into a preallocated canvas/blob reused across frames. Reports
+mean time, buffer allocations per frame and the peak of new allocations
+during a run according to tracemalloc.
+
+Usage:
+    python tools/bench_preprocess.py
+    python tools/bench_preprocess.py --sizes 1280x720,640x480 --input-size 608
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import cv2  # noqa: E402
+
+from yoloV4.preprocess import LetterboxBuffer, PreprocessStats  # noqa: E402
+
+
+def measure(prepare, frames):
+    """Mean ms per frame plus the tracemalloc peak of new allocations (after warm-up)."""
+    prepare(frames[0])
+    start = time.perf_counter()
+    for frame in frames:
+        prepare(frame)
+    mean_ms = (time.perf_counter() - start) * 1000.0 / len(frames)
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[1]
+    tracemalloc.reset_peak()
+    for frame in frames:
+        prepare(frame)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return mean_ms, max(0, peak - before)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark blobFromImage vs letterbox buffers")
+    parser.add_argument("--sizes", default="1280x720,640x480", help="comma separated WxH frame sizes")
+    parser.add_argument("--input-size", type=int, default=416)
+    parser.add_argument("--count", type=int, default=100)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    size = args.input_size
+    print("Input {0}x{0}, {1} frames per run".format(size, args.count))
+    print("  {:<10} {:<26} {:>8} {:>13} {:>13}".format("frame", "mode", "mean ms", "allocs/frame", "peak KB"))
+    for spec in args.sizes.split(","):
+        width, height = (int(v) for v in spec.lower().split("x"))
+        frames = [rng.integers(0, 255, (height, width, 3), dtype=np.uint8) for _ in range(args.count)]
+
+        def legacy(frame):
+            return cv2.dnn.blobFromImage(frame, 0.00392, (size, size), (0, 0, 0), True, crop=False)
+
+        stats = PreprocessStats()
+        buffer = LetterboxBuffer(size, 1, stats)
+
+        def letterbox(frame):
+            return buffer.fill([frame])
+
+        mean_ms, peak = measure(legacy, frames)
+        print("  {:<10} {:<26} {:>8.2f} {:>13.2f} {:>13.1f}".format(
+            spec, "blobFromImage (stretch)", mean_ms, 1.0, peak / 1024.0))
+        mean_ms, peak = measure(letterbox, frames)
+        snapshot = stats.snapshot()
+        print("  {:<10} {:<26} {:>8.2f} {:>13.4f} {:>13.1f}".format(
+            spec, "letterbox buffer", mean_ms, snapshot["allocations_per_frame"], peak / 1024.0))
+        for stage, values in snapshot["stages"].items():
+            print("  {:<10}   {:<24} {:>8.2f}".format("", stage, values["avg_ms"]))
+
+
+if __name__ == "__main__":
+    main()
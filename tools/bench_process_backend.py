@@ -0,0 +1,85 @@
+"""
+Benchmark: frames per second of in-process threads vs the process-pool backend.
+
+Each configuration is fed by several client threads (like concurrent /detect
+requests) that call `detect_all` on synthetic frames; the in-process run uses
+the same number of threads so the GIL contention is comparable.
+
+Usage:
+    python tools/bench_process_backend.py --workers 1,2,4 --frames 64
+    python tools/bench_process_backend.py --model-path /path/to/yoloV4 --size 640x480
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from yoloV4.model_registry import get_model_registry  # noqa: E402
+from yoloV4.yolov4_detector import YOLOv4PersonDetector  # noqa: E402
+
+
+def run_clients(detector, frames, clients):
+    """Push every frame through `detector.detect_all` from `clients` threads; returns fps."""
+    lock = threading.Lock()
+    remaining = list(range(len(frames)))
+
+    def client():
+        while True:
+            with lock:
+                if not remaining:
+                    return
+                index = remaining.pop()
+            detector.detect_all(frames[index])
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return len(frames) / (time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark YOLO worker processes")
+    parser.add_argument("--model-path", default=str(ROOT / "yoloV4"), help="folder with yolov4.weights/cfg")
+    parser.add_argument("--workers", default="1,2,4", help="comma separated worker counts")
+    parser.add_argument("--frames", type=int, default=64)
+    parser.add_argument("--size", default="416x240", help="frame WxH")
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.split("x"))
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 255, (height, width, 3), dtype=np.uint8) for _ in range(args.frames)]
+    counts = [int(c) for c in args.workers.split(",")]
+    print("CPU cores: {}  frames: {}  size: {}x{}".format(os.cpu_count(), args.frames, width, height))
+
+    for workers in counts:
+        clients = workers * 2
+        local = YOLOv4PersonDetector(model_path=args.model_path, pool_size=workers, process_workers=0)
+        if local.net is None:
+            raise SystemExit("The benchmark needs the YOLO weights in {}".format(args.model_path))
+        local.detect_all(frames[0])
+        threads_fps = run_clients(local, frames, clients)
+        get_model_registry().unload(args.model_path)
+
+        pooled = YOLOv4PersonDetector(model_path=args.model_path, process_workers=workers)
+        if pooled.process_backend is None:
+            raise SystemExit("Worker processes failed to start")
+        pooled.detect_all(frames[0])
+        procs_fps = run_clients(pooled, frames, clients)
+        pooled.release_model()
+
+        print("  workers={:<2} clients={:<2} threads {:7.1f} fps   processes {:7.1f} fps   x{:.2f}".format(
+            workers, clients, threads_fps, procs_fps, procs_fps / threads_fps))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Micro-benchmark: per-row Python YOLO decoding vs the vectorized decoder.
+
+Compares the old loop (one np.argmax / float() / list append per row) with
+`decode_yolo_outputs` + array NMS on the same network outputs and checks that
+both produce the same person boxes.
+
+Usage:
+    # record real outputs once (needs yoloV4/yolov4.weights)
+    python tools/bench_yolo_decode.py --record outs.npz --image test_person.jpg
+    # benchmark on recorded outputs
+    python tools/bench_yolo_decode.py --outputs outs.npz
+    # benchmark on synthetic outputs shaped like YOLOv4 at 608x608 (~22k rows)
+    python tools/bench_yolo_decode.py
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import cv2  # noqa: E402
+
+from yoloV4.yolov4_detector import YOLOv4PersonDetector, decode_yolo_outputs  # noqa: E402
+
+
+def legacy_decode(outs, width, height):
+    """The per-row decoder used before vectorization (person boxes + NMS)."""
+    boxes, confidences = [], []
+    for out in outs:
+        for detection in out:
+            scores = detection[5:]
+            class_id = int(np.argmax(scores))
+            if class_id != 0:
+                continue
+            confidence = float(scores[class_id])
+            if confidence <= 0.3:
+                continue
+            center_x = int(detection[0] * width)
+            center_y = int(detection[1] * height)
+            w = int(detection[2] * width)
+            h = int(detection[3] * height)
+            boxes.append([center_x - w // 2, center_y - h // 2, w, h])
+            confidences.append(confidence)
+    if not boxes:
+        return []
+    indices = np.array(cv2.dnn.NMSBoxes(boxes, confidences, 0.5, 0.4)).reshape(-1).tolist()
+    result = sorted(((confidences[i], boxes[i]) for i in indices), key=lambda x: x[0], reverse=True)[:3]
+    return [box for _, box in result]
+
+
+def vectorized_decode(outs, width, height):
+    boxes, confidences, class_ids = decode_yolo_outputs(outs, width, height, 0.3)
+    is_person = class_ids == 0
+    boxes, confidences = boxes[is_person], confidences[is_person]
+    if len(boxes) == 0:
+        return []
+    keep = np.asarray(cv2.dnn.NMSBoxes(boxes.astype(np.int32), confidences, 0.5, 0.4), dtype=np.int64).reshape(-1)
+    keep = keep[np.argsort(-confidences[keep], kind="stable")][:3]
+    return boxes[keep].tolist()
+
+
+def synthetic_outputs(seed=0, grid_sizes=(76, 38, 19), anchors=3, num_classes=80):
+    """Random outputs with YOLOv4's layout: mostly background, a few confident rows."""
+    rng = np.random.default_rng(seed)
+    outs = []
+    for g in grid_sizes:
+        n = g * g * anchors
+        out = np.zeros((n, 5 + num_classes), dtype=np.float32)
+        out[:, :4] = rng.random((n, 4), dtype=np.float32) * [1.0, 1.0, 0.3, 0.5]
+        out[:, 5:] = rng.random((n, num_classes), dtype=np.float32) * 0.05
+        hot = rng.choice(n, size=max(1, n // 200), replace=False)
+        out[hot, 5 + rng.integers(0, 3, size=len(hot))] = rng.uniform(0.3, 0.99, size=len(hot))
+        out[:, 4] = out[:, 5:].max(axis=1)
+        outs.append(out)
+    return outs
+
+
+def record_outputs(image_path, out_path, model_path):
+    detector = YOLOv4PersonDetector(model_path=model_path)
+    image = cv2.imread(image_path)
+    if detector.net is None or image is None:
+        raise SystemExit("Recording needs the YOLOv4 weights and a readable image")
+    outs = detector._forward(image)
+    height, width = image.shape[:2]
+    np.savez(out_path, *outs, width=width, height=height)
+    print("Recorded {} output layers ({} rows) to {}".format(len(outs), sum(len(o) for o in outs), out_path))
+
+
+def load_outputs(path):
+    data = np.load(path)
+    keys = sorted((k for k in data.files if k.startswith("arr_")), key=lambda k: int(k[4:]))
+    outs = [data[k] for k in keys]
+    return outs, int(data["width"]), int(data["height"])
+
+
+def bench(fn, outs, width, height, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(outs, width, height)
+        times.append(time.perf_counter() - t0)
+    return min(times) * 1000.0, float(np.median(times)) * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark YOLO output decoding")
+    parser.add_argument("--outputs", help="npz file with recorded network outputs")
+    parser.add_argument("--record", help="write recorded outputs to this npz file and exit")
+    parser.add_argument("--image", help="image used with --record")
+    parser.add_argument("--model-path", default=str(ROOT / "yoloV4"), help="folder with yolov4.weights/cfg")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.record:
+        record_outputs(args.image, args.record, args.model_path)
+        return
+
+    if args.outputs:
+        outs, width, height = load_outputs(args.outputs)
+    else:
+        outs, width, height = synthetic_outputs(), 640, 480
+
+    rows = sum(len(o) for o in outs)
+    legacy = legacy_decode(outs, width, height)
+    vectorized = vectorized_decode(outs, width, height)
+    print("Rows: {}  person boxes: legacy={} vectorized={}  identical={}".format(
+        rows, len(legacy), len(vectorized), legacy == vectorized))
+
+    for name, fn in (("legacy loop", legacy_decode), ("vectorized", vectorized_decode)):
+        best, median = bench(fn, outs, width, height, args.repeat)
+        print("  {:<12} best {:8.2f} ms   median {:8.2f} ms".format(name, best, median))
+
+
+if __name__ == "__main__":
+    main()
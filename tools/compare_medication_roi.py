@@ -0,0 +1,113 @@
+"""
+Recall / latency of the two-stage medication pass against full-frame passes.
+
+Uses the same labeled-frames layout as compare_yolo_variants.py (images plus
+darknet .txt labels). Each configuration is scored on one medication-like
+COCO class (bottle by default):
+
+    full:608   full frame at 608x608
+    full:416   full frame at 416x416
+    roi:416    full frame at 416 + hand/table crops at 416 in one batched pass
+
+Usage:
+    python tools/compare_medication_roi.py --frames labeled_frames/
+    python tools/compare_medication_roi.py --frames labeled_frames/ --class-id 41 --configs full:608,roi:320
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "tools"))
+
+import cv2  # noqa: E402
+
+from compare_yolo_variants import load_labeled_frames, match  # noqa: E402
+from yoloV4.model_registry import get_model_registry  # noqa: E402
+from yoloV4.yolov4_detector import YOLOv4PersonDetector  # noqa: E402
+
+
+def detect(detector, image, class_name):
+    """Medication candidates of one class after NMS, as (boxes, confidences)."""
+    objects = [o for o in detector._detect_all(image)["objects"] if o["class"] == class_name]
+    if not objects:
+        return np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32)
+    boxes = np.array([o["box"] for o in objects], dtype=np.float32)
+    confidences = np.array([o["confidence"] for o in objects], dtype=np.float32)
+    indices = cv2.dnn.NMSBoxes(boxes.astype(np.int32), confidences, detector.conf_threshold, detector.nms_threshold)
+    indices = np.asarray(indices, dtype=np.int64).reshape(-1)
+    return boxes[indices], confidences[indices]
+
+
+def evaluate(model_path, mode, size, frames, class_id, iou_threshold, conf_threshold):
+    detector = YOLOv4PersonDetector(
+        model_path=model_path,
+        input_size=size,
+        conf_threshold=conf_threshold,
+        pool_size=1,
+        batch_window_ms=0,
+        process_workers=0,
+        change_threshold=0,
+        keyframe_interval=0,
+        medication_roi=(mode == "roi"),
+    )
+    if detector.net is None:
+        return None
+    class_name = detector.classes[class_id]
+    detect(detector, frames[0][1], class_name)  # warm-up
+
+    tp = fp = fn = 0
+    times = []
+    for _, image, gt_boxes in frames:
+        t0 = time.perf_counter()
+        boxes, confidences = detect(detector, image, class_name)
+        times.append(time.perf_counter() - t0)
+        a, b, c = match(boxes, confidences, gt_boxes, iou_threshold)
+        tp, fp, fn = tp + a, fp + b, fn + c
+    get_model_registry().unload(model_path)
+
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    times_ms = np.array(times) * 1000.0
+    return {
+        "class": class_name,
+        "precision": precision,
+        "recall": recall,
+        "mean_ms": float(times_ms.mean()),
+        "p95_ms": float(np.percentile(times_ms, 95)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the ROI medication pass with full-frame passes")
+    parser.add_argument("--frames", required=True, help="folder with images and darknet .txt labels")
+    parser.add_argument("--model-path", default=str(ROOT / "yoloV4"), help="folder with the cfg/weights files")
+    parser.add_argument("--configs", default="full:608,full:416,roi:416,roi:320",
+                        help="comma separated mode:size pairs (mode is full or roi)")
+    parser.add_argument("--class-id", type=int, default=39, help="COCO class to score (39 = bottle)")
+    parser.add_argument("--iou", type=float, default=0.5)
+    parser.add_argument("--conf", type=float, default=0.3)
+    args = parser.parse_args()
+
+    frames = load_labeled_frames(args.frames, args.class_id)
+    if not frames:
+        raise SystemExit("No labeled frames found in {}".format(args.frames))
+    print("Frames: {}  labeled objects: {}".format(len(frames), sum(len(f[2]) for f in frames)))
+    print("  {:<6} {:>5} {:>9} {:>7} {:>9} {:>8}".format("mode", "size", "precision", "recall", "mean ms", "p95 ms"))
+
+    for config in args.configs.split(","):
+        mode, size = config.split(":")
+        result = evaluate(args.model_path, mode, int(size), frames, args.class_id, args.iou, args.conf)
+        if result is None:
+            print("  {:<6} {:>5}   (model files missing, skipped)".format(mode, size))
+            continue
+        print("  {:<6} {:>5} {:>9.3f} {:>7.3f} {:>9.1f} {:>8.1f}".format(
+            mode, size, result["precision"], result["recall"], result["mean_ms"], result["p95_ms"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Accuracy / latency comparison of YOLO variants and input sizes on labeled frames.
+
+The frames folder holds images plus darknet-style label files with the same
+stem (``frame_001.jpg`` + ``frame_001.txt``), one object per line:
+
+    <class_id> <center_x> <center_y> <width> <height>     # all normalized to 0..1
+
+For every configuration the script runs forward + decode + NMS on each frame,
+matches the detected boxes of one class (person by default) to the labels at
+IoU >= 0.5 and reports precision / recall / F1 next to the latency.
+
+Usage:
+    python tools/compare_yolo_variants.py --frames labeled_frames/
+    python tools/compare_yolo_variants.py --frames labeled_frames/ --configs yolov4:608,yolov4:416,yolov4-tiny:320
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import cv2  # noqa: E402
+
+from yoloV4.model_registry import get_model_registry  # noqa: E402
+from yoloV4.yolov4_detector import YOLOv4PersonDetector, decode_yolo_outputs  # noqa: E402
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp"}
+
+
+def load_labeled_frames(folder, class_id):
+    """Return [(path, image, gt_boxes)] with ground-truth boxes as pixel [x, y, w, h]."""
+    frames = []
+    for path in sorted(Path(folder).iterdir()):
+        if path.suffix.lower() not in IMAGE_SUFFIXES:
+            continue
+        label_file = path.with_suffix(".txt")
+        image = cv2.imread(str(path))
+        if image is None or not label_file.exists():
+            continue
+        height, width = image.shape[:2]
+        boxes = []
+        for line in label_file.read_text(encoding="utf-8").splitlines():
+            parts = line.split()
+            if len(parts) < 5 or int(parts[0]) != class_id:
+                continue
+            cx, cy, w, h = (float(v) for v in parts[1:5])
+            boxes.append([(cx - w / 2) * width, (cy - h / 2) * height, w * width, h * height])
+        frames.append((path, image, np.array(boxes, dtype=np.float32).reshape(-1, 4)))
+    return frames
+
+
+def iou(box, boxes):
+    x1 = np.maximum(box[0], boxes[:, 0])
+    y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[0] + box[2], boxes[:, 0] + boxes[:, 2])
+    y2 = np.minimum(box[1] + box[3], boxes[:, 1] + boxes[:, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    union = box[2] * box[3] + boxes[:, 2] * boxes[:, 3] - inter
+    return inter / np.maximum(union, 1e-9)
+
+
+def match(pred_boxes, pred_conf, gt_boxes, iou_threshold):
+    """Greedy matching by confidence; returns (tp, fp, fn)."""
+    unmatched = np.ones(len(gt_boxes), dtype=bool)
+    tp = 0
+    for i in np.argsort(-pred_conf):
+        if not unmatched.any():
+            break
+        overlaps = iou(pred_boxes[i], gt_boxes)
+        overlaps[~unmatched] = 0
+        best = int(np.argmax(overlaps))
+        if overlaps[best] >= iou_threshold:
+            unmatched[best] = False
+            tp += 1
+    return tp, len(pred_boxes) - tp, int(unmatched.sum())
+
+
+def detect(detector, image, class_id):
+    """Forward + decode + NMS without the cascade/simulated fallbacks of detect_all."""
+    height, width = image.shape[:2]
+    outs = detector._forward(image)
+    boxes, confidences, class_ids = decode_yolo_outputs(
+        outs, width, height, detector.conf_threshold, letterbox=detector.input_size if detector.letterbox else None
+    )
+    keep = class_ids == class_id
+    boxes, confidences = boxes[keep], confidences[keep]
+    if len(boxes) == 0:
+        return boxes.astype(np.float32), confidences
+    indices = cv2.dnn.NMSBoxes(boxes.astype(np.int32), confidences, detector.score_threshold, detector.nms_threshold)
+    indices = np.asarray(indices, dtype=np.int64).reshape(-1)
+    return boxes[indices].astype(np.float32), confidences[indices]
+
+
+def evaluate(model_path, variant, size, frames, class_id, iou_threshold, conf_threshold):
+    detector = YOLOv4PersonDetector(
+        model_path=model_path,
+        variant=variant,
+        input_size=size,
+        conf_threshold=conf_threshold,
+        pool_size=1,
+        batch_window_ms=0,
+        process_workers=0,
+    )
+    if detector.net is None:
+        return None
+    detect(detector, frames[0][1], class_id)  # warm-up
+
+    tp = fp = fn = 0
+    times = []
+    for _, image, gt_boxes in frames:
+        t0 = time.perf_counter()
+        boxes, confidences = detect(detector, image, class_id)
+        times.append(time.perf_counter() - t0)
+        a, b, c = match(boxes, confidences, gt_boxes, iou_threshold)
+        tp, fp, fn = tp + a, fp + b, fn + c
+    get_model_registry().unload(model_path, variant=variant)
+
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    times_ms = np.array(times) * 1000.0
+    return {
+        "precision": precision,
+        "recall": recall,
+        "f1": 2 * precision * recall / (precision + recall) if precision + recall else 0.0,
+        "mean_ms": float(times_ms.mean()),
+        "p95_ms": float(np.percentile(times_ms, 95)),
+        "fps": 1000.0 / float(times_ms.mean()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare YOLO variants / input sizes on labeled frames")
+    parser.add_argument("--frames", required=True, help="folder with images and darknet .txt labels")
+    parser.add_argument("--model-path", default=str(ROOT / "yoloV4"), help="folder with the cfg/weights files")
+    parser.add_argument("--configs", default="yolov4:608,yolov4:416,yolov4:320,yolov4-tiny:416,yolov4-tiny:320",
+                        help="comma separated variant:size pairs")
+    parser.add_argument("--class-id", type=int, default=0, help="COCO class to score (0 = person)")
+    parser.add_argument("--iou", type=float, default=0.5)
+    parser.add_argument("--conf", type=float, default=0.3)
+    args = parser.parse_args()
+
+    frames = load_labeled_frames(args.frames, args.class_id)
+    if not frames:
+        raise SystemExit("No labeled frames found in {}".format(args.frames))
+    print("Frames: {}  labeled objects: {}".format(len(frames), sum(len(f[2]) for f in frames)))
+    print("  {:<12} {:>5} {:>9} {:>7} {:>6} {:>9} {:>8} {:>7}".format(
+        "variant", "size", "precision", "recall", "F1", "mean ms", "p95 ms", "fps"))
+
+    for config in args.configs.split(","):
+        variant, size = config.split(":")
+        result = evaluate(args.model_path, variant, int(size), frames, args.class_id, args.iou, args.conf)
+        if result is None:
+            print("  {:<12} {:>5}   (model files missing, skipped)".format(variant, size))
+            continue
+        print("  {:<12} {:>5} {:>9.3f} {:>7.3f} {:>6.3f} {:>9.1f} {:>8.1f} {:>7.1f}".format(
+            variant, size, result["precision"], result["recall"], result["f1"],
+            result["mean_ms"], result["p95_ms"], result["fps"]))
+
+
+if __name__ == "__main__":
+    main()
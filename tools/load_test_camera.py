@@ -0,0 +1,265 @@
+"""
+Load test: simulated cameras posting frames to a running camera server.
+
+Each simulated camera is a thread with its own keep-alive connection that
+posts a raw JPEG to /detect every ``--interval`` seconds (Camera.html uses
+0.25; 0 posts the next frame as soon as the answer arrives), tagged with its
+own X-Camera room. With ``--open-loop`` a camera fires every interval whether
+or not its previous frame was answered, like the page's setInterval, on up to
+six connections (a browser's per-host limit). For every concurrency level the tool reports the analyzed
+frames per second and the latency percentiles of those responses, plus how
+many frames were superseded by the camera's next frame (CAMERA_COALESCE),
+refused with 503 (busy / queue full) or failed. With ``--follow-hints`` a
+camera behaves like Camera.html does with the server's capture hints: it
+reports its round trip (X-Frame-RTT) and switches to the suggested interval
+(frames are not re-encoded at the suggested width/quality); the report then
+adds the mean interval the cameras ended up using.
+
+Frames come from ``--frames`` (a folder of JPEGs) or are synthesized: a
+moving block over noise, so the change gate and the detection cache see
+different frames like they would from a live camera.
+
+Start the server first (``camera`` command; set CAMERA_SERVER=threading to
+measure the http.server implementation instead).
+
+Usage:
+    python tools/load_test_camera.py
+    python tools/load_test_camera.py --cameras 1,8,32 --duration 20 --interval 0
+    python tools/load_test_camera.py --cameras 8 --interval 0.05 --open-loop
+    python tools/load_test_camera.py --cameras 1,4,16 --open-loop --follow-hints
+    python tools/load_test_camera.py --url http://127.0.0.1:8000 --frames demo_recordings/
+"""
+import argparse
+import glob
+import http.client
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import cv2  # noqa: E402
+
+
+def load_frames(folder, count=30, quality=60):
+    """Encoded JPEG frames from `folder`, or `count` synthetic 416x240 frames."""
+    if folder:
+        paths = sorted(p for p in glob.glob(os.path.join(folder, "*")) if p.lower().endswith((".jpg", ".jpeg")))
+        if not paths:
+            raise SystemExit("no .jpg frames in {}".format(folder))
+        return [Path(p).read_bytes() for p in paths]
+    rng = np.random.default_rng(0)
+    frames = []
+    for i in range(count):
+        frame = rng.integers(40, 90, (240, 416, 3), dtype=np.uint8)
+        x = 20 + (i * 11) % 300
+        cv2.rectangle(frame, (x, 60), (x + 80, 220), (180, 160, 150), -1)
+        frames.append(cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes())
+    return frames
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(q / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class Camera(threading.Thread):
+    """One simulated camera: post, wait for the answer, sleep out the rest of the interval."""
+
+    def __init__(self, name, host, port, frames, interval, deadline, offset=0, open_loop=False, follow_hints=False):
+        super().__init__(name=name, daemon=True)
+        self.open_loop = open_loop
+        self.follow_hints = follow_hints
+        self.rtt_ms = None
+        self._lock = threading.Lock()
+        self.host = host
+        self.port = port
+        self.frames = frames
+        self.interval = interval
+        self.deadline = deadline
+        self.offset = offset
+        self.latencies = []
+        self.superseded = 0
+        self.busy = 0
+        self.errors = 0
+        self.connections = 0
+
+    def _connect(self):
+        self.connections += 1
+        return http.client.HTTPConnection(self.host, self.port, timeout=30)
+
+    def _count(self, name, value=None):
+        with self._lock:
+            if name == "latencies":
+                self.latencies.append(value)
+            else:
+                setattr(self, name, getattr(self, name) + 1)
+
+    def _post(self, conn, frame):
+        """Post one frame and count the outcome; returns the connection to use next."""
+        started = time.perf_counter()
+        headers = {"Content-Type": "image/jpeg", "X-Camera": self.name}
+        if self.follow_hints and self.rtt_ms:
+            headers["X-Frame-RTT"] = str(int(self.rtt_ms))
+        try:
+            conn.request("POST", "/detect", body=frame, headers=headers)
+            response = conn.getresponse()
+            body = response.read()
+            elapsed = (time.perf_counter() - started) * 1000.0
+            if self.follow_hints:
+                self._apply_hints(body, elapsed if response.status == 200 else None)
+            if response.status == 200 and body.startswith(b'{"superseded": true'):
+                self._count("superseded")
+            elif response.status == 200:
+                self._count("latencies", elapsed)
+            elif response.status == 503:
+                self._count("busy")
+            else:
+                self._count("errors")
+            if response.getheader("Connection", "").lower() != "close":
+                return conn
+        except (OSError, http.client.HTTPException):
+            self._count("errors")
+        conn.close()
+        with self._lock:
+            return self._connect()
+
+    def _apply_hints(self, body, rtt_ms):
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return
+        hints = payload.get("hints") if isinstance(payload, dict) else None
+        if rtt_ms is not None and not payload.get("superseded"):
+            self.rtt_ms = rtt_ms
+        if hints and hints.get("interval_ms"):
+            self.interval = hints["interval_ms"] / 1000.0
+
+    def run(self):
+        if self.open_loop:
+            self._run_open_loop()
+            return
+        conn = self._connect()
+        i = self.offset
+        while time.perf_counter() < self.deadline:
+            started = time.perf_counter()
+            conn = self._post(conn, self.frames[i % len(self.frames)])
+            i += 1
+            if self.interval > 0:
+                time.sleep(max(0.0, self.interval - (time.perf_counter() - started)))
+        conn.close()
+
+    def _run_open_loop(self):
+        idle = [self._connect() for _ in range(6)]
+        slots = threading.Semaphore(len(idle))
+        pending = []
+
+        def send(frame):
+            conn = idle.pop()
+            try:
+                idle.append(self._post(conn, frame))
+            finally:
+                slots.release()
+
+        i = self.offset
+        next_at = time.perf_counter()
+        while time.perf_counter() < self.deadline:
+            # Like fetch(): the request waits for a free connection, the timer does not
+            if slots.acquire(timeout=max(0.0, self.deadline - time.perf_counter())):
+                thread = threading.Thread(target=send, args=(self.frames[i % len(self.frames)],), daemon=True)
+                thread.start()
+                pending.append(thread)
+            i += 1
+            next_at += max(self.interval, 0.001)
+            time.sleep(max(0.0, next_at - time.perf_counter()))
+        for thread in pending:
+            thread.join()
+        for conn in idle:
+            conn.close()
+
+
+def run_level(host, port, frames, cameras, duration, interval, open_loop=False, follow_hints=False):
+    deadline = time.perf_counter() + duration
+    threads = [Camera("load-{}".format(n), host, port, frames, interval, deadline, offset=n * 7, open_loop=open_loop,
+                      follow_hints=follow_hints)
+               for n in range(cameras)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    latencies = sorted(ms for thread in threads for ms in thread.latencies)
+    return {
+        "cameras": cameras,
+        "ok": len(latencies),
+        "superseded": sum(t.superseded for t in threads),
+        "busy": sum(t.busy for t in threads),
+        "errors": sum(t.errors for t in threads),
+        "connections": sum(t.connections for t in threads),
+        "frames_per_s": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies), 1) if latencies else None,
+        "p95_ms": round(percentile(latencies, 95), 1) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99), 1) if latencies else None,
+        "max_ms": round(latencies[-1], 1) if latencies else None,
+        "interval_ms": round(1000.0 * statistics.mean(t.interval for t in threads)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulated-camera load test for the camera server")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="camera server base URL")
+    parser.add_argument("--cameras", default="1,8,32", help="comma separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per level")
+    parser.add_argument("--interval", type=float, default=0.25, help="seconds between a camera's frames (0 = back to back)")
+    parser.add_argument("--open-loop", action="store_true", help="post every interval without waiting for answers")
+    parser.add_argument("--follow-hints", action="store_true", help="use the interval suggested in the answers' hints")
+    parser.add_argument("--frames", help="folder of JPEG frames (default: synthetic 416x240 frames)")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    parts = urlsplit(args.url)
+    host, port = parts.hostname or "127.0.0.1", parts.port or 80
+    frames = load_frames(args.frames)
+    try:
+        conn = http.client.HTTPConnection(host, port, timeout=10)
+        conn.request("GET", "/status")
+        status = json.loads(conn.getresponse().read())
+        conn.close()
+    except (OSError, ValueError) as e:
+        raise SystemExit("camera server not reachable at {}: {}".format(args.url, e))
+    if not status.get("ready", True):
+        print("[LOAD] detector still warming up; early frames will get 503", file=sys.stderr)
+    server = (status.get("server") or {}).get("impl", "threading")
+
+    results = []
+    if not args.json:
+        print("Server {} ({}), {} frames of ~{} bytes, interval {} s{}{}, {} s per level".format(
+            args.url, server, len(frames), len(frames[0]), args.interval,
+            " open loop" if args.open_loop else "", " following hints" if args.follow_hints else "", args.duration))
+        print("  {:>7} {:>7} {:>6} {:>6} {:>6} {:>6} {:>9} {:>8} {:>8} {:>8} {:>8} {:>9}".format(
+            "cameras", "ok", "supers", "busy", "errors", "conns", "frames/s", "p50 ms", "p95 ms", "p99 ms", "max ms",
+            "interval"))
+    for cameras in [int(c) for c in args.cameras.split(",") if c.strip()]:
+        result = run_level(host, port, frames, cameras, args.duration, args.interval, args.open_loop, args.follow_hints)
+        results.append(result)
+        if not args.json:
+            print("  {cameras:>7} {ok:>7} {superseded:>6} {busy:>6} {errors:>6} {connections:>6} {frames_per_s:>9} "
+                  "{p50_ms!s:>8} {p95_ms!s:>8} {p99_ms!s:>8} {max_ms!s:>8} {interval_ms:>9}".format(**result))
+    if args.json:
+        print(json.dumps({"server": server, "interval": args.interval, "open_loop": args.open_loop,
+                          "follow_hints": args.follow_hints, "levels": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -8,3 +8,12 @@ try:
     from .yolov4_demo import YOLOv4Detector, YOLOv4withML
 except Exception:
     pass
+try:
+    from .model_registry import InferencePoolBusy, ModelRegistry, get_model_registry
+    from .inference_backends import available_backends, get_backend
+    from .batch_scheduler import BatchScheduler
+    from .detection_cache import DetectionCache, get_detection_cache
+    from .video_source import FrameRing, VideoSource
+    from .fair_queue import FairQueue, inference_client
+except Exception:
+    pass
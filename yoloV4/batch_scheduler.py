@@ -0,0 +1,231 @@
+"""
+Micro-batching scheduler for YOLO forward passes.
+
+Frames posted by several cameras at the same time are collected for a short
+window (or until `max_batch` frames are waiting), turned into one NCHW blob
+with `cv2.dnn.blobFromImages` and pushed through the network in a single
+forward call. Each caller gets back the raw outputs for its own frame and
+decodes them in its own thread. Waiting frames are taken per camera in fair
+order (priority, then round-robin; see fair_queue.py), so a batch is shared
+between cameras instead of being filled by whichever one posts fastest.
+"""
+
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import cv2  # type: ignore
+except Exception:  # pragma: no cover - OpenCV may be missing in some environments
+    cv2 = None  # type: ignore
+
+try:
+    from .fair_queue import FairQueue, current_client
+    from .model_registry import InferencePoolBusy
+except ImportError:  # executed as a script from inside yoloV4/
+    from fair_queue import FairQueue, current_client  # type: ignore
+    from model_registry import InferencePoolBusy  # type: ignore
+
+LOGGER = logging.getLogger(__name__)
+
+# Client of the stop marker; served after every queued frame
+_STOP_CLIENT = "__stop__"
+_STOP_PRIORITY = -(1 << 30)
+
+
+class _PendingFrame:
+    __slots__ = ("image", "enqueued", "done", "outs", "error")
+
+    def __init__(self, image: Any) -> None:
+        self.image = image
+        self.enqueued = time.perf_counter()
+        self.done = threading.Event()
+        self.outs: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class BatchStats:
+    """Counters for the batches run so far plus a window of recent batches."""
+
+    def __init__(self, history: int = 100) -> None:
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.frames = 0
+        self.expired = 0
+        self.failed = 0
+        self.sizes: Dict[int, int] = {}
+        self.recent: "deque[Dict[str, float]]" = deque(maxlen=history)
+
+    def record(self, size: int, wait_ms: float, forward_ms: float) -> None:
+        with self._lock:
+            self.batches += 1
+            self.frames += size
+            self.sizes[size] = self.sizes.get(size, 0) + 1
+            self.recent.append({"size": size, "wait_ms": wait_ms, "forward_ms": forward_ms})
+
+    def add(self, name: str, count: int = 1) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + count)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            recent = list(self.recent)
+            data: Dict[str, Any] = {
+                "batches": self.batches,
+                "frames": self.frames,
+                "expired": self.expired,
+                "failed": self.failed,
+                "avg_batch_size": round(self.frames / self.batches, 2) if self.batches else 0.0,
+                "batch_sizes": dict(sorted(self.sizes.items())),
+            }
+        if recent:
+            data["recent_avg_wait_ms"] = round(sum(r["wait_ms"] for r in recent) / len(recent), 2)
+            data["recent_avg_forward_ms"] = round(sum(r["forward_ms"] for r in recent) / len(recent), 2)
+            data["last_batch"] = {k: round(v, 2) for k, v in recent[-1].items()}
+        return data
+
+
+class BatchScheduler:
+    """Collects frames from concurrent callers and runs them as one batch.
+
+    `run_batch(blob)` performs the forward pass on an NCHW blob and returns the
+    network outputs; `workers` batches can be in flight at once (use the size
+    of the inference pool). A frame that has waited longer than
+    `max_latency_ms` before its batch starts is failed with
+    `InferencePoolBusy` so the HTTP layer can shed it. `make_blob(images)`
+    replaces the default stretching `blobFromImages` (e.g. letterboxing into a
+    reusable buffer); it is called on the worker thread that runs the batch.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[Any], Any],
+        window_ms: float = 20.0,
+        max_batch: int = 8,
+        max_latency_ms: float = 250.0,
+        workers: int = 1,
+        input_size: tuple = (416, 416),
+        make_blob: Optional[Callable[[List[Any]], Any]] = None,
+    ) -> None:
+        self.run_batch = run_batch
+        self.make_blob = make_blob
+        self.max_latency_ms = float(max_latency_ms)
+        # The collection window can never be longer than the latency budget
+        self.window_ms = min(float(window_ms), self.max_latency_ms)
+        self.max_batch = max(1, int(max_batch))
+        self.input_size = input_size
+        self.stats = BatchStats()
+        self._queue = FairQueue()
+        self._stopped = threading.Event()
+        self._threads: List[threading.Thread] = []
+        for i in range(max(1, int(workers))):
+            thread = threading.Thread(target=self._worker, name="yolo-batch-{}".format(i), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def forward(self, image: Any, timeout: Optional[float] = None) -> Any:
+        """Queue `image` and block until its outputs (list of arrays) are ready."""
+        if self._stopped.is_set():
+            raise RuntimeError("batch scheduler is closed")
+        pending = _PendingFrame(image)
+        client, priority = current_client()
+        self._queue.put(pending, client, priority)
+        if timeout is None:
+            timeout = self.max_latency_ms / 1000.0 + 30.0
+        if not pending.done.wait(timeout):
+            raise InferencePoolBusy("batched forward pass timed out")
+        if pending.error is not None:
+            raise pending.error
+        return pending.outs
+
+    def _collect(self, first: _PendingFrame) -> List[_PendingFrame]:
+        batch = [first]
+        deadline = time.perf_counter() + self.window_ms / 1000.0
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Pass the stop marker on to the next worker
+                self._queue.put(None, _STOP_CLIENT, _STOP_PRIORITY)
+                break
+            batch.append(item)
+        return batch
+
+    def _worker(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                self._queue.put(None, _STOP_CLIENT, _STOP_PRIORITY)
+                return
+            batch = self._collect(first)
+
+            started = time.perf_counter()
+            live = []
+            for item in batch:
+                if (started - item.enqueued) * 1000.0 > self.max_latency_ms:
+                    item.error = InferencePoolBusy("frame waited longer than {:.0f} ms".format(self.max_latency_ms))
+                    item.done.set()
+                    self.stats.add("expired")
+                else:
+                    live.append(item)
+            if not live:
+                continue
+
+            try:
+                images = [item.image for item in live]
+                if self.make_blob is not None:
+                    blob = self.make_blob(images)
+                else:
+                    blob = cv2.dnn.blobFromImages(  # type: ignore[union-attr]
+                        images, 0.00392, self.input_size, (0, 0, 0), True, crop=False
+                    )
+                outs = self.run_batch(blob)
+                forward_ms = (time.perf_counter() - started) * 1000.0
+                for index, item in enumerate(live):
+                    # Batched outputs are (B, rows, 85); a batch of one comes back as (rows, 85)
+                    item.outs = [out[index] if out.ndim == 3 else out for out in outs]
+                wait_ms = sum((started - item.enqueued) * 1000.0 for item in live) / len(live)
+                self.stats.record(len(live), wait_ms, forward_ms)
+            except Exception as exc:  # hand every failure back to the waiting callers
+                LOGGER.warning("Batched forward pass failed for %d frames: %s", len(live), exc)
+                self.stats.add("failed", len(live))
+                for item in live:
+                    item.error = exc
+            finally:
+                for item in live:
+                    item.done.set()
+
+    def close(self) -> None:
+        """Stop the worker threads; frames already queued are still processed."""
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._queue.put(None, _STOP_CLIENT, _STOP_PRIORITY)
+
+    def forget(self, client: Any) -> None:
+        """Drop the queue entry of a client (camera) that is gone."""
+        self._queue.forget(client)
+
+    def info(self) -> Dict[str, Any]:
+        data = {
+            "window_ms": self.window_ms,
+            "max_batch": self.max_batch,
+            "max_latency_ms": self.max_latency_ms,
+            "workers": len(self._threads),
+            "queued": self._queue.qsize(),
+            "clients": {
+                str(client): data for client, data in self._queue.info().items() if client != _STOP_CLIENT
+            },
+        }
+        data.update(self.stats.snapshot())
+        return data
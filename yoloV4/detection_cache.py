@@ -0,0 +1,148 @@
+"""
+LRU cache of decoded detections keyed by frame content.
+
+The same frame often reaches the detector more than once: `/detect` runs the
+person detector and the identifier on one frame, clients retry after a
+timeout and the demo scripts replay the same images. Entries are keyed by a
+fast content hash of the encoded bytes or the decoded pixels plus the model
+configuration, so a different variant, input size or threshold never sees
+another configuration's result. Streams with a change gate or tracking skip
+the cache: those stages already catch repeated frames.
+
+The cache holds at most `max_entries` results and `max_bytes` of (estimated)
+result size; entries older than `ttl` seconds are dropped on access. Hashing
+uses xxhash when it is installed and BLAKE2b otherwise.
+
+Configure with ``YOLO_CACHE_ENTRIES`` (0 disables it), ``YOLO_CACHE_MB`` and
+``YOLO_CACHE_TTL``.
+"""
+
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+try:
+    import xxhash  # type: ignore
+except Exception:  # optional dependency
+    xxhash = None  # type: ignore
+
+CACHE_ENTRIES = int(os.environ.get("YOLO_CACHE_ENTRIES", "256"))
+CACHE_MB = float(os.environ.get("YOLO_CACHE_MB", "8"))
+CACHE_TTL = float(os.environ.get("YOLO_CACHE_TTL", "30"))
+
+
+def content_hash(data: Any) -> str:
+    """Hex digest of encoded image bytes or of a decoded frame (shape and dtype included)."""
+    shape = getattr(data, "shape", None)
+    if shape is not None:
+        prefix = "{}:{}:".format(tuple(shape), data.dtype).encode("ascii")
+        buf = memoryview(data if data.flags["C_CONTIGUOUS"] else data.copy()).cast("B")
+    else:
+        prefix, buf = b"", memoryview(data)
+    if xxhash is not None:
+        h = xxhash.xxh3_128()
+    else:
+        h = hashlib.blake2b(digest_size=16)
+    h.update(prefix)
+    h.update(buf)
+    return h.hexdigest()
+
+
+class DetectionCache:
+    """Thread-safe, size-capped LRU of detection results with a TTL."""
+
+    def __init__(self, max_entries: int = CACHE_ENTRIES, max_bytes: int = int(CACHE_MB * 1024 * 1024), ttl: float = CACHE_TTL) -> None:
+        self.max_entries = int(max_entries)
+        self.max_bytes = int(max_bytes)
+        self.ttl = float(ttl)
+        self._lock = threading.Lock()
+        # key -> (stored_at, size, result)
+        self._entries: "OrderedDict[Hashable, Tuple[float, int, Any]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return a copy of the cached result for `key`, or None."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl:
+                self._drop(key)
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            result = entry[2]
+        # Callers annotate the returned dicts, so never hand out the stored object
+        return copy.deepcopy(result)
+
+    def put(self, key: Hashable, result: Any) -> None:
+        if not self.enabled:
+            return
+        try:
+            size = len(json.dumps(result, default=str))
+        except Exception:
+            return
+        if size > self.max_bytes:
+            return
+        stored = copy.deepcopy(result)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic(), size, stored)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key: Hashable) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def info(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "hash": "xxh3_128" if xxhash is not None else "blake2b",
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "kb": round(self._bytes / 1024, 1),
+                "max_kb": round(self.max_bytes / 1024, 1),
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expired": self.expired,
+            }
+
+
+DETECTION_CACHE = DetectionCache()
+
+
+def get_detection_cache() -> DetectionCache:
+    return DETECTION_CACHE
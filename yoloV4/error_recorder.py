@@ -0,0 +1,204 @@
+"""
+Deduplicating, non-blocking error log for the detection hot path.
+
+A misconfigured backend fails on every frame. Appending the full traceback to
+``detect_error.log`` from the request thread each time turns one broken
+setting into a file open/write/close per frame. `ErrorRecorder.record` instead:
+
+* computes a signature of the failure (exception type plus the file,
+  function and line of every frame, not the message) and counts it;
+* queues the traceback for the log file only the first time a signature is
+  seen and then at most once every `min_interval` seconds, noting how many
+  repeats were not written;
+* leaves formatting and file I/O to a background thread; when the bounded
+  queue is full the entry is dropped (and counted) rather than waited for.
+
+`info()` (shown under ``errors`` in the camera server's /status) lists the
+counts per signature. Configure with ``YOLO_ERROR_LOG_INTERVAL`` (seconds)
+and ``YOLO_ERROR_QUEUE``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+LOGGER = logging.getLogger(__name__)
+
+ERROR_LOG_INTERVAL = float(os.environ.get("YOLO_ERROR_LOG_INTERVAL", "60"))
+ERROR_QUEUE_SIZE = int(os.environ.get("YOLO_ERROR_QUEUE", "256"))
+# Signatures listed by info(), most frequent first
+ERROR_INFO_TOP = 20
+
+
+def traceback_signature(exc: BaseException) -> str:
+    """Short hash of the exception type and the code locations it went through."""
+    parts = [type(exc).__module__ + "." + type(exc).__qualname__]
+    tb = exc.__traceback__
+    while tb is not None:
+        # Walk the frames directly: traceback.extract_tb would read source lines
+        code = tb.tb_frame.f_code
+        parts.append("{}:{}:{}".format(os.path.basename(code.co_filename), code.co_name, tb.tb_lineno))
+        tb = tb.tb_next
+    return hashlib.blake2b("|".join(parts).encode("utf-8"), digest_size=6).hexdigest()
+
+
+class _Signature:
+    __slots__ = ("kind", "type", "message", "count", "first_seen", "last_seen", "last_written", "unwritten")
+
+    def __init__(self, kind: str, exc: BaseException, now: float) -> None:
+        self.kind = kind
+        self.type = type(exc).__name__
+        self.message = ""
+        self.count = 0
+        self.first_seen = now
+        self.last_seen = now
+        self.last_written: Optional[float] = None
+        # Occurrences since the traceback was last queued for the file
+        self.unwritten = 0
+
+
+class ErrorRecorder:
+    """Counts failures by traceback signature and writes new ones from a background thread."""
+
+    def __init__(self, min_interval: float = ERROR_LOG_INTERVAL, queue_size: int = ERROR_QUEUE_SIZE) -> None:
+        self.min_interval = float(min_interval)
+        self._lock = threading.Lock()
+        self._signatures: Dict[str, _Signature] = {}
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, int(queue_size)))
+        self._thread: Optional[threading.Thread] = None
+        self.total = 0
+        self.written = 0
+        self.suppressed = 0
+        self.dropped = 0
+        self.write_failures = 0
+
+    def record(self, kind: str, path: Any, exc: BaseException | None = None) -> bool:
+        """Count `exc` (default: the exception being handled) under `kind`.
+
+        The traceback is queued for the log file at `path` when its signature
+        is new or was last written `min_interval` seconds ago. Returns True in
+        that case, so callers can log the full traceback only then. Never
+        blocks on I/O.
+        """
+        if exc is None:
+            exc = sys.exc_info()[1]
+            if exc is None:
+                return False
+        signature = traceback_signature(exc)
+        now = time.time()
+        with self._lock:
+            self.total += 1
+            entry = self._signatures.get(signature)
+            if entry is None:
+                entry = self._signatures[signature] = _Signature(kind, exc, now)
+            entry.count += 1
+            entry.last_seen = now
+            entry.message = str(exc)[:200]
+            due = entry.last_written is None or now - entry.last_written >= self.min_interval
+            if not due:
+                entry.unwritten += 1
+                self.suppressed += 1
+                return False
+            entry.last_written = now
+            repeats, entry.unwritten = entry.unwritten, 0
+        try:
+            # Formatting happens on the writer thread; the exception keeps its traceback
+            self._queue.put_nowait((str(path), kind, signature, now, repeats, exc))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        self._ensure_writer()
+        return True
+
+    def _ensure_writer(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._write_loop, name="error-recorder", daemon=True)
+                self._thread.start()
+
+    def _write_loop(self) -> None:
+        while True:
+            items = [self._queue.get()]
+            while True:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(items)
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+
+    def _write(self, items: List[Any]) -> None:
+        by_path: Dict[str, List[str]] = {}
+        for path, kind, signature, ts, repeats, exc in items:
+            header = "\n--- {} [{}] {}".format(kind, signature, datetime.fromtimestamp(ts).isoformat(timespec="seconds"))
+            if repeats:
+                header += " ({} repeats not written)".format(repeats)
+            text = "".join(traceback.format_exception(type(exc), exc, exc.__traceback__))
+            by_path.setdefault(path, []).append(header + " ---\n" + text)
+        for path, chunks in by_path.items():
+            try:
+                with open(path, "a", encoding="utf-8") as fh:
+                    fh.write("".join(chunks))
+            except Exception as exc:
+                with self._lock:
+                    self.write_failures += len(chunks)
+                LOGGER.debug("Could not write %s: %s", path, exc)
+                continue
+            with self._lock:
+                self.written += len(chunks)
+
+    def flush(self, timeout: float = 2.0) -> bool:
+        """Wait until queued tracebacks are written; False on timeout."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def info(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = sorted(self._signatures.items(), key=lambda item: -item[1].count)
+            return {
+                "total": self.total,
+                "signatures": len(entries),
+                "written": self.written,
+                "suppressed": self.suppressed,
+                "dropped": self.dropped,
+                "write_failures": self.write_failures,
+                "queued": self._queue.qsize(),
+                "by_signature": [
+                    {
+                        "signature": signature,
+                        "kind": entry.kind,
+                        "type": entry.type,
+                        "message": entry.message,
+                        "count": entry.count,
+                        "first_seen": entry.first_seen,
+                        "last_seen": entry.last_seen,
+                    }
+                    for signature, entry in entries[:ERROR_INFO_TOP]
+                ],
+            }
+
+
+ERROR_RECORDER = ErrorRecorder()
+
+
+def get_error_recorder() -> ErrorRecorder:
+    return ERROR_RECORDER
@@ -0,0 +1,133 @@
+"""
+Fair sharing of the inference pool between cameras.
+
+Work is tagged with the client (camera / room) it is done for. `FairQueue`
+keeps one FIFO per client and serves the highest priority first, then
+round-robin between clients of that priority, so one camera posting frames as
+fast as it can never starves the others. The in-process `InferencePool` queues
+its waiting callers in one, and `BatchScheduler` fills its batches from one.
+
+The tag travels with the calling thread: wrap detector calls in
+``with inference_client("kitchen", priority=1):``. Untagged work belongs to
+the ``"default"`` client at priority 0.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Hashable, Iterator, Tuple
+
+DEFAULT_CLIENT = "default"
+
+_CURRENT = threading.local()
+
+
+def current_client() -> Tuple[Hashable, int]:
+    """``(client, priority)`` set by `inference_client` on this thread."""
+    return getattr(_CURRENT, "client", DEFAULT_CLIENT), getattr(_CURRENT, "priority", 0)
+
+
+@contextmanager
+def inference_client(client: Hashable, priority: int = 0) -> Iterator[None]:
+    """Tag inference requests made by this thread for fair pool scheduling."""
+    previous = (getattr(_CURRENT, "client", None), getattr(_CURRENT, "priority", None))
+    _CURRENT.client, _CURRENT.priority = client, int(priority)
+    try:
+        yield
+    finally:
+        if previous[0] is None:
+            del _CURRENT.client, _CURRENT.priority
+        else:
+            _CURRENT.client, _CURRENT.priority = previous
+
+
+def client_is_set() -> bool:
+    return hasattr(_CURRENT, "client")
+
+
+class FairQueue:
+    """Per-client FIFOs served by priority, then round-robin between clients."""
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._queues: Dict[Hashable, "deque[Any]"] = {}
+        self._priority: Dict[Hashable, int] = {}
+        # Service order between clients; the client just served moves to the back
+        self._order: "deque[Hashable]" = deque()
+        self._served: Dict[Hashable, int] = {}
+        self._size = 0
+
+    def put(self, item: Any, client: Hashable = DEFAULT_CLIENT, priority: int = 0) -> None:
+        with self._cond:
+            if client not in self._queues:
+                self._queues[client] = deque()
+                self._order.append(client)
+            self._queues[client].append(item)
+            self._priority[client] = int(priority)
+            self._size += 1
+            self._cond.notify()
+
+    def get(self, timeout: float | None = None) -> Any:
+        """Next item by priority / round-robin; raises `queue.Empty` on timeout."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._size > 0, timeout):
+                raise queue.Empty
+            return self._pop()
+
+    def get_nowait(self) -> Any:
+        with self._cond:
+            if not self._size:
+                raise queue.Empty
+            return self._pop()
+
+    def _pop(self) -> Any:
+        best = max(self._priority[c] for c in self._order if self._queues[c])
+        for _ in range(len(self._order)):
+            client = self._order[0]
+            self._order.rotate(-1)
+            if self._queues[client] and self._priority[client] == best:
+                self._size -= 1
+                self._served[client] = self._served.get(client, 0) + 1
+                return self._queues[client].popleft()
+        raise queue.Empty  # pragma: no cover - _size says an item exists
+
+    def remove(self, item: Any) -> bool:
+        """Withdraw a queued `item` (e.g. a caller that timed out); False if already taken."""
+        with self._cond:
+            for items in self._queues.values():
+                try:
+                    items.remove(item)
+                except ValueError:
+                    continue
+                self._size -= 1
+                return True
+            return False
+
+    def forget(self, client: Hashable) -> bool:
+        """Drop the bookkeeping of a client that is gone; False while it still has queued items."""
+        with self._cond:
+            if client not in self._queues:
+                return True
+            if self._queues[client]:
+                return False
+            del self._queues[client], self._priority[client]
+            self._served.pop(client, None)
+            self._order.remove(client)
+            return True
+
+    def qsize(self) -> int:
+        return self._size
+
+    def info(self) -> Dict[Hashable, Dict[str, int]]:
+        with self._cond:
+            return {
+                client: {
+                    "queued": len(self._queues[client]),
+                    "served": self._served.get(client, 0),
+                    "priority": self._priority[client],
+                }
+                for client in self._order
+            }
@@ -0,0 +1,110 @@
+"""
+Change gate that skips YOLO on frames that look like the last analyzed one.
+
+Each frame is shrunk to a small grayscale thumbnail; when its mean absolute
+difference from the thumbnail of the last *analyzed* frame of the same stream
+is below `threshold` (0-255 scale), the previous detections are reused. A
+stream is re-analyzed anyway after `max_skips` reused frames or `max_age`
+seconds so slow changes are never hidden for long.
+"""
+
+from __future__ import annotations
+
+import copy
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+try:
+    import cv2  # type: ignore
+except Exception:  # pragma: no cover - OpenCV may be missing in some environments
+    cv2 = None  # type: ignore
+
+
+class _StreamState:
+    __slots__ = ("thumb", "shape", "result", "analyzed_at", "skips")
+
+    def __init__(self, thumb: Any, shape: Tuple[int, ...], result: Any) -> None:
+        self.thumb = thumb
+        self.shape = shape
+        self.result = result
+        self.analyzed_at = time.monotonic()
+        self.skips = 0
+
+
+class FrameChangeGate:
+    """Per-stream frame-difference gate in front of the detector."""
+
+    def __init__(
+        self,
+        threshold: float = 3.0,
+        thumb_width: int = 64,
+        max_skips: int = 20,
+        max_age: float = 5.0,
+    ) -> None:
+        self.threshold = float(threshold)
+        self.thumb_width = int(thumb_width)
+        self.max_skips = int(max_skips)
+        self.max_age = float(max_age)
+        self._lock = threading.Lock()
+        self._streams: Dict[str, _StreamState] = {}
+        self.analyzed = 0
+        self.skipped = 0
+        self.last_diff: Optional[float] = None
+
+    def thumbnail(self, image: Any) -> Any:
+        height, width = image.shape[:2]
+        size = (self.thumb_width, max(1, round(height * self.thumb_width / max(width, 1))))
+        small = cv2.resize(image, size, interpolation=cv2.INTER_AREA)  # type: ignore[union-attr]
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)  # type: ignore[union-attr]
+        return small.astype(np.int16)
+
+    def lookup(self, image: Any, stream_id: str = "default") -> Tuple[Any, Any]:
+        """Return ``(thumbnail, cached_result)``; cached_result is None when the frame must be analyzed."""
+        thumb = self.thumbnail(image)
+        with self._lock:
+            state = self._streams.get(stream_id)
+            if state is None or state.shape != image.shape:
+                return thumb, None
+            diff = float(np.abs(thumb - state.thumb).mean())
+            self.last_diff = diff
+            if (
+                diff >= self.threshold
+                or state.skips >= self.max_skips
+                or time.monotonic() - state.analyzed_at >= self.max_age
+            ):
+                return thumb, None
+            state.skips += 1
+            self.skipped += 1
+            # Callers may annotate the returned dicts, so hand out a copy
+            return thumb, copy.deepcopy(state.result)
+
+    def store(self, thumb: Any, image_shape: Tuple[int, ...], result: Any, stream_id: str = "default") -> None:
+        """Remember an analyzed frame and its detections as the new reference."""
+        with self._lock:
+            self._streams[stream_id] = _StreamState(thumb, tuple(image_shape), copy.deepcopy(result))
+            self.analyzed += 1
+
+    def reset(self, stream_id: Optional[str] = None) -> None:
+        with self._lock:
+            if stream_id is None:
+                self._streams.clear()
+            else:
+                self._streams.pop(stream_id, None)
+
+    def info(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.analyzed + self.skipped
+            return {
+                "threshold": self.threshold,
+                "max_skips": self.max_skips,
+                "max_age": self.max_age,
+                "analyzed": self.analyzed,
+                "skipped": self.skipped,
+                "skip_ratio": round(self.skipped / total, 3) if total else 0.0,
+                "last_diff": round(self.last_diff, 2) if self.last_diff is not None else None,
+                "streams": len(self._streams),
+            }
@@ -0,0 +1,233 @@
+"""
+Pluggable inference backends for the YOLO person detector.
+
+A backend knows which model files it needs and how to build N inference
+contexts from them. Every context looks like a `cv2.dnn.Net`
+(`setInput` / `forward` / `getUnconnectedOutLayersNames`) and returns
+darknet-style rows ``(rows, 5 + classes)`` so the registry, the inference
+pool, the batch scheduler and `decode_yolo_outputs` work unchanged.
+
+Backends (select with ``YOLO_BACKEND`` / ``YOLO_TARGET``):
+
+- ``opencv``       cv2.dnn on the darknet cfg/weights; targets cpu, fp16, opencl, opencl_fp16
+- ``openvino``     cv2.dnn with the Inference Engine backend (OpenCV built with OpenVINO)
+- ``opencv-int8``  cv2.dnn on a quantized ``<variant>-int8.onnx`` export
+- ``onnxruntime``  ONNX Runtime (CPUExecutionProvider) on ``<variant>.onnx``
+
+ONNX exports may use either the darknet row layout or the two-output
+``boxes (x1, y1, x2, y2) + class scores`` layout of the pytorch-YOLOv4 exporter.
+"""
+
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import cv2  # type: ignore
+except Exception:  # pragma: no cover - OpenCV may be missing in some environments
+    cv2 = None  # type: ignore
+
+try:
+    import onnxruntime as ort  # type: ignore
+except Exception:  # optional dependency
+    ort = None  # type: ignore
+
+LOGGER = logging.getLogger(__name__)
+
+# Darknet model variants that can live side by side in one model folder
+MODEL_VARIANTS: Dict[str, Tuple[str, str]] = {
+    "yolov4": ("yolov4.cfg", "yolov4.weights"),
+    "yolov4-tiny": ("yolov4-tiny.cfg", "yolov4-tiny.weights"),
+}
+
+
+def model_files(variant: str = "yolov4") -> Tuple[str, str]:
+    """Return the darknet (cfg, weights) file names for a model variant."""
+    if variant not in MODEL_VARIANTS:
+        raise ValueError("Unknown YOLO variant {!r}; expected one of {}".format(variant, sorted(MODEL_VARIANTS)))
+    return MODEL_VARIANTS[variant]
+
+
+def to_darknet_rows(outputs: Sequence[Any]) -> List[np.ndarray]:
+    """Convert ONNX detector outputs to the darknet ``(rows, 5 + classes)`` layout.
+
+    A batch of one comes back as ``[(rows, 85)]``, larger batches as
+    ``[(batch, rows, 85)]`` like cv2.dnn's darknet outputs.
+    """
+    arrays = [np.asarray(o, dtype=np.float32) for o in outputs]
+    if len(arrays) == 2:
+        # pytorch-YOLOv4 export: boxes (B, N, 1, 4) as normalized x1,y1,x2,y2 + scores (B, N, C)
+        boxes, scores = sorted(arrays, key=lambda a: a.shape[-1] != 4)
+        batch = boxes.shape[0] if boxes.ndim >= 3 else 1
+        boxes = boxes.reshape(batch, -1, 4)
+        scores = scores.reshape(batch, boxes.shape[1], -1)
+        wh = boxes[..., 2:4] - boxes[..., 0:2]
+        cxcy = boxes[..., 0:2] + wh / 2
+        rows = np.concatenate([cxcy, wh, scores.max(axis=-1, keepdims=True), scores], axis=-1)
+    else:
+        rows = arrays[0]
+        rows = rows.reshape(rows.shape[0] if rows.ndim >= 3 else 1, -1, rows.shape[-1])
+    return [rows[0]] if rows.shape[0] == 1 else [rows]
+
+
+class OnnxOutputNet:
+    """cv2.dnn.Net-like context around an ONNX model that yields darknet rows."""
+
+    def __init__(self, run: Callable[[Any], Sequence[Any]]) -> None:
+        self._run = run
+        self._blob = None
+
+    def setInput(self, blob: Any) -> None:
+        self._blob = blob
+
+    def getUnconnectedOutLayersNames(self) -> Tuple[str, ...]:
+        return ("detections",)
+
+    def forward(self, names: Any = None) -> List[np.ndarray]:
+        return to_darknet_rows(self._run(self._blob))
+
+
+class InferenceBackend:
+    """Builds inference contexts for one runtime."""
+
+    name = "base"
+    targets: Tuple[str, ...] = ("cpu",)
+
+    def available(self) -> bool:
+        return cv2 is not None
+
+    def model_files(self, variant: str) -> Tuple[str, ...]:
+        return model_files(variant)
+
+    def create(self, folder: Path, variant: str, target: str, count: int) -> List[Any]:
+        raise NotImplementedError
+
+
+class OpenCVBackend(InferenceBackend):
+    """cv2.dnn on the darknet files; all contexts are parsed from one in-memory read."""
+
+    name = "opencv"
+    backend_attr = "DNN_BACKEND_OPENCV"
+    target_attrs = {
+        "cpu": "DNN_TARGET_CPU",
+        "fp16": "DNN_TARGET_CPU_FP16",
+        "opencl": "DNN_TARGET_OPENCL",
+        "opencl_fp16": "DNN_TARGET_OPENCL_FP16",
+    }
+
+    @property
+    def targets(self) -> Tuple[str, ...]:  # type: ignore[override]
+        return tuple(t for t, attr in self.target_attrs.items() if cv2 is not None and hasattr(cv2.dnn, attr))
+
+    def _ids(self, target: str) -> Tuple[int, int]:
+        attr = self.target_attrs.get(target)
+        if cv2 is None or attr is None or not hasattr(cv2.dnn, attr):
+            raise ValueError("Unsupported target {!r} for backend {}".format(target, self.name))
+        return getattr(cv2.dnn, self.backend_attr), getattr(cv2.dnn, attr)
+
+    def create(self, folder: Path, variant: str, target: str, count: int) -> List[Any]:
+        backend_id, target_id = self._ids(target)
+        config_name, weights_name = self.model_files(variant)
+        # readNetFromDarknet accepts in-memory buffers as uint8 arrays (not bytes)
+        cfg_buf = np.fromfile(str(folder / config_name), dtype=np.uint8)
+        weights_buf = np.fromfile(str(folder / weights_name), dtype=np.uint8)
+        nets = []
+        for _ in range(count):
+            net = cv2.dnn.readNetFromDarknet(cfg_buf, weights_buf)  # type: ignore[union-attr]
+            net.setPreferableBackend(backend_id)
+            net.setPreferableTarget(target_id)
+            nets.append(net)
+        return nets
+
+
+class OpenVINOBackend(OpenCVBackend):
+    """cv2.dnn with the Inference Engine (OpenVINO) backend, if OpenCV was built with it."""
+
+    name = "openvino"
+    backend_attr = "DNN_BACKEND_INFERENCE_ENGINE"
+
+    def available(self) -> bool:
+        try:
+            backend_id = getattr(cv2.dnn, self.backend_attr)  # type: ignore[union-attr]
+            return bool(cv2.dnn.getAvailableTargets(backend_id))  # type: ignore[union-attr]
+        except Exception:
+            return False
+
+
+class OpenCVInt8Backend(InferenceBackend):
+    """cv2.dnn on a quantized (QDQ / QOperator) ONNX export of the variant."""
+
+    name = "opencv-int8"
+
+    def model_files(self, variant: str) -> Tuple[str, ...]:
+        model_files(variant)  # validate the variant name
+        return ("{}-int8.onnx".format(variant),)
+
+    def create(self, folder: Path, variant: str, target: str, count: int) -> List[Any]:
+        if target != "cpu":
+            raise ValueError("Unsupported target {!r} for backend {}".format(target, self.name))
+        model_buf = np.fromfile(str(folder / self.model_files(variant)[0]), dtype=np.uint8)
+        contexts = []
+        for _ in range(count):
+            net = cv2.dnn.readNetFromONNX(model_buf)  # type: ignore[union-attr]
+            net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)  # type: ignore[union-attr]
+            net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)  # type: ignore[union-attr]
+
+            def run(blob: Any, net: Any = net) -> Sequence[Any]:
+                net.setInput(blob)
+                return net.forward(net.getUnconnectedOutLayersNames())
+
+            contexts.append(OnnxOutputNet(run))
+        return contexts
+
+
+class OnnxRuntimeBackend(InferenceBackend):
+    """ONNX Runtime on the CPU execution provider.
+
+    `InferenceSession.run` is thread-safe, so all contexts share one session
+    (and one copy of the weights); each context only keeps its own input.
+    """
+
+    name = "onnxruntime"
+    providers = {"cpu": ["CPUExecutionProvider"]}
+
+    def available(self) -> bool:
+        return ort is not None
+
+    def model_files(self, variant: str) -> Tuple[str, ...]:
+        model_files(variant)
+        return ("{}.onnx".format(variant),)
+
+    def create(self, folder: Path, variant: str, target: str, count: int) -> List[Any]:
+        if ort is None:
+            raise RuntimeError("onnxruntime is not installed (pip install onnxruntime)")
+        if target not in self.providers:
+            raise ValueError("Unsupported target {!r} for backend {}".format(target, self.name))
+        session = ort.InferenceSession(str(folder / self.model_files(variant)[0]), providers=self.providers[target])
+        input_name = session.get_inputs()[0].name
+
+        def run(blob: Any) -> Sequence[Any]:
+            return session.run(None, {input_name: np.ascontiguousarray(blob, dtype=np.float32)})
+
+        return [OnnxOutputNet(run) for _ in range(count)]
+
+
+BACKENDS: Dict[str, InferenceBackend] = {
+    backend.name: backend
+    for backend in (OpenCVBackend(), OpenVINOBackend(), OpenCVInt8Backend(), OnnxRuntimeBackend())
+}
+
+
+def get_backend(name: str) -> InferenceBackend:
+    if name not in BACKENDS:
+        raise ValueError("Unknown inference backend {!r}; expected one of {}".format(name, sorted(BACKENDS)))
+    return BACKENDS[name]
+
+
+def available_backends() -> Dict[str, List[str]]:
+    """Backends usable in this environment and their targets."""
+    return {name: list(b.targets) for name, b in BACKENDS.items() if b.available()}
@@ -0,0 +1,374 @@
+"""
+Process-wide registry of loaded YOLO networks.
+
+Every `YOLOv4PersonDetector` asks the registry for its network instead of
+calling `cv2.dnn.readNet` itself, so the camera server, the identifier and any
+helper detectors share one copy of the (245 MB) YOLOv4 weights. Models are
+keyed by model folder + backend + target + variant and can be unloaded
+explicitly.
+
+Each model owns an `InferencePool` of N contexts built by its inference
+backend (see inference_backends.py). OpenCV cannot share weight blobs between
+`cv2.dnn.Net` objects, so every cv2 context holds its own copy, but the contexts
+run in parallel instead of queueing on a single lock.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+try:
+    import cv2  # type: ignore
+except Exception:  # pragma: no cover - OpenCV may be missing in some environments
+    cv2 = None  # type: ignore
+
+try:
+    from .fair_queue import FairQueue, current_client
+    from .inference_backends import MODEL_VARIANTS, get_backend, model_files  # noqa: F401 (re-exported)
+except ImportError:  # executed as a script from inside yoloV4/
+    from fair_queue import FairQueue, current_client  # type: ignore
+    from inference_backends import MODEL_VARIANTS, get_backend, model_files  # type: ignore
+
+LOGGER = logging.getLogger(__name__)
+
+WEIGHTS_FILE, CONFIG_FILE = MODEL_VARIANTS["yolov4"][1], MODEL_VARIANTS["yolov4"][0]
+NAMES_FILE = "coco.names"
+
+# (model folder, backend, target, variant)
+ModelKey = Tuple[str, str, str, str]
+
+
+class InferencePoolBusy(RuntimeError):
+    """Raised when no inference context became free within the admission timeout."""
+
+
+class _Ticket:
+    __slots__ = ("index",)
+
+    def __init__(self) -> None:
+        self.index: int | None = None
+
+
+class InferencePool:
+    """A fixed set of networks handed out one request at a time.
+
+    Each context is a (net, lock) pair; the lock is held while the context is
+    checked out so code that still uses `LoadedModel.net` with `LoadedModel.lock`
+    (context 0) cannot race a pooled forward pass on the same net.
+
+    When every context is busy, callers wait in a `FairQueue` under the client
+    tag of their thread (see fair_queue.py): a freed context goes to the
+    highest-priority camera first and round-robin between cameras, not to
+    whichever thread happens to wake up.
+    """
+
+    def __init__(self, contexts: List[Tuple[Any, threading.Lock]]) -> None:
+        self._contexts = list(contexts)
+        self._cond = threading.Condition()
+        self._free = list(range(len(self._contexts)))
+        self._waiting = FairQueue()
+        self._client_served: Dict[Any, int] = {}
+        self.rejected = 0
+        self.served = 0
+
+    @property
+    def size(self) -> int:
+        return len(self._contexts)
+
+    @property
+    def busy(self) -> int:
+        with self._cond:
+            return len(self._contexts) - len(self._free)
+
+    def add(self, net: Any, lock: threading.Lock | None = None) -> None:
+        with self._cond:
+            self._contexts.append((net, lock or threading.Lock()))
+            self._free.append(len(self._contexts) - 1)
+            self._grant()
+
+    def _grant(self) -> None:
+        # Hand free contexts to queued callers in fair order (caller holds _cond)
+        while self._free and self._waiting.qsize():
+            ticket = self._waiting.get_nowait()
+            # Oldest free context first, so requests (and warm-up) rotate over all of them
+            ticket.index = self._free.pop(0)
+        self._cond.notify_all()
+
+    @contextmanager
+    def context(self, timeout: float | None = None) -> Iterator[Any]:
+        """Check out a free network, waiting at most `timeout` seconds.
+
+        Raises `InferencePoolBusy` when every context stays busy.
+        """
+        client, priority = current_client()
+        with self._cond:
+            if self._free and not self._waiting.qsize():
+                index = self._free.pop(0)
+            else:
+                ticket = _Ticket()
+                self._waiting.put(ticket, client, priority)
+                self._grant()
+                if not self._cond.wait_for(lambda: ticket.index is not None, timeout=timeout):
+                    if self._waiting.remove(ticket):
+                        self.rejected += 1
+                        raise InferencePoolBusy(
+                            "all {} inference contexts are busy".format(len(self._contexts))
+                        )
+                index = ticket.index
+            self._client_served[client] = self._client_served.get(client, 0) + 1
+        net, lock = self._contexts[index]
+        try:
+            with lock:
+                yield net
+        finally:
+            with self._cond:
+                self._free.append(index)
+                self.served += 1
+                self._grant()
+
+    def forget(self, client: Any) -> None:
+        """Drop the counters of a client (camera) that is gone, unless it is still waiting."""
+        with self._cond:
+            if self._waiting.forget(client):
+                self._client_served.pop(client, None)
+
+    def close(self) -> None:
+        with self._cond:
+            self._contexts = [(None, lock) for _, lock in self._contexts]
+
+    def info(self) -> Dict[str, Any]:
+        with self._cond:
+            queued = self._waiting.info()
+            return {
+                "size": len(self._contexts),
+                "busy": len(self._contexts) - len(self._free),
+                "served": self.served,
+                "rejected": self.rejected,
+                "waiting": self._waiting.qsize(),
+                # Contexts handed to each camera / room, and how many of its calls are queued
+                "clients": {
+                    str(client): {"served": served, "queued": queued.get(client, {}).get("queued", 0)}
+                    for client, served in self._client_served.items()
+                },
+            }
+
+
+@dataclass
+class LoadedModel:
+    """One network shared by every detector that uses the same key."""
+
+    key: ModelKey
+    net: Any
+    classes: List[str]
+    output_layers: List[str]
+    weights_bytes: int
+    load_seconds: float
+    loaded_at: float = field(default_factory=time.time)
+    # All users share the net, so they must also share the lock around setInput/forward
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    users: "weakref.WeakSet[Any]" = field(default_factory=weakref.WeakSet)
+    pool: InferencePool | None = None
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "model_path": self.key[0],
+            "backend": self.key[1],
+            "target": self.key[2],
+            "variant": self.key[3],
+            "weights_mb": round(self.weights_bytes / (1024 * 1024), 1),
+            "users": len(self.users),
+            "load_seconds": round(self.load_seconds, 3),
+            "loaded_at": self.loaded_at,
+            "pool": self.pool.info() if self.pool is not None else None,
+        }
+
+
+class ModelRegistry:
+    """Hands out one shared network per (model path, backend, target)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._models: Dict[ModelKey, LoadedModel] = {}
+
+    @staticmethod
+    def make_key(
+        model_path: str | Path, backend: str = "opencv", target: str = "cpu", variant: str = "yolov4"
+    ) -> ModelKey:
+        return (str(Path(model_path).resolve()), backend, target, variant)
+
+    def acquire(
+        self,
+        model_path: str | Path,
+        user: Any = None,
+        backend: str = "opencv",
+        target: str = "cpu",
+        pool_size: int = 1,
+        variant: str = "yolov4",
+    ) -> LoadedModel | None:
+        """Return the shared model for `model_path`, loading it on first use.
+
+        `pool_size` is a minimum: an already loaded model grows its pool when a
+        caller asks for more contexts, it never shrinks.
+
+        Returns None when OpenCV or the model files are unavailable or loading
+        fails; callers then fall back to the cascade/simulated detectors.
+        """
+        pool_size = max(1, int(pool_size))
+        if cv2 is None:
+            return None
+        key = self.make_key(model_path, backend, target, variant)
+        # Loading is done under the registry lock so two threads starting at the
+        # same time cannot both read the weights.
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                model = self._load(key, pool_size)
+                if model is None:
+                    return None
+                self._models[key] = model
+            elif model.pool is not None and model.pool.size < pool_size:
+                self._grow_pool(model, pool_size)
+            if user is not None:
+                model.users.add(user)
+            return model
+
+    def _grow_pool(self, model: LoadedModel, pool_size: int) -> None:
+        try:
+            missing = pool_size - model.pool.size  # type: ignore[union-attr]
+            backend = get_backend(model.key[1])
+            for net in backend.create(Path(model.key[0]), model.key[3], model.key[2], missing):
+                model.pool.add(net)  # type: ignore[union-attr]
+            LOGGER.info("Grew inference pool for %s to %d contexts", model.key, pool_size)
+        except Exception as exc:  # pragma: no cover - runtime errors
+            LOGGER.warning("Could not grow inference pool for %s: %s", model.key, exc, exc_info=True)
+
+    def _load(self, key: ModelKey, pool_size: int = 1) -> LoadedModel | None:
+        folder = Path(key[0])
+        names_file = folder / NAMES_FILE
+        try:
+            backend = get_backend(key[1])
+            files = [folder / name for name in backend.model_files(key[3])]
+        except ValueError as exc:
+            LOGGER.warning("%s", exc)
+            return None
+        if not (all(f.exists() for f in files) and names_file.exists()):
+            return None
+
+        start = time.perf_counter()
+        try:
+            print(f"[YOLOV4] Loading weights from {files[-1]} ({backend.name}/{key[2]})")
+            nets = backend.create(folder, key[3], key[2], pool_size)
+            net = nets[0]
+
+            with open(names_file, "r", encoding="utf-8") as fh:
+                classes = [line.strip() for line in fh]
+
+            # Prefer the newer API to get output layer names directly
+            try:
+                output_layers = list(net.getUnconnectedOutLayersNames())
+            except Exception:
+                try:
+                    layer_names = net.getLayerNames()
+                    output_layers = [layer_names[i - 1] for i in net.getUnconnectedOutLayers()]
+                except Exception:
+                    output_layers = []
+        except Exception as exc:  # pragma: no cover - OpenCV runtime errors hard to reproduce in tests
+            LOGGER.warning("Error loading YOLO network from %s: %s", folder, exc, exc_info=True)
+            return None
+
+        model = LoadedModel(
+            key=key,
+            net=net,
+            classes=classes,
+            output_layers=output_layers,
+            weights_bytes=sum(f.stat().st_size for f in files),
+            load_seconds=time.perf_counter() - start,
+        )
+        model.pool = InferencePool([(net, model.lock)] + [(n, threading.Lock()) for n in nets[1:]])
+        LOGGER.info("Loaded YOLO model %s (%d contexts) in %.2fs", key, pool_size, model.load_seconds)
+        return model
+
+    def release(self, model: LoadedModel, user: Any) -> None:
+        """Forget `user`; the model stays loaded until `unload` is called."""
+        try:
+            model.users.discard(user)
+        except Exception:
+            pass
+
+    def unload(
+        self,
+        model_path: str | Path | None = None,
+        backend: str = "opencv",
+        target: str = "cpu",
+        variant: str | None = None,
+    ) -> int:
+        """Unload one model (or all models when `model_path` is None).
+
+        With a `model_path` but no `variant`, every variant loaded from that
+        folder on `backend`/`target` is unloaded.
+
+        Detectors still using an unloaded model are told to drop their
+        reference and switch to their fallback. Returns the number unloaded.
+        """
+        with self._lock:
+            if model_path is None:
+                keys = list(self._models)
+            else:
+                prefix = self.make_key(model_path, backend, target)[:3]
+                keys = [k for k in self._models if k[:3] == prefix and variant in (None, k[3])]
+            removed = [self._models.pop(k) for k in keys if k in self._models]
+
+        for model in removed:
+            for user in list(model.users):
+                try:
+                    user.release_model()
+                except Exception:
+                    LOGGER.debug("release_model failed for %r", user, exc_info=True)
+            model.net = None
+            if model.pool is not None:
+                model.pool.close()
+            LOGGER.info("Unloaded YOLO model %s", model.key)
+        return len(removed)
+
+    def loaded_models(self) -> List[LoadedModel]:
+        with self._lock:
+            return list(self._models.values())
+
+    def memory_usage(self) -> Dict[str, Any]:
+        """Summary of loaded models plus the current process resident size."""
+        models = [m.info() for m in self.loaded_models()]
+        return {
+            "models": models,
+            "total_weights_mb": round(sum(m["weights_mb"] for m in models), 1),
+            "process_rss_mb": _process_rss_mb(),
+        }
+
+
+def _process_rss_mb() -> float | None:
+    try:
+        import psutil  # type: ignore
+
+        return round(psutil.Process().memory_info().rss / (1024 * 1024), 1)
+    except Exception:
+        pass
+    try:
+        with open("/proc/self/statm", "r", encoding="utf-8") as fh:
+            pages = int(fh.read().split()[1])
+        return round(pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+    except Exception:
+        return None
+
+
+MODEL_REGISTRY = ModelRegistry()
+
+
+def get_model_registry() -> ModelRegistry:
+    return MODEL_REGISTRY
@@ -0,0 +1,328 @@
+"""
+Offline detection over folders of stored images.
+
+Re-scoring archived footage (e.g. after a model change) with
+``detect_and_identify`` one image at a time leaves the CPU idle while files
+are read and decoded. `run_offline` splits the work:
+
+* a process pool reads and decodes images (``cv2.imdecode``) ahead of the
+  detector, at most `prefetch` images in flight, in the order of the input;
+* the main process groups decoded images into batches of `batch_size` and
+  runs them through ``detector.detect_all_batch`` (one forward pass per
+  batch), then the identifier on each result;
+* every batch goes to a `ResultWriter` (JSON lines, or Parquet part files
+  when pyarrow is installed); images are recorded in a `Checkpoint` once
+  their records are on disk, so an interrupted run resumes where it stopped.
+  Records written just before a crash may be written again on resume;
+  readers should keep the last record per image.
+
+Records use the layout of detection_results.json (``all_detections``,
+``identified_persons``, ``summary``) plus the image path, size and time.
+"""
+
+from __future__ import annotations
+
+import glob
+import json
+import logging
+import multiprocessing as mp
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import cv2  # type: ignore
+except Exception:  # pragma: no cover - OpenCV may be missing in some environments
+    cv2 = None  # type: ignore
+
+LOGGER = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp", ".tif", ".tiff")
+
+
+def find_images(inputs: Sequence[str], recursive: bool = False) -> List[str]:
+    """Image files named by `inputs` (files, directories or glob patterns), sorted, without duplicates."""
+    found = []
+    for spec in inputs:
+        path = Path(spec)
+        if path.is_dir():
+            pattern = "**/*" if recursive else "*"
+            candidates = [str(p) for p in path.glob(pattern) if p.is_file()]
+        elif path.is_file():
+            candidates = [str(path)]
+        else:
+            candidates = [p for p in glob.glob(spec, recursive=recursive) if os.path.isfile(p)]
+        found.extend(p for p in candidates if p.lower().endswith(IMAGE_EXTENSIONS))
+    return sorted(set(found))
+
+
+def decode_file(path: str) -> Tuple[str, Any, Optional[str]]:
+    """Read and decode one image; returns ``(path, BGR array or None, error)``. Runs in the pool."""
+    try:
+        data = np.fromfile(path, dtype=np.uint8)
+        image = cv2.imdecode(data, cv2.IMREAD_COLOR) if data.size else None
+    except Exception as exc:
+        return path, None, str(exc)
+    if image is None:
+        return path, None, "could not decode image"
+    return path, image, None
+
+
+def to_record(path: str, image: Any, detections: Dict[str, Any], identified: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """One output record in the detection_results.json layout."""
+    all_detections = []
+    for item in (detections.get("persons") or []) + (detections.get("objects") or []):
+        x, y, w, h = (int(v) for v in item.get("box", [0, 0, 0, 0]))
+        entry = {
+            "class": item.get("class", "person"),
+            "confidence": round(float(item.get("confidence", 0.0)), 4),
+            "x": x,
+            "y": y,
+            "width": w,
+            "height": h,
+            "center_x": x + w // 2,
+            "center_y": y + h // 2,
+        }
+        for key in ("track_id", "roi"):
+            if item.get(key) is not None:
+                entry[key] = item[key]
+        all_detections.append(entry)
+    return {
+        "image": path,
+        "width": int(image.shape[1]),
+        "height": int(image.shape[0]),
+        "all_detections": all_detections,
+        "identified_persons": identified,
+        "summary": "Detected {} objects, identified {} persons".format(len(all_detections), len(identified)),
+        "processed_at": datetime.now().isoformat(),
+    }
+
+
+class Checkpoint:
+    """Append-only list of images whose records are already written."""
+
+    def __init__(self, path: str | os.PathLike) -> None:
+        self.path = Path(path)
+        self.done = set()
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as fh:
+                self.done = {line.rstrip("\n") for line in fh if line.strip()}
+
+    def mark(self, paths: Iterable[str]) -> None:
+        paths = list(paths)
+        with open(self.path, "a", encoding="utf-8") as fh:
+            fh.writelines(p + "\n" for p in paths)
+            fh.flush()
+            os.fsync(fh.fileno())
+        self.done.update(paths)
+
+    def __contains__(self, path: object) -> bool:
+        return path in self.done
+
+
+class ResultWriter:
+    """Appends records to a JSON lines file.
+
+    `write` and `flush` return the images whose records are now safely on
+    disk; only those go into the checkpoint.
+    """
+
+    def __init__(self, path: str | os.PathLike) -> None:
+        self.path = Path(path)
+        self._fh = open(self.path, "a", encoding="utf-8")
+
+    def write(self, records: List[Dict[str, Any]]) -> List[str]:
+        for record in records:
+            self._fh.write(json.dumps(record, default=str) + "\n")
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+        return [record["image"] for record in records]
+
+    def flush(self) -> List[str]:
+        return []
+
+    def close(self) -> None:
+        self._fh.close()
+
+
+class ParquetResultWriter(ResultWriter):
+    """Writes records to a Parquet dataset directory in part files of `rows_per_part` rows.
+
+    A Parquet file is unreadable until its footer is written, so records are
+    buffered and each part is written whole; ``pandas.read_parquet(directory)``
+    reads all parts, including those of earlier (resumed) runs. Nested fields
+    are stored as JSON strings. Needs pyarrow.
+    """
+
+    def __init__(self, path: str | os.PathLike, rows_per_part: int = 2048) -> None:
+        try:
+            import pyarrow  # type: ignore
+            import pyarrow.parquet  # type: ignore
+        except ImportError as exc:
+            raise RuntimeError("Parquet output needs pyarrow (pip install pyarrow); use JSONL instead") from exc
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.rows_per_part = max(1, int(rows_per_part))
+        self._run = datetime.now().strftime("%Y%m%d-%H%M%S")
+        self._parts = 0
+        self._pending: List[Dict[str, Any]] = []
+
+    def write(self, records: List[Dict[str, Any]]) -> List[str]:
+        self._pending.extend(records)
+        if len(self._pending) < self.rows_per_part:
+            return []
+        return self.flush()
+
+    def flush(self) -> List[str]:
+        records, self._pending = self._pending, []
+        if not records:
+            return []
+        table = self._pa.Table.from_pydict({
+            "image": [r["image"] for r in records],
+            "width": [r["width"] for r in records],
+            "height": [r["height"] for r in records],
+            "all_detections": [json.dumps(r["all_detections"]) for r in records],
+            "identified_persons": [json.dumps(r["identified_persons"], default=str) for r in records],
+            "summary": [r["summary"] for r in records],
+            "processed_at": [r["processed_at"] for r in records],
+        })
+        part = self.path / "part-{}-{:05d}.parquet".format(self._run, self._parts)
+        self._pq.write_table(table, str(part))
+        self._parts += 1
+        return [r["image"] for r in records]
+
+    def close(self) -> None:
+        self.flush()
+
+
+def open_writer(path: str | os.PathLike, fmt: str | None = None) -> ResultWriter:
+    """Writer for `fmt` (``"jsonl"`` or ``"parquet"``; guessed from the extension when None)."""
+    fmt = fmt or ("parquet" if str(path).lower().endswith(".parquet") else "jsonl")
+    if fmt == "parquet":
+        return ParquetResultWriter(path)
+    if fmt != "jsonl":
+        raise ValueError("unknown output format {!r} (expected jsonl or parquet)".format(fmt))
+    return ResultWriter(path)
+
+
+class OfflineStats:
+    """Counters and stage timings of an offline run."""
+
+    def __init__(self, total: int = 0, skipped: int = 0) -> None:
+        self.total = total
+        self.skipped = skipped
+        self.processed = 0
+        self.failed = 0
+        self.batches = 0
+        self.decode_wait_s = 0.0
+        self.detect_s = 0.0
+        self.write_s = 0.0
+        self.started = time.perf_counter()
+
+    def info(self) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self.started
+        return {
+            "total": self.total,
+            "skipped": self.skipped,
+            "processed": self.processed,
+            "failed": self.failed,
+            "batches": self.batches,
+            "elapsed_s": round(elapsed, 2),
+            "images_per_s": round(self.processed / elapsed, 2) if elapsed > 0 else 0.0,
+            # Time the detector sat idle waiting for decoded images
+            "decode_wait_s": round(self.decode_wait_s, 2),
+            "detect_ms_per_image": round(self.detect_s * 1000.0 / self.processed, 1) if self.processed else None,
+            "write_s": round(self.write_s, 2),
+        }
+
+
+def _decoded(paths: List[str], workers: int, prefetch: int) -> Iterable[Tuple[str, Any, Optional[str]]]:
+    """Decode `paths` in order, keeping at most `prefetch` images in flight."""
+    if workers <= 0:
+        for path in paths:
+            yield decode_file(path)
+        return
+    # spawn: the detector's threads (batch scheduler, pools) must not be forked
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn")) as pool:
+        futures: "deque[Any]" = deque(pool.submit(decode_file, path) for path in paths[:prefetch])
+        for path in paths[prefetch:]:
+            result = futures.popleft().result()
+            futures.append(pool.submit(decode_file, path))
+            yield result
+        while futures:
+            yield futures.popleft().result()
+
+
+def run_offline(
+    paths: Sequence[str],
+    detector: Any,
+    writer: ResultWriter,
+    identifier: Any | None = None,
+    checkpoint: Checkpoint | None = None,
+    batch_size: int = 8,
+    workers: int = 2,
+    prefetch: int | None = None,
+    progress: Callable[[Dict[str, Any]], None] | None = None,
+    progress_every: float = 5.0,
+) -> Dict[str, Any]:
+    """Detect (and identify) every image in `paths`; returns the final `OfflineStats.info()`."""
+    todo = [p for p in paths if checkpoint is None or p not in checkpoint]
+    stats = OfflineStats(total=len(paths), skipped=len(paths) - len(todo))
+    batch_size = max(1, int(batch_size))
+    prefetch = max(batch_size, int(prefetch) if prefetch else 2 * batch_size)
+    last_report = time.perf_counter()
+
+    def flush(batch: List[Tuple[str, Any]], failed: List[str]) -> None:
+        records = []
+        if batch:
+            start = time.perf_counter()
+            results = detector.detect_all_batch([image for _, image in batch])
+            for (path, image), detections in zip(batch, results):
+                identified = []
+                if identifier is not None:
+                    identified = identifier.detect_and_identify_in_array(image, detections=detections)
+                records.append(to_record(path, image, detections, identified))
+            stats.detect_s += time.perf_counter() - start
+            start = time.perf_counter()
+            written = writer.write(records)
+            stats.write_s += time.perf_counter() - start
+            stats.batches += 1
+            stats.processed += len(batch)
+        else:
+            written = []
+        if checkpoint is not None:
+            # Unreadable files are checkpointed too: retrying them would fail again
+            checkpoint.mark(written + failed)
+
+    batch: List[Tuple[str, Any]] = []
+    failed: List[str] = []
+    waited = time.perf_counter()
+    for path, image, error in _decoded(todo, workers, prefetch):
+        stats.decode_wait_s += time.perf_counter() - waited
+        if image is None:
+            LOGGER.warning("Skipping %s: %s", path, error)
+            stats.failed += 1
+            failed.append(path)
+        else:
+            batch.append((path, image))
+        if len(batch) >= batch_size:
+            flush(batch, failed)
+            batch, failed = [], []
+            if progress is not None and time.perf_counter() - last_report >= progress_every:
+                progress(stats.info())
+                last_report = time.perf_counter()
+        waited = time.perf_counter()
+    if batch or failed:
+        flush(batch, failed)
+    written = writer.flush()
+    if checkpoint is not None and written:
+        checkpoint.mark(written)
+    return stats.info()
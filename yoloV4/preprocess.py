@@ -0,0 +1,128 @@
+"""
+Letterbox preprocessing into reusable input buffers.
+
+`cv2.dnn.blobFromImage(image, 1/255, (S, S), swapRB=True)` stretches the frame
+to a square and allocates a fresh float32 ``1x3xSxS`` tensor on every call. A
+`LetterboxBuffer` keeps one uint8 ``SxS`` canvas and one float32 NCHW blob per
+inference context: each frame is resized (aspect ratio kept) straight into
+the middle of the canvas, the gray padding is written only when the frame
+geometry changes, and the blob is filled in place. `letterbox_params` gives
+the scale and padding needed to map network boxes back to frame pixels (see
+`decode_yolo_outputs(..., letterbox=S)`).
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import cv2  # type: ignore
+except Exception:  # pragma: no cover - OpenCV may be missing in some environments
+    cv2 = None  # type: ignore
+
+# Darknet pads letterboxed frames with 0.5 gray
+PAD_VALUE = 127
+_SCALE = np.float32(1.0 / 255.0)
+
+
+def letterbox_params(width: int, height: int, size: int) -> Tuple[float, int, int, int, int]:
+    """Return ``(scale, new_w, new_h, pad_x, pad_y)`` for fitting a frame into ``size x size``."""
+    scale = min(size / float(width), size / float(height))
+    new_w, new_h = max(1, int(round(width * scale))), max(1, int(round(height * scale)))
+    return scale, new_w, new_h, (size - new_w) // 2, (size - new_h) // 2
+
+
+class PreprocessStats:
+    """Buffer allocations plus per-stage timings (letterbox, blob, forward, decode)."""
+
+    def __init__(self, history: int = 200) -> None:
+        self._lock = threading.Lock()
+        self.allocations = 0
+        self.frames = 0
+        self._totals: Dict[str, float] = {}
+        self._counts: Dict[str, int] = {}
+        self._recent: Dict[str, "deque[float]"] = {}
+        self._history = history
+
+    def allocated(self, count: int = 1) -> None:
+        with self._lock:
+            self.allocations += count
+
+    def record(self, stage: str, ms: float, frames: int = 0) -> None:
+        with self._lock:
+            self.frames += frames
+            self._totals[stage] = self._totals.get(stage, 0.0) + ms
+            self._counts[stage] = self._counts.get(stage, 0) + 1
+            self._recent.setdefault(stage, deque(maxlen=self._history)).append(ms)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            stages = {
+                stage: {
+                    "calls": self._counts[stage],
+                    "avg_ms": round(self._totals[stage] / self._counts[stage], 3),
+                    "recent_avg_ms": round(sum(self._recent[stage]) / len(self._recent[stage]), 3),
+                }
+                for stage in self._totals
+            }
+            return {
+                "allocations": self.allocations,
+                "frames": self.frames,
+                "allocations_per_frame": round(self.allocations / self.frames, 4) if self.frames else 0.0,
+                "stages": stages,
+            }
+
+
+class LetterboxBuffer:
+    """Preallocated canvas + NCHW blob for up to `batch` frames of one context."""
+
+    def __init__(self, size: int, batch: int = 1, stats: PreprocessStats | None = None) -> None:
+        self.size = int(size)
+        self.stats = stats
+        self.canvas = np.empty((0, self.size, self.size, 3), dtype=np.uint8)
+        self.blob = np.empty((0, 3, self.size, self.size), dtype=np.float32)
+        self._geometry: List[Any] = []
+        self._reserve(batch)
+
+    def _reserve(self, batch: int) -> None:
+        if batch <= len(self.canvas):
+            return
+        self.canvas = np.full((batch, self.size, self.size, 3), PAD_VALUE, dtype=np.uint8)
+        self.blob = np.empty((batch, 3, self.size, self.size), dtype=np.float32)
+        self._geometry = [None] * batch
+        if self.stats is not None:
+            self.stats.allocated(2)
+
+    def fill(self, images: Sequence[Any]) -> np.ndarray:
+        """Letterbox `images` (BGR) into the buffer; returns the RGB 0..1 blob view ``(N, 3, S, S)``."""
+        count = len(images)
+        self._reserve(count)
+        start = time.perf_counter()
+        for index, image in enumerate(images):
+            height, width = image.shape[:2]
+            _, new_w, new_h, pad_x, pad_y = letterbox_params(width, height, self.size)
+            canvas = self.canvas[index]
+            geometry = (new_w, new_h, pad_x, pad_y)
+            if self._geometry[index] != geometry:
+                # The padding only changes with the frame geometry
+                canvas[...] = PAD_VALUE
+                self._geometry[index] = geometry
+            cv2.resize(  # type: ignore[union-attr]
+                image, (new_w, new_h), dst=canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w],
+                interpolation=cv2.INTER_LINEAR,  # type: ignore[union-attr]
+            )
+        resized = time.perf_counter()
+        for index in range(count):
+            for channel in range(3):
+                # BGR canvas -> RGB planes, scaled to 0..1 without a temporary
+                np.multiply(self.canvas[index, :, :, 2 - channel], _SCALE, out=self.blob[index, channel])
+        done = time.perf_counter()
+        if self.stats is not None:
+            self.stats.record("letterbox", (resized - start) * 1000.0, frames=count)
+            self.stats.record("blob", (done - resized) * 1000.0)
+        return self.blob[:count]
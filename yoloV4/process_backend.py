@@ -0,0 +1,258 @@
+"""
+Process-pool inference backend for YOLOv4.
+
+Pre/post-processing in `yolov4_detector.py` is Python code that holds the GIL,
+so threads in the camera server mostly take turns. This backend runs K worker
+processes that each load the network once. Frames are copied into
+`multiprocessing.shared_memory` slots and only the slot index, frame shape and
+thresholds travel over the task queue; workers send back the small
+``{"persons": [...], "objects": [...]}`` dict that `detect_all` returns.
+
+Enable it with ``YOLO_PROCESS_WORKERS=K`` (or ``YOLOv4PersonDetector(process_workers=K)``).
+"""
+
+from __future__ import annotations
+
+import itertools
+import logging
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from .model_registry import InferencePoolBusy
+except ImportError:  # executed as a script from inside yoloV4/
+    from model_registry import InferencePoolBusy  # type: ignore
+
+LOGGER = logging.getLogger(__name__)
+
+# Largest frame a slot can hold (1080p BGR); bigger frames are rejected
+DEFAULT_MAX_FRAME_SHAPE = (1080, 1920, 3)
+
+
+def _worker_main(
+    model_path: str, slot_names: List[str], tasks: Any, results: Any, detector_kwargs: Dict[str, Any]
+) -> None:
+    """Worker process: load the detector once, then serve frames from shared memory."""
+    try:
+        from yoloV4.yolov4_detector import YOLOv4PersonDetector
+    except ImportError:  # yoloV4/ itself is on sys.path
+        from yolov4_detector import YOLOv4PersonDetector  # type: ignore
+
+    # Spawned workers share the parent's resource tracker, so attaching here
+    # does not make the blocks disappear when a worker exits; the parent unlinks them.
+    slots = [shared_memory.SharedMemory(name=name) for name in slot_names]
+    detector = YOLOv4PersonDetector(
+        model_path=model_path, pool_size=1, batch_window_ms=0, process_workers=0, **detector_kwargs
+    )
+    results.put(("ready", os.getpid(), detector.net is not None, None, 0.0))
+
+    parent = os.getppid()
+    while True:
+        try:
+            task = tasks.get(timeout=1.0)
+        except queue.Empty:
+            # Exit with the server even if it was killed without calling close()
+            if os.getppid() != parent:
+                break
+            continue
+        if task is None:
+            break
+        request_id, slot, shape, thresholds = task
+        start = time.perf_counter()
+        try:
+            frame = np.ndarray(shape, dtype=np.uint8, buffer=slots[slot].buf)
+            detector.conf_threshold, detector.score_threshold, detector.nms_threshold = thresholds
+            result = detector.detect_all(frame)
+            del frame
+            results.put((request_id, os.getpid(), result, None, time.perf_counter() - start))
+        except Exception as exc:
+            results.put((request_id, os.getpid(), None, repr(exc), time.perf_counter() - start))
+
+    for shm in slots:
+        shm.close()
+
+
+class ProcessInferenceBackend:
+    """K worker processes fed through shared-memory frame slots."""
+
+    def __init__(
+        self,
+        model_path: str = "yoloV4",
+        workers: int = 2,
+        slots: Optional[int] = None,
+        max_frame_shape: Tuple[int, int, int] = DEFAULT_MAX_FRAME_SHAPE,
+        admission_timeout: float = 2.0,
+        result_timeout: float = 30.0,
+        detector_kwargs: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.model_path = str(model_path)
+        self.workers = max(1, int(workers))
+        self.admission_timeout = admission_timeout
+        self.result_timeout = result_timeout
+        self.slot_bytes = int(np.prod(max_frame_shape))
+        # Two slots per worker lets the next frame be copied in while one is running
+        slot_count = slots or self.workers * 2
+        self._shms = [shared_memory.SharedMemory(create=True, size=self.slot_bytes) for _ in range(slot_count)]
+        self._free_slots: "queue.Queue[int]" = queue.Queue()
+        for i in range(slot_count):
+            self._free_slots.put(i)
+
+        ctx = mp.get_context("spawn")  # fork is unsafe with the server's threads and OpenCV
+        self._tasks = ctx.Queue()
+        self._results = ctx.Queue()
+        self._procs = [
+            ctx.Process(
+                target=_worker_main,
+                args=(
+                    self.model_path,
+                    [shm.name for shm in self._shms],
+                    self._tasks,
+                    self._results,
+                    dict(detector_kwargs or {}),
+                ),
+                name="yolo-worker-{}".format(i),
+                daemon=True,
+            )
+            for i in range(self.workers)
+        ]
+        self._ids = itertools.count()
+        self._pending: Dict[int, Tuple[Future, int]] = {}
+        self._pending_lock = threading.Lock()
+        self._ready: Dict[int, bool] = {}
+        self._ready_event = threading.Event()
+        self._served: Dict[int, int] = {}
+        self._busy_seconds = 0.0
+        self.rejected = 0
+        self._closed = False
+        self._reader = threading.Thread(target=self._read_results, name="yolo-worker-results", daemon=True)
+
+    def start(self, timeout: float = 120.0) -> bool:
+        """Start the workers and wait until each has loaded the network.
+
+        Returns False (and shuts the pool down) if a worker could not load the
+        YOLO weights in time, so the caller can fall back to in-process inference.
+        """
+        for proc in self._procs:
+            proc.start()
+        self._reader.start()
+        if not self._ready_event.wait(timeout) or not all(self._ready.values()):
+            LOGGER.warning("YOLO worker processes failed to load %s", self.model_path)
+            self.close()
+            return False
+        print(f"[YOLOV4] {self.workers} inference worker processes ready")
+        return True
+
+    def _read_results(self) -> None:
+        while True:
+            try:
+                message = self._results.get()
+            except (EOFError, OSError):
+                return
+            if message is None:
+                return
+            request_id, pid, result, error, seconds = message
+            if request_id == "ready":
+                self._ready[pid] = bool(result)
+                if len(self._ready) == self.workers:
+                    self._ready_event.set()
+                continue
+            with self._pending_lock:
+                future, slot = self._pending.pop(request_id, (None, -1))
+                self._served[pid] = self._served.get(pid, 0) + 1
+                self._busy_seconds += seconds
+            if slot >= 0:
+                self._free_slots.put(slot)
+            if future is None:
+                continue
+            if error is not None:
+                future.set_exception(RuntimeError("YOLO worker {} failed: {}".format(pid, error)))
+            else:
+                future.set_result(result)
+
+    def detect_all(self, image: Any, thresholds: Tuple[float, float, float] = (0.3, 0.5, 0.4)) -> Dict[str, List[Dict[str, Any]]]:
+        """Run `detect_all` for one BGR frame on a worker process."""
+        if self._closed:
+            raise RuntimeError("process backend is closed")
+        frame = np.ascontiguousarray(image, dtype=np.uint8)
+        if frame.nbytes > self.slot_bytes:
+            raise ValueError("frame of {} bytes does not fit a {} byte slot".format(frame.nbytes, self.slot_bytes))
+        try:
+            slot = self._free_slots.get(timeout=self.admission_timeout)
+        except queue.Empty:
+            self.rejected += 1
+            raise InferencePoolBusy("all {} worker slots are busy".format(len(self._shms)))
+
+        np.ndarray(frame.shape, dtype=np.uint8, buffer=self._shms[slot].buf)[...] = frame
+        request_id = next(self._ids)
+        future: Future = Future()
+        with self._pending_lock:
+            self._pending[request_id] = (future, slot)
+        self._tasks.put((request_id, slot, frame.shape, tuple(float(t) for t in thresholds)))
+        try:
+            return future.result(timeout=self.result_timeout)
+        except FutureTimeout:
+            # The slot stays reserved until the worker answers (or forever if it died)
+            raise RuntimeError("YOLO worker did not answer within {}s".format(self.result_timeout))
+
+    def alive(self) -> int:
+        return sum(1 for proc in self._procs if proc.is_alive())
+
+    def info(self) -> Dict[str, Any]:
+        with self._pending_lock:
+            served = dict(self._served)
+            in_flight = len(self._pending)
+            busy_seconds = self._busy_seconds
+        total = sum(served.values())
+        return {
+            "workers": self.workers,
+            "alive": self.alive(),
+            "slots": len(self._shms),
+            "slot_mb": round(self.slot_bytes / (1024 * 1024), 1),
+            "in_flight": in_flight,
+            "served": total,
+            "served_per_worker": {str(pid): n for pid, n in served.items()},
+            "avg_worker_ms": round(busy_seconds / total * 1000.0, 2) if total else 0.0,
+            "rejected": self.rejected,
+        }
+
+    def close(self) -> None:
+        """Stop the workers and free the shared-memory slots."""
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._procs:
+            try:
+                self._tasks.put(None)
+            except Exception:
+                pass
+        for proc in self._procs:
+            if proc.pid is None:
+                continue
+            proc.join(timeout=5)
+            if proc.is_alive():
+                proc.terminate()
+        try:
+            self._results.put(None)
+        except Exception:
+            pass
+        with self._pending_lock:
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for future, _ in pending:
+            if not future.done():
+                future.set_exception(RuntimeError("process backend closed"))
+        for shm in self._shms:
+            try:
+                shm.close()
+                shm.unlink()
+            except Exception:
+                pass
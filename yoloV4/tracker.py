@@ -0,0 +1,228 @@
+"""
+Lightweight person tracker so YOLO only runs on keyframes.
+
+Detections from a keyframe are associated with existing tracks by IoU
+(greedy, best overlap first) and, for what is left, by centroid distance so
+fast movers whose boxes no longer overlap keep their track; each track carries a constant-velocity Kalman
+filter over ``(cx, cy, w, h)``. Between keyframes the filters are only
+predicted, which costs a few small matrix products instead of a forward
+pass. A new keyframe is requested every `keyframe_interval` frames, when there
+is nothing to track, or as soon as a track loses confidence (its score decays
+on every predicted frame, and a box drifting out of the image drops it).
+
+Tracks keep their ``track_id`` for as long as they keep matching detections,
+so identification votes can be accumulated per track.
+"""
+
+from __future__ import annotations
+
+import copy
+import itertools
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Constant-velocity model over (cx, cy, w, h, vcx, vcy, vw, vh), one step per frame
+_F = np.eye(8)
+_F[:4, 4:] = np.eye(4)
+_H = np.eye(4, 8)
+
+
+def center_distance_matrix(boxes_a: Sequence[Sequence[float]], boxes_b: Sequence[Sequence[float]]) -> np.ndarray:
+    """Centroid distances of ``[x, y, w, h]`` boxes in units of each `boxes_a` diagonal."""
+    a = np.asarray(boxes_a, dtype=np.float64).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float64).reshape(-1, 4)
+    ca = a[:, :2] + a[:, 2:] / 2
+    cb = b[:, :2] + b[:, 2:] / 2
+    dist = np.linalg.norm(ca[:, None, :] - cb[None, :, :], axis=-1)
+    return dist / np.maximum(np.hypot(a[:, 2], a[:, 3]), 1e-9)[:, None]
+
+
+def iou_matrix(boxes_a: Sequence[Sequence[float]], boxes_b: Sequence[Sequence[float]]) -> np.ndarray:
+    """Pairwise IoU of ``[x, y, w, h]`` boxes."""
+    a = np.asarray(boxes_a, dtype=np.float64).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float64).reshape(-1, 4)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 0] + a[:, None, 2], b[None, :, 0] + b[None, :, 2])
+    y2 = np.minimum(a[:, None, 1] + a[:, None, 3], b[None, :, 1] + b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    union = (a[:, 2] * a[:, 3])[:, None] + (b[:, 2] * b[:, 3])[None, :] - inter
+    return inter / np.maximum(union, 1e-9)
+
+
+class KalmanBoxFilter:
+    """Constant-velocity Kalman filter for one ``[x, y, w, h]`` box.
+
+    Process and measurement noise scale with the box height, as in DeepSORT,
+    so near and far persons are smoothed alike.
+    """
+
+    pos_weight = 1.0 / 20
+    vel_weight = 1.0 / 160
+
+    def __init__(self, box: Sequence[float]) -> None:
+        z = self._measurement(box)
+        self.x = np.concatenate([z, np.zeros(4)])
+        h = max(z[3], 1.0)
+        std = [2 * self.pos_weight * h] * 4 + [10 * self.vel_weight * h] * 4
+        self.P = np.diag(np.square(std))
+
+    @staticmethod
+    def _measurement(box: Sequence[float]) -> np.ndarray:
+        x, y, w, h = (float(v) for v in box[:4])
+        return np.array([x + w / 2, y + h / 2, w, h])
+
+    def predict(self) -> None:
+        h = max(self.x[3], 1.0)
+        q = np.square([self.pos_weight * h] * 4 + [self.vel_weight * h] * 4)
+        self.x = _F @ self.x
+        self.P = _F @ self.P @ _F.T + np.diag(q)
+
+    def update(self, box: Sequence[float]) -> None:
+        h = max(self.x[3], 1.0)
+        r = np.diag(np.square([self.pos_weight * h] * 4))
+        s = _H @ self.P @ _H.T + r
+        gain = self.P @ _H.T @ np.linalg.inv(s)
+        self.x = self.x + gain @ (self._measurement(box) - _H @ self.x)
+        self.P = (np.eye(8) - gain @ _H) @ self.P
+
+    def box(self) -> List[int]:
+        cx, cy, w, h = self.x[:4]
+        w, h = max(w, 1.0), max(h, 1.0)
+        return [int(round(cx - w / 2)), int(round(cy - h / 2)), int(round(w)), int(round(h))]
+
+
+class Track:
+    __slots__ = ("track_id", "filter", "detection", "confidence", "hits", "misses")
+
+    def __init__(self, track_id: int, detection: Dict[str, Any]) -> None:
+        self.track_id = track_id
+        self.filter = KalmanBoxFilter(detection["box"])
+        self.detection = detection
+        self.confidence = float(detection.get("confidence") or 0.0)
+        self.hits = 1
+        self.misses = 0
+
+
+class PersonTracker:
+    """IoU + Kalman tracker for the person boxes of one camera stream."""
+
+    def __init__(
+        self,
+        keyframe_interval: int = 3,
+        iou_threshold: float = 0.3,
+        max_center_distance: float = 0.75,
+        max_missed: int = 2,
+        min_confidence: float = 0.3,
+        decay: float = 0.9,
+    ) -> None:
+        self.keyframe_interval = max(1, int(keyframe_interval))
+        self.iou_threshold = float(iou_threshold)
+        self.max_center_distance = float(max_center_distance)
+        self.max_missed = int(max_missed)
+        self.min_confidence = float(min_confidence)
+        self.decay = float(decay)
+        self.tracks: List[Track] = []
+        self.objects: List[Dict[str, Any]] = []
+        self.since_keyframe = 0
+        self.keyframes = 0
+        self.tracked_frames = 0
+        self._ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def _visible(self) -> List[Track]:
+        return [t for t in self.tracks if t.misses == 0]
+
+    def needs_detection(self) -> bool:
+        """True when the next frame should run the full detector."""
+        visible = self._visible()
+        return (
+            not visible
+            or self.since_keyframe + 1 >= self.keyframe_interval
+            or any(t.confidence * self.decay < self.min_confidence for t in visible)
+        )
+
+    def update(self, detections: List[Dict[str, Any]], objects: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+        """Associate keyframe detections with tracks; tags each detection with ``track_id``."""
+        for track in self.tracks:
+            track.filter.predict()
+        boxed = [d for d in detections if isinstance(d, dict) and len(d.get("box") or []) >= 4]
+        matched_tracks, matched_dets = set(), set()
+        if self.tracks and boxed:
+            predicted = [t.filter.box() for t in self.tracks]
+            detected = [d["box"] for d in boxed]
+            # Best overlaps first, then the nearest centroids among the leftovers
+            overlaps = iou_matrix(predicted, detected)
+            distances = center_distance_matrix(predicted, detected)
+            for scores, accept in (
+                (overlaps, lambda ti, di: overlaps[ti, di] >= self.iou_threshold),
+                (-distances, lambda ti, di: distances[ti, di] <= self.max_center_distance),
+            ):
+                for flat in np.argsort(-scores, axis=None, kind="stable"):
+                    ti, di = divmod(int(flat), scores.shape[1])
+                    if not accept(ti, di):
+                        break
+                    if ti in matched_tracks or di in matched_dets:
+                        continue
+                    matched_tracks.add(ti)
+                    matched_dets.add(di)
+                    track = self.tracks[ti]
+                    track.filter.update(boxed[di]["box"])
+                    track.detection = boxed[di]
+                    track.confidence = float(boxed[di].get("confidence") or 0.0)
+                    track.hits += 1
+                    track.misses = 0
+                    boxed[di]["track_id"] = track.track_id
+
+        survivors = []
+        for index, track in enumerate(self.tracks):
+            if index not in matched_tracks:
+                track.misses += 1
+            if track.misses <= self.max_missed:
+                survivors.append(track)
+        for index, detection in enumerate(boxed):
+            if index not in matched_dets:
+                track = Track(next(self._ids), detection)
+                detection["track_id"] = track.track_id
+                survivors.append(track)
+        self.tracks = survivors
+        self.objects = copy.deepcopy(objects or [])
+        self.since_keyframe = 0
+        self.keyframes += 1
+        return detections
+
+    def predict(self, image_shape: Optional[Tuple[int, ...]] = None) -> List[Dict[str, Any]]:
+        """Propagate the visible tracks one frame without running the detector."""
+        self.since_keyframe += 1
+        self.tracked_frames += 1
+        persons = []
+        for track in self._visible():
+            track.filter.predict()
+            track.confidence *= self.decay
+            box = track.filter.box()
+            if image_shape is not None:
+                height, width = image_shape[:2]
+                x1, y1 = max(box[0], 0), max(box[1], 0)
+                x2, y2 = min(box[0] + box[2], width), min(box[1] + box[3], height)
+                if (x2 - x1) * (y2 - y1) < 0.5 * box[2] * box[3]:
+                    # Mostly outside the frame: stop propagating, the next frame re-detects
+                    track.misses += 1
+                    continue
+            persons.append({
+                "class": track.detection.get("class", "person"),
+                # Report the keyframe score; the decayed one only drives re-detection
+                "confidence": track.detection.get("confidence", 0.0),
+                "box": box,
+                "track_id": track.track_id,
+                "tracked": True,
+            })
+        return persons
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "tracks": len(self._visible()),
+            "keyframes": self.keyframes,
+            "tracked_frames": self.tracked_frames,
+        }
@@ -0,0 +1,367 @@
+"""
+Video ingest for fixed cameras: files, V4L2 devices and RTSP streams.
+
+A `VideoSource` opens its source with `cv2.VideoCapture` and runs two threads:
+
+* the reader grabs frames, keeps one every ``1 / target_fps`` seconds of stream
+  time (the others are grabbed but never decoded into a BGR image) and pushes
+  it into a small `FrameRing`; when the ring is full the oldest frame is
+  dropped so a slow detector never builds up latency;
+* the worker takes frames from the ring, runs ``detector.detect_all`` (and the
+  identifier, when given) under the source's own stream id, so the change gate
+  and the tracker keep per-camera state, and hands the result to `on_result`.
+  The source's name and `priority` also tag its requests to the shared
+  inference pool (see fair_queue.py).
+
+Live sources reconnect after a read failure. Files are paced at their own
+frame rate by default, like a camera; with ``realtime=False`` they are read as
+fast as the detector allows and nothing is dropped, which is what tests and
+offline runs want.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import cv2  # type: ignore
+except Exception:  # pragma: no cover - OpenCV may be missing in some environments
+    cv2 = None  # type: ignore
+
+try:
+    from .fair_queue import inference_client
+    from .model_registry import InferencePoolBusy
+except ImportError:  # pragma: no cover - script usage
+    from fair_queue import inference_client  # type: ignore
+    from model_registry import InferencePoolBusy  # type: ignore
+
+LOGGER = logging.getLogger(__name__)
+
+_STREAM_PREFIXES = ("rtsp://", "rtsps://", "rtmp://", "http://", "https://", "udp://", "tcp://")
+
+
+def describe_source(source: Any) -> tuple:
+    """Return ``(kind, target)``; kind is ``"file"``, ``"device"`` or ``"stream"``."""
+    if isinstance(source, int):
+        return "device", source
+    text = str(source).strip()
+    if text.isdigit():
+        return "device", int(text)
+    if text.lower().startswith(_STREAM_PREFIXES):
+        return "stream", text
+    if text.startswith("/dev/video"):
+        return "device", text
+    return "file", text
+
+
+def redact_source(source: Any) -> str:
+    """Source string safe for logs and /status (drops RTSP passwords)."""
+    return re.sub(r"(://[^:/@]+):[^@/]*@", r"\1:***@", str(source))
+
+
+def open_capture(source: Any) -> Any:
+    """`cv2.VideoCapture` for `source`, preferring V4L2 / FFmpeg where they apply."""
+    if cv2 is None:
+        raise RuntimeError("OpenCV is required for video sources")
+    kind, target = describe_source(source)
+    if kind == "device" and sys.platform.startswith("linux"):
+        capture = cv2.VideoCapture(target, cv2.CAP_V4L2)
+    elif kind == "stream":
+        capture = cv2.VideoCapture(target, cv2.CAP_FFMPEG)
+    else:
+        capture = cv2.VideoCapture(target)
+    if kind != "file":
+        try:
+            # Keep the driver-side queue short; the ring buffer does the buffering
+            capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        except Exception:
+            pass
+    return capture
+
+
+class FrameRing:
+    """Bounded frame queue that drops the oldest frame when it is full."""
+
+    def __init__(self, size: int = 2) -> None:
+        self.size = max(1, int(size))
+        self._items: "deque[Any]" = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self.pushed = 0
+        self.dropped = 0
+
+    def put(self, item: Any, block: bool = False, timeout: float | None = None) -> None:
+        """Add `item`; drop the oldest entry when full unless `block` waits for room."""
+        with self._cond:
+            if block:
+                self._cond.wait_for(lambda: len(self._items) < self.size or self._closed, timeout)
+            if self._closed:
+                return
+            if len(self._items) >= self.size:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self.pushed += 1
+            self._cond.notify_all()
+
+    def get(self, timeout: float | None = None) -> Optional[Any]:
+        """Oldest frame, or None on timeout / when closed and drained."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items or self._closed, timeout):
+                return None
+            if not self._items:
+                return None
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class VideoSource:
+    """Decode one camera/file on a dedicated thread and feed the detector at `target_fps`."""
+
+    def __init__(
+        self,
+        source: Any,
+        detector: Any,
+        identifier: Any | None = None,
+        on_result: Callable[[Dict[str, Any]], None] | None = None,
+        name: str | None = None,
+        target_fps: float = 5.0,
+        buffer_size: int = 2,
+        loop: bool = False,
+        realtime: bool = True,
+        reconnect_delay: float = 2.0,
+        priority: int = 0,
+    ) -> None:
+        self.source = source
+        self.kind, _ = describe_source(source)
+        self.name = name or redact_source(source)
+        self.detector = detector
+        self.identifier = identifier
+        self.on_result = on_result
+        self.target_fps = float(target_fps)
+        self.loop = bool(loop)
+        self.realtime = bool(realtime)
+        self.reconnect_delay = float(reconnect_delay)
+        self.priority = int(priority)
+        self.ring = FrameRing(buffer_size)
+        self.state = "idle"
+        self.source_fps: float | None = None
+        self.grabbed = 0
+        self.decoded = 0
+        self.processed = 0
+        self.busy = 0
+        self.errors = 0
+        self.reconnects = 0
+        self.last_result_at: float | None = None
+        self._latency_ms: "deque[float]" = deque(maxlen=100)
+        self._stop = threading.Event()
+        self._reader: threading.Thread | None = None
+        self._worker: threading.Thread | None = None
+        self._started_at: float | None = None
+
+    # -- lifecycle -----------------------------------------------------
+
+    def start(self) -> "VideoSource":
+        if self._reader is not None:
+            return self
+        self._stop.clear()
+        self.state = "starting"
+        self._started_at = time.monotonic()
+        self._reader = threading.Thread(target=self._read_loop, name="video-read-{}".format(self.name), daemon=True)
+        self._worker = threading.Thread(target=self._work_loop, name="video-detect-{}".format(self.name), daemon=True)
+        self._reader.start()
+        self._worker.start()
+        LOGGER.info("Video source %s (%s) started at %.1f fps", self.name, self.kind, self.target_fps)
+        return self
+
+    def stop(self, timeout: float = 2.0) -> None:
+        self._stop.set()
+        self.ring.close()
+        self.join(timeout)
+        if self.state not in ("finished", "failed"):
+            self.state = "stopped"
+
+    def join(self, timeout: float | None = None) -> bool:
+        """Wait for both threads; True when they have exited."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in (self._reader, self._worker):
+            # stop() may be called from on_result, i.e. on the worker itself
+            if thread is not None and thread is not threading.current_thread():
+                thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        return not self.running
+
+    @property
+    def running(self) -> bool:
+        return any(t is not None and t.is_alive() for t in (self._reader, self._worker))
+
+    # -- reader --------------------------------------------------------
+
+    def _open(self) -> Any:
+        capture = open_capture(self.source)
+        if not capture.isOpened():
+            capture.release()
+            return None
+        fps = capture.get(cv2.CAP_PROP_FPS) if cv2 is not None else 0.0
+        self.source_fps = float(fps) if fps and fps > 0 and fps < 1000 else None
+        return capture
+
+    def _read_loop(self) -> None:
+        capture = None
+        try:
+            interval = 1.0 / self.target_fps if self.target_fps > 0 else 0.0
+            # Offline files wait for the worker instead of dropping frames
+            block = self.kind == "file" and not self.realtime
+            position = 0  # frames grabbed since the (re)open, for file timestamps
+            next_due = 0.0
+            paced_from = time.monotonic()
+            while not self._stop.is_set():
+                if capture is None:
+                    capture = self._open()
+                    if capture is None:
+                        if self.kind == "file":
+                            LOGGER.warning("Video source %s could not be opened", self.name)
+                            self.state = "failed"
+                            return
+                        self.state = "reconnecting"
+                        self._stop.wait(self.reconnect_delay)
+                        self.reconnects += 1
+                        continue
+                    self.state = "running"
+                    position, next_due, paced_from = 0, 0.0, time.monotonic()
+
+                if not capture.grab():
+                    capture.release()
+                    capture = None
+                    if self.kind == "file":
+                        if self.loop:
+                            continue
+                        self.state = "finished"
+                        return
+                    LOGGER.warning("Video source %s lost its stream; reconnecting", self.name)
+                    self.state = "reconnecting"
+                    self._stop.wait(self.reconnect_delay)
+                    self.reconnects += 1
+                    continue
+                self.grabbed += 1
+                position += 1
+
+                if self.kind == "file" and self.source_fps:
+                    # Stream time of this frame; pace it like a camera when realtime
+                    stream_ts = (position - 1) / self.source_fps
+                    if self.realtime:
+                        delay = paced_from + stream_ts - time.monotonic()
+                        if delay > 0:
+                            self._stop.wait(delay)
+                else:
+                    stream_ts = time.monotonic() - paced_from
+                if stream_ts + 1e-6 < next_due:
+                    continue  # grabbed but not decoded: below the target rate
+                next_due = max(next_due + interval, stream_ts) if next_due else stream_ts + interval
+
+                ok, frame = capture.retrieve()
+                if not ok or frame is None:
+                    continue
+                self.decoded += 1
+                self.ring.put(
+                    {"frame": frame, "index": self.grabbed - 1, "stream_ts": stream_ts, "captured_at": time.time()},
+                    block=block,
+                )
+        except Exception:
+            LOGGER.exception("Video source %s reader failed", self.name)
+            self.state = "failed"
+        finally:
+            if capture is not None:
+                capture.release()
+            # Let the worker drain what is left, then exit
+            self.ring.close()
+
+    # -- worker --------------------------------------------------------
+
+    def _work_loop(self) -> None:
+        while True:
+            item = self.ring.get(timeout=0.5)
+            if item is None:
+                if self.ring.closed and not len(self.ring):
+                    return
+                continue
+            if self._stop.is_set():
+                return
+            start = time.perf_counter()
+            try:
+                result = self.process(item)
+            except InferencePoolBusy:
+                # Shared pool saturated by other clients: skip this frame
+                self.busy += 1
+                continue
+            except Exception:
+                self.errors += 1
+                LOGGER.exception("Video source %s: detection failed", self.name)
+                continue
+            self._latency_ms.append((time.perf_counter() - start) * 1000.0)
+            self.processed += 1
+            self.last_result_at = time.time()
+            if self.on_result is not None:
+                try:
+                    self.on_result(result)
+                except Exception:
+                    LOGGER.exception("Video source %s: result handler failed", self.name)
+
+    def process(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Detect (and identify) one ring entry; returns the result passed to `on_result`."""
+        frame = item["frame"]
+        with inference_client(self.name, self.priority):
+            detections = self.detector.detect_all(frame, stream_id=self.name)
+            identified = []
+            if self.identifier is not None and hasattr(self.identifier, "detect_and_identify_in_array"):
+                identified = self.identifier.detect_and_identify_in_array(frame, detections=detections)
+        return {
+            "source": self.name,
+            "frame_index": item["index"],
+            "stream_ts": round(item["stream_ts"], 3),
+            "captured_at": item["captured_at"],
+            "shape": list(frame.shape),
+            "detections": detections,
+            "identified": identified,
+        }
+
+    def info(self) -> Dict[str, Any]:
+        latencies = list(self._latency_ms)
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "source": redact_source(self.source),
+            "state": self.state,
+            "source_fps": self.source_fps,
+            "target_fps": self.target_fps,
+            "priority": self.priority,
+            "grabbed": self.grabbed,
+            "decoded": self.decoded,
+            "dropped": self.ring.dropped,
+            "queued": len(self.ring),
+            "processed": self.processed,
+            "busy": self.busy,
+            "errors": self.errors,
+            "reconnects": self.reconnects,
+            "processed_fps": round(self.processed / elapsed, 2) if elapsed > 0 else 0.0,
+            "avg_ms": round(sum(latencies) / len(latencies), 1) if latencies else None,
+        }
@@ -5,9 +5,11 @@ Real machine learning detection (not hardcoded predictions)
 
 from __future__ import annotations
 
+import copy
 import logging
 import os
 import threading
+import time
 from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, List
@@ -56,14 +58,168 @@ except Exception:  # pragma: no cover - allow imports to succeed during editor a
             return {"medications": []}
 
 
+try:
+    from .batch_scheduler import BatchScheduler
+    from .detection_cache import content_hash, get_detection_cache
+    from .error_recorder import get_error_recorder
+    from .fair_queue import client_is_set, inference_client
+    from .frame_gate import FrameChangeGate
+    from .inference_backends import BACKENDS, get_backend
+    from .model_registry import MODEL_VARIANTS, InferencePoolBusy, get_model_registry, model_files
+    from .preprocess import LetterboxBuffer, PreprocessStats, letterbox_params
+    from .tracker import PersonTracker
+except ImportError:  # executed as a script from inside yoloV4/
+    from batch_scheduler import BatchScheduler  # type: ignore
+    from detection_cache import content_hash, get_detection_cache  # type: ignore
+    from error_recorder import get_error_recorder  # type: ignore
+    from fair_queue import client_is_set, inference_client  # type: ignore
+    from frame_gate import FrameChangeGate  # type: ignore
+    from inference_backends import BACKENDS, get_backend  # type: ignore
+    from model_registry import MODEL_VARIANTS, InferencePoolBusy, get_model_registry, model_files  # type: ignore
+    from preprocess import LetterboxBuffer, PreprocessStats, letterbox_params  # type: ignore
+    from tracker import PersonTracker  # type: ignore
+
+
 LOGGER = logging.getLogger(__name__)
 
+SETTINGS_FILE = Path(__file__).resolve().parent.parent / "medication_management_system" / "config" / "settings.py"
+
+
+def _load_settings() -> Dict[str, Any]:
+    """Upper-case YOLO_* values from the project settings file, if it exists."""
+    path = Path(os.environ.get("YOLO_SETTINGS_FILE", str(SETTINGS_FILE)))
+    try:
+        import importlib.util
+
+        spec = importlib.util.spec_from_file_location("_yolo_project_settings", path)
+        module = importlib.util.module_from_spec(spec)  # type: ignore[arg-type]
+        spec.loader.exec_module(module)  # type: ignore[union-attr]
+    except Exception:
+        return {}
+    return {k: v for k, v in vars(module).items() if k.startswith("YOLO_")}
+
+
+_SETTINGS = _load_settings()
+
+# Model variant (see MODEL_VARIANTS) and network input size; environment wins over settings.py
+MODEL_VARIANT = os.environ.get("YOLO_MODEL_VARIANT") or str(_SETTINGS.get("YOLO_MODEL_VARIANT", "yolov4"))
+INPUT_SIZE = int(os.environ.get("YOLO_INPUT_SIZE") or _SETTINGS.get("YOLO_INPUT_SIZE", 416))
+# Inference backend and target (see inference_backends.py), e.g. opencv/cpu, opencv/fp16, onnxruntime/cpu
+BACKEND = os.environ.get("YOLO_BACKEND") or str(_SETTINGS.get("YOLO_BACKEND", "opencv"))
+TARGET = os.environ.get("YOLO_TARGET") or str(_SETTINGS.get("YOLO_TARGET", "cpu"))
+# Letterbox frames into a reusable per-context buffer (see preprocess.py) instead of stretching
+LETTERBOX = str(os.environ.get("YOLO_LETTERBOX", _SETTINGS.get("YOLO_LETTERBOX", True))).lower() in ("1", "true", "yes", "on")
+# Synthetic forward passes run by warm_up() before serving
+WARMUP_RUNS = int(os.environ.get("YOLO_WARMUP_RUNS", "1"))
+
+# Number of parallel inference contexts (each holds its own copy of the weights)
+POOL_SIZE = int(os.environ.get("YOLO_POOL_SIZE", "1"))
+# How long a request waits for a free context before InferencePoolBusy is raised
+POOL_WAIT_SECONDS = float(os.environ.get("YOLO_POOL_WAIT_SECONDS", "2.0"))
+# Micro-batching of concurrent frames; a window of 0 disables the scheduler
+BATCH_WINDOW_MS = float(os.environ.get("YOLO_BATCH_WINDOW_MS", "0"))
+BATCH_MAX_SIZE = int(os.environ.get("YOLO_BATCH_MAX_SIZE", "8"))
+BATCH_MAX_LATENCY_MS = float(os.environ.get("YOLO_BATCH_MAX_LATENCY_MS", "250"))
+# Run inference in K worker processes (see process_backend.py); 0 keeps it in-process
+PROCESS_WORKERS = int(os.environ.get("YOLO_PROCESS_WORKERS", "0"))
+# Reuse the last detections while the frame changes less than this (mean abs
+# diff of a 64 px grayscale thumbnail, 0-255); 0 disables the change gate
+CHANGE_THRESHOLD = float(os.environ.get("YOLO_CHANGE_THRESHOLD", "0"))
+CHANGE_MAX_SKIPS = int(os.environ.get("YOLO_CHANGE_MAX_SKIPS", "20"))
+CHANGE_MAX_AGE = float(os.environ.get("YOLO_CHANGE_MAX_AGE", "5.0"))
+# Run YOLO on every Nth frame of a stream and propagate tracked person boxes in
+# between (see tracker.py); 0 or 1 runs the detector on every frame
+KEYFRAME_INTERVAL = int(os.environ.get("YOLO_KEYFRAME_INTERVAL", "0"))
+# Second medication pass on upscaled crops around hands/tables (see detect_medications_roi)
+MEDICATION_ROI = os.environ.get("YOLO_MEDICATION_ROI", "0").lower() in ("1", "true", "yes", "on")
+ROI_MAX_CROPS = int(os.environ.get("YOLO_ROI_MAX_CROPS", "4"))
+# Stage-one classes whose boxes are searched for medication (COCO names, both spellings)
+ROI_CONTEXT_CLASSES = ("diningtable", "dining table", "bed", "sofa", "couch")
+# Haar-cascade fallback: frames are shrunk to this width before detectMultiScale,
+# faces smaller than CASCADE_MIN_FACE (in shrunk pixels) are ignored, and between
+# full scans only the neighbourhood of the previous faces is searched
+CASCADE_WIDTH = int(os.environ.get("YOLO_CASCADE_WIDTH", "320"))
+CASCADE_MIN_FACE = int(os.environ.get("YOLO_CASCADE_MIN_FACE", "24"))
+CASCADE_FULL_SCAN_EVERY = int(os.environ.get("YOLO_CASCADE_FULL_SCAN_EVERY", "10"))
+
+_FACE_CASCADE: Any = None
+_FACE_CASCADE_LOCK = threading.Lock()
+# The shared classifier is not safe to run from two threads at once (OpenCV asserts in getScaleData)
+_FACE_CASCADE_RUN_LOCK = threading.Lock()
+
+
+def load_face_cascade() -> Any:
+    """Load the frontal-face Haar cascade once per process; None if it is unavailable."""
+    global _FACE_CASCADE
+    with _FACE_CASCADE_LOCK:
+        if _FACE_CASCADE is None and cv2 is not None:
+            cascade_path = Path(cv2.data.haarcascades) / "haarcascade_frontalface_default.xml"  # type: ignore[attr-defined]
+            cascade = cv2.CascadeClassifier(str(cascade_path))
+            if cascade.empty():
+                LOGGER.warning("Failed to load Haar cascade at %s", cascade_path)
+                cascade = False
+            _FACE_CASCADE = cascade
+        return _FACE_CASCADE or None
+
+
+class _CascadeState:
+    """Faces the cascade found in a stream's previous frame (shrunk-frame pixels), for the local search."""
+
+    __slots__ = ("faces", "shape", "frames", "lock")
+
+    def __init__(self) -> None:
+        self.faces: List[List[int]] = []
+        self.shape: Any = None
+        self.frames = 0
+        self.lock = threading.Lock()
+
 
 class YOLOv4PersonDetector:
     """YOLOv4-backed person detector with resilient fallbacks."""
 
-    def __init__(self, model_path: str = "yoloV4") -> None:
+    def __init__(
+        self,
+        model_path: str = "yoloV4",
+        conf_threshold: float = 0.3,
+        score_threshold: float = 0.5,
+        nms_threshold: float = 0.4,
+        pool_size: int | None = None,
+        admission_timeout: float | None = None,
+        batch_window_ms: float | None = None,
+        batch_max_size: int | None = None,
+        batch_max_latency_ms: float | None = None,
+        process_workers: int | None = None,
+        variant: str | None = None,
+        input_size: int | None = None,
+        backend: str | None = None,
+        target: str | None = None,
+        change_threshold: float | None = None,
+        keyframe_interval: int | None = None,
+        medication_roi: bool | None = None,
+        detection_cache: bool = True,
+        letterbox: bool | None = None,
+    ) -> None:
         self.model_path = Path(model_path)
+        self.variant = MODEL_VARIANT if variant is None else variant
+        self.input_size = INPUT_SIZE if input_size is None else int(input_size)
+        self.backend = BACKEND if backend is None else backend
+        self.target = TARGET if target is None else target
+        if self.backend not in BACKENDS:
+            LOGGER.warning("Unknown inference backend %r (expected one of %s); using opencv", self.backend, sorted(BACKENDS))
+            self.backend, self.target = "opencv", "cpu"
+        if self.variant not in MODEL_VARIANTS:
+            LOGGER.warning("Unknown YOLO variant %r (expected one of %s); using yolov4", self.variant, sorted(MODEL_VARIANTS))
+            self.variant = "yolov4"
+        if self.input_size <= 0 or self.input_size % 32:
+            LOGGER.warning("YOLO input size must be a positive multiple of 32, got %s; using 416", self.input_size)
+            self.input_size = 416
+        self.pool_size = POOL_SIZE if pool_size is None else pool_size
+        self.admission_timeout = POOL_WAIT_SECONDS if admission_timeout is None else admission_timeout
+        # Post-processing thresholds: rows at or below `conf_threshold` are dropped
+        # while decoding; `score_threshold`/`nms_threshold` are passed to NMSBoxes.
+        self.conf_threshold = conf_threshold
+        self.score_threshold = score_threshold
+        self.nms_threshold = nms_threshold
         self.net = None
         self.classes: List[str] = []
         self.output_layers: List[str] = []
@@ -71,10 +227,48 @@ class YOLOv4PersonDetector:
         self.face_cascade = None
         self.use_cascade = False
         self.use_simulated = False
+        self.cascade_width = CASCADE_WIDTH
+        self.cascade_full_scan_every = CASCADE_FULL_SCAN_EVERY
+        # Per stream: faces found in its previous frame, for the local search
+        self._cascade_states: Dict[str, _CascadeState] = {}
+        self._cascade_lock = threading.Lock()
         self.net_lock = threading.Lock()
+        self._model = None
+        self.scheduler: BatchScheduler | None = None
+        self.process_backend = None
+        self.warmup: Dict[str, Any] | None = None
+        self.change_gate: FrameChangeGate | None = None
+        self.medication_roi = MEDICATION_ROI if medication_roi is None else bool(medication_roi)
+        self.letterbox = LETTERBOX if letterbox is None else bool(letterbox)
+        # One preallocated input buffer per inference context (or batch worker thread)
+        self._buffers: Dict[Any, LetterboxBuffer] = {}
+        self._buffers_lock = threading.Lock()
+        self.preprocess_stats = PreprocessStats()
+        # Shared LRU of results keyed by frame content + model config (detection_cache.py)
+        self.cache = get_detection_cache() if detection_cache else None
+        self.keyframe_interval = 0
+        self._trackers: Dict[str, PersonTracker] = {}
+        self._trackers_lock = threading.Lock()
 
         print("[YOLOV4] Initializing YOLOv4 detector...")
-        self._setup_yolo()
+        workers = PROCESS_WORKERS if process_workers is None else process_workers
+        if workers <= 0 or not self._setup_process_backend(workers):
+            self._setup_yolo()
+
+        window = BATCH_WINDOW_MS if batch_window_ms is None else batch_window_ms
+        if window > 0 and self.net is not None:
+            self.enable_batching(
+                window_ms=window,
+                max_batch=BATCH_MAX_SIZE if batch_max_size is None else batch_max_size,
+                max_latency_ms=BATCH_MAX_LATENCY_MS if batch_max_latency_ms is None else batch_max_latency_ms,
+            )
+
+        threshold = CHANGE_THRESHOLD if change_threshold is None else change_threshold
+        if threshold > 0:
+            self.enable_change_gate(threshold)
+        interval = KEYFRAME_INTERVAL if keyframe_interval is None else keyframe_interval
+        if interval > 1:
+            self.enable_tracking(interval)
 
     def _setup_yolo(self) -> None:
         if cv2 is None:
@@ -82,50 +276,286 @@ class YOLOv4PersonDetector:
             self._setup_simulated_detector()
             return
 
-        weights_file = self.model_path / "yolov4.weights"
-        config_file = self.model_path / "yolov4.cfg"
         names_file = self.model_path / "coco.names"
+        required = [self.model_path / name for name in get_backend(self.backend).model_files(self.variant)]
 
-        if not (weights_file.exists() and config_file.exists() and names_file.exists()):
+        if not (all(f.exists() for f in required) and names_file.exists()):
             print(f"[YOLOV4] Missing YOLO files in {self.model_path.resolve()}")
             self._setup_fallback_detector()
             return
 
-        try:
-            print(f"[YOLOV4] Loading weights from {weights_file}")
-            self.net = cv2.dnn.readNet(str(weights_file), str(config_file))  # type: ignore[attr-defined]
-            self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)  # type: ignore[attr-defined]
-            self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)  # type: ignore[attr-defined]
+        # The network itself is shared process-wide through the model registry
+        model = get_model_registry().acquire(
+            self.model_path,
+            user=self,
+            backend=self.backend,
+            target=self.target,
+            pool_size=self.pool_size,
+            variant=self.variant,
+        )
+        if model is None:
+            LOGGER.warning("YOLOv4 network could not be loaded from %s; enabling fallback", self.model_path)
+            self._setup_fallback_detector()
+            return
 
+        self._model = model
+        self.net = model.net
+        self.net_lock = model.lock
+        self.classes = list(model.classes)
+        self.output_layers = list(model.output_layers)
+        print(f"[YOLOV4] Loaded {len(self.classes)} classes ({self.variant} @ {self.input_size})")
+        print("[YOLOV4] Ready for person detection")
+
+    def enable_batching(self, window_ms: float = 20.0, max_batch: int = 8, max_latency_ms: float = 250.0) -> BatchScheduler:
+        """Route forward passes through a micro-batching scheduler.
+
+        Frames from concurrent callers arriving within `window_ms` (up to
+        `max_batch`) share one `blobFromImages` + forward call. One batch can be
+        in flight per pooled inference context.
+        """
+        self.disable_batching()
+        pool = self._model.pool if self._model is not None else None
+        self.scheduler = BatchScheduler(
+            self._run_batch,
+            window_ms=window_ms,
+            max_batch=max_batch,
+            max_latency_ms=max_latency_ms,
+            workers=pool.size if pool is not None else 1,
+            input_size=(self.input_size, self.input_size),
+            make_blob=lambda images: self._input_blob(images, threading.get_ident()),
+        )
+        print(f"[YOLOV4] Micro-batching enabled (window {window_ms} ms, up to {max_batch} frames)")
+        return self.scheduler
+
+    def disable_batching(self) -> None:
+        if self.scheduler is not None:
+            self.scheduler.close()
+            self.scheduler = None
+
+    def enable_change_gate(
+        self, threshold: float = 3.0, max_skips: int = CHANGE_MAX_SKIPS, max_age: float = CHANGE_MAX_AGE
+    ) -> FrameChangeGate:
+        """Reuse the previous detections for frames that barely differ from the last analyzed one."""
+        self.change_gate = FrameChangeGate(threshold=threshold, max_skips=max_skips, max_age=max_age)
+        print(f"[YOLOV4] Change gate enabled (threshold {threshold}, max {max_skips} reused frames)")
+        return self.change_gate
+
+    def disable_change_gate(self) -> None:
+        self.change_gate = None
+
+    def gate_info(self) -> Dict[str, Any] | None:
+        return self.change_gate.info() if self.change_gate is not None else None
+
+    def enable_tracking(self, keyframe_interval: int = 3) -> None:
+        """Run the detector on every `keyframe_interval`-th frame per stream and track persons in between."""
+        with self._trackers_lock:
+            self.keyframe_interval = max(1, int(keyframe_interval))
+            self._trackers.clear()
+        print(f"[YOLOV4] Tracking enabled (YOLO on every {self.keyframe_interval} frames)")
+
+    def disable_tracking(self) -> None:
+        with self._trackers_lock:
+            self.keyframe_interval = 0
+            self._trackers.clear()
+
+    def tracking_info(self) -> Dict[str, Any] | None:
+        if self.keyframe_interval <= 1:
+            return None
+        with self._trackers_lock:
+            trackers = dict(self._trackers)
+        streams = {stream: tracker.info() for stream, tracker in trackers.items()}
+        keyframes = sum(s["keyframes"] for s in streams.values())
+        tracked = sum(s["tracked_frames"] for s in streams.values())
+        return {
+            "keyframe_interval": self.keyframe_interval,
+            "keyframes": keyframes,
+            "tracked_frames": tracked,
+            "tracked_ratio": round(tracked / (keyframes + tracked), 3) if keyframes + tracked else 0.0,
+            "streams": streams,
+        }
+
+    def forget_stream(self, stream_id: str) -> None:
+        """Drop the per-stream state of `stream_id` (tracker, change gate, cascade
+        search, fair-queue entries), e.g. when its camera room is evicted."""
+        with self._trackers_lock:
+            self._trackers.pop(stream_id, None)
+        with self._cascade_lock:
+            self._cascade_states.pop(stream_id, None)
+        if self.change_gate is not None:
+            self.change_gate.reset(stream_id)
+        if self.scheduler is not None:
+            self.scheduler.forget(stream_id)
+        pool = self._model.pool if self._model is not None else None
+        if pool is not None:
+            pool.forget(stream_id)
+
+    def _cache_key(self, data: Any) -> tuple | None:
+        """Cache key for encoded bytes or a decoded frame; None when results are not cacheable."""
+        if self.cache is None or not self.cache.enabled or (self.net is None and self.process_backend is None):
+            return None
+        return (
+            content_hash(data),
+            str(self.model_path),
+            self.variant,
+            self.input_size,
+            self.backend,
+            self.target,
+            self.conf_threshold,
+            self.score_threshold,
+            self.nms_threshold,
+            self.medication_roi,
+            self.letterbox,
+        )
+
+    def _input_blob(self, images: List[Any], key: Any) -> Any:
+        """NCHW input for `images`; letterboxed into the buffer owned by `key` (a context or thread)."""
+        if self.letterbox:
+            buffer = self._buffers.get(key)
+            if buffer is None:
+                with self._buffers_lock:
+                    buffer = self._buffers.get(key)
+                    if buffer is None:
+                        buffer = LetterboxBuffer(self.input_size, len(images), self.preprocess_stats)
+                        self._buffers[key] = buffer
+            return buffer.fill(images)
+        start = time.perf_counter()
+        size = (self.input_size, self.input_size)
+        blob = cv2.dnn.blobFromImages(images, 0.00392, size, (0, 0, 0), True, crop=False)
+        self.preprocess_stats.allocated()
+        self.preprocess_stats.record("blob", (time.perf_counter() - start) * 1000.0, frames=len(images))
+        return blob
+
+    def preprocess_info(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {"letterbox": self.letterbox, "buffers": len(self._buffers)}
+        data.update(self.preprocess_stats.snapshot())
+        return data
+
+    def model_info(self) -> Dict[str, Any]:
+        """Which model this detector serves, for status pages."""
+        if self.process_backend is not None:
+            runtime = "process"
+        elif self.net is not None:
+            runtime = "in-process"
+        else:
+            runtime = "simulated" if self.use_simulated else "cascade"
+        return {
+            "variant": self.variant,
+            "input_size": self.input_size,
+            "backend": self.backend,
+            "target": self.target,
+            "letterbox": self.letterbox,
+            "runtime": runtime,
+        }
+
+    def warm_up(self, runs: int | None = None) -> Dict[str, Any]:
+        """Run synthetic frames through the network before serving traffic.
+
+        The first forward pass on each context pays for graph setup and buffer
+        allocation; doing it here keeps that cost out of the first request.
+        Every pooled context gets `runs` passes. Timings are kept in `self.warmup`.
+        """
+        runs = WARMUP_RUNS if runs is None else runs
+        timings: List[float] = []
+        if self.net is not None or self.process_backend is not None:
+            pool = self._model.pool if self._model is not None else None
+            contexts = pool.size if pool is not None else (self.process_backend.workers if self.process_backend else 1)
+            frame = np.random.default_rng(0).integers(0, 255, (self.input_size, self.input_size, 3), dtype=np.uint8)
+            for _ in range(max(0, runs) * contexts):
+                start = time.perf_counter()
+                self._detect_all(frame)
+                timings.append((time.perf_counter() - start) * 1000.0)
+        self.warmup = {
+            "runs": len(timings),
+            "timings_ms": [round(t, 1) for t in timings],
+            "total_ms": round(sum(timings), 1),
+        }
+        if timings:
+            print(f"[YOLOV4] Warm-up: {len(timings)} passes, first {timings[0]:.0f} ms, last {timings[-1]:.0f} ms")
+        return self.warmup
+
+    def batching_info(self) -> Dict[str, Any] | None:
+        return self.scheduler.info() if self.scheduler is not None else None
+
+    def _run_frame(self, image: Any) -> Any:
+        """Preprocess `image` into the buffer of the context that runs it, then forward."""
+        pool = self._model.pool if self._model is not None else None
+        if pool is None:
+            with self.net_lock:
+                return self._run_net(self.net, self._input_blob([image], id(self.net)))
+        with pool.context(timeout=self.admission_timeout) as net:
+            return self._run_net(net, self._input_blob([image], id(net)))
+
+    def _run_batch(self, blob: Any) -> Any:
+        pool = self._model.pool if self._model is not None else None
+        if pool is None:
+            with self.net_lock:
+                return self._run_net(self.net, blob)
+        with pool.context(timeout=self.admission_timeout) as net:
+            return self._run_net(net, blob)
+
+    def _setup_process_backend(self, workers: int) -> bool:
+        """Serve detections from `workers` processes; the weights are not loaded here."""
+        names_file = self.model_path / "coco.names"
+        if cv2 is None or not all(
+            (self.model_path / name).exists()
+            for name in get_backend(self.backend).model_files(self.variant) + ("coco.names",)
+        ):
+            return False
+        try:
+            from .process_backend import ProcessInferenceBackend
+        except ImportError:  # executed as a script from inside yoloV4/
+            from process_backend import ProcessInferenceBackend  # type: ignore
+        try:
+            backend = ProcessInferenceBackend(
+                str(self.model_path.resolve()),
+                workers=workers,
+                admission_timeout=self.admission_timeout,
+                detector_kwargs={
+                    "variant": self.variant,
+                    "input_size": self.input_size,
+                    "backend": self.backend,
+                    "target": self.target,
+                    # Workers see frames from every stream; gating and tracking happen here
+                    "change_threshold": 0,
+                    "keyframe_interval": 0,
+                    "medication_roi": self.medication_roi,
+                    "letterbox": self.letterbox,
+                },
+            )
+            if not backend.start():
+                return False
             with open(names_file, "r", encoding="utf-8") as fh:
                 self.classes = [line.strip() for line in fh]
-
-            # Prefer the newer API to get output layer names directly
-            try:
-                self.output_layers = self.net.getUnconnectedOutLayersNames()  # type: ignore[union-attr]
-            except Exception:
-                try:
-                    layer_names = self.net.getLayerNames()  # type: ignore[union-attr]
-                    self.output_layers = [layer_names[i - 1] for i in self.net.getUnconnectedOutLayers()]  # type: ignore[index]
-                except Exception:
-                    self.output_layers = []
-
-            print(f"[YOLOV4] Loaded {len(self.classes)} classes")
-            print("[YOLOV4] Ready for person detection")
-        except Exception as exc:  # pragma: no cover - OpenCV runtime errors hard to reproduce in tests
-            LOGGER.warning("Error loading YOLOv4 network, enabling fallback: %s", exc, exc_info=True)
-            self.net = None
-            self._setup_fallback_detector()
+        except Exception as exc:
+            LOGGER.warning("Could not start YOLO worker processes: %s; loading in-process", exc, exc_info=True)
+            return False
+        self.process_backend = backend
+        return True
+
+    def release_model(self) -> None:
+        """Drop this detector's reference to the shared network and use the fallback."""
+        self.disable_batching()
+        if self.process_backend is not None:
+            self.process_backend.close()
+            self.process_backend = None
+        model = getattr(self, "_model", None)
+        if model is not None:
+            get_model_registry().release(model, self)
+        self._model = None
+        self.net = None
+        self.output_layers = []
+        self.net_lock = threading.Lock()
+        self._buffers.clear()
+        self._setup_fallback_detector()
 
     def _setup_fallback_detector(self) -> None:
         if cv2 is None:
             self._setup_simulated_detector()
             return
 
-        cascade_path = Path(cv2.data.haarcascades) / "haarcascade_frontalface_default.xml"  # type: ignore[attr-defined]
-        cascade = cv2.CascadeClassifier(str(cascade_path))
-        if cascade.empty():
-            LOGGER.warning("Failed to load Haar cascade at %s; using simulated fallback", cascade_path)
+        cascade = load_face_cascade()
+        if cascade is None:
+            LOGGER.warning("Haar cascade unavailable; using simulated fallback")
             self._setup_simulated_detector()
             return
 
@@ -156,109 +586,260 @@ class YOLOv4PersonDetector:
             LOGGER.warning("cv2.imread returned None for %s; using simulated detector", image_path)
             return self._simulate_detection()
 
-        height, width = image.shape[:2]
+        return self.detect_persons_in_array(image)
 
-        if self.net is None or not self.output_layers:
-            return self._detect_with_cascade(image)
+    def detect_persons_in_bytes(self, data: bytes) -> List[Dict[str, Any]]:
+        """Detect persons in an encoded image (JPEG/PNG bytes) without touching disk."""
+        if self.use_simulated or cv2 is None:
+            return self._simulate_detection()
 
-        try:
-            blob = cv2.dnn.blobFromImage(image, 0.00392, (416, 416), (0, 0, 0), True, crop=False)
-            with self.net_lock:
-                self.net.setInput(blob)
-                # Use getUnconnectedOutLayersNames at call time to avoid backend reuse issues
-                try:
-                    out_names = self.net.getUnconnectedOutLayersNames()  # type: ignore[attr-defined]
-                except Exception:
-                    out_names = self.output_layers
-                outs = self.net.forward(out_names)
-        except Exception as exc:  # pragma: no cover - OpenCV runtime errors
-            import traceback as _tb
-            tb = _tb.format_exc()
-            LOGGER.warning("YOLO forward pass failed (%s); using cascade fallback", exc, exc_info=True)
-            try:
-                with open(str(self.model_path / 'detect_error.log'), 'a', encoding='utf-8') as _f:
-                    _f.write('\n--- YOLO FORWARD ERROR ---\n')
-                    _f.write(tb)
-            except Exception:
-                pass
-            return self._detect_with_cascade(image)
-
-        boxes: List[List[int]] = []
-        confidences: List[float] = []
-        class_ids: List[int] = []
-
-        for out in outs:
-            for detection in out:
-                scores = detection[5:]
-                class_id = int(np.argmax(scores))
-                # Only consider the COCO 'person' class (class_id == 0)
-                if class_id != 0:
-                    continue
-                confidence = float(scores[class_id])
-                # Filter low-confidence detections early
-                if confidence <= 0.3:
-                    continue
+        result = self.detect_all_in_bytes(data)
+        if result is None:
+            LOGGER.warning("Could not decode %d image bytes; using simulated detector", len(data or b""))
+            return self._simulate_detection()
 
-                center_x = int(detection[0] * width)
-                center_y = int(detection[1] * height)
-                w = int(detection[2] * width)
-                h = int(detection[3] * height)
-                x = center_x - w // 2
-                y = center_y - h // 2
+        return result["persons"]
 
-                boxes.append([x, y, w, h])
-                confidences.append(confidence)
-                class_ids.append(class_id)
+    def detect_all_in_bytes(self, data: bytes, stream_id: str = "default") -> Dict[str, List[Dict[str, Any]]] | None:
+        """`detect_all` for encoded image bytes; returns None if they cannot be decoded.
 
-        if not boxes:
-            LOGGER.debug("YOLO produced no boxes; falling back to cascade")
-            return self._detect_with_cascade(image)
+        Without per-stream stages the detection cache is consulted with a hash
+        of the bytes themselves, so a repeated image skips decoding as well as
+        inference. With the change gate or tracking on, the result depends on
+        the stream's state and those stages already skip repeated frames, so
+        the cache is not used (see `_detect_gated`).
+        """
+        key = self._cache_key(data) if data and not self._has_stream_stages() else None
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        image = decode_image_bytes(data)
+        if image is None:
+            return None
+        result = self.detect_all(image, stream_id)
+        if key is not None:
+            self.cache.put(key, result)
+        return result
+
+    def detect_persons_in_array(self, image: Any) -> List[Dict[str, Any]]:
+        """Detect persons in an already decoded BGR frame (numpy array, HxWx3)."""
+        return self.detect_all(image)["persons"]
+
+    def detect_all(self, image: Any, stream_id: str = "default") -> Dict[str, List[Dict[str, Any]]]:
+        """Run a single YOLO forward pass and split the results by class.
+
+        Returns ``{"persons": [...], "objects": [...]}`` where ``persons`` holds the
+        (NMS-filtered, top-3) person boxes and ``objects`` the non-person
+        detections used as medication candidates. Pass the result to
+        `YOLOv4MedicationDetector.detect_and_identify_in_array(..., detections=...)`
+        to identify persons without running the network again.
+
+        With tracking enabled, only keyframes of `stream_id` run the detector;
+        the frames in between get the tracked person boxes (tagged
+        ``"tracked": True``) and the keyframe's objects. Person boxes carry a
+        ``track_id`` that stays the same while the person keeps being matched.
+        With the change gate enabled, a frame that barely differs from the last
+        analyzed frame of `stream_id` gets a copy of that frame's result instead.
+
+        Unless the caller set its own `inference_client`, the forward pass waits
+        for the shared pool under `stream_id`, so streams get contexts in turn.
+        """
+        if client_is_set():
+            return self._detect_stream(image, stream_id)
+        with inference_client(stream_id):
+            return self._detect_stream(image, stream_id)
+
+    def detect_all_batch(self, images: List[Any]) -> List[Dict[str, List[Dict[str, Any]]]]:
+        """`detect_all` for several unrelated frames with one forward pass for all of them.
+
+        Meant for offline runs over stored images: the change gate and the
+        tracker are skipped (the frames are not a stream), the detection cache
+        is not. Without an in-process network each frame is detected on its own.
+        """
+        if self.use_simulated or cv2 is None or self.net is None or not self.output_layers:
+            return [self._detect_cached(image, None) for image in images]
+        results: List[Any] = [None] * len(images)
+        keys = [self._cache_key(image) for image in images]
+        pending = []
+        for index, key in enumerate(keys):
+            cached = self.cache.get(key) if key is not None else None
+            if cached is not None:
+                results[index] = cached
+            else:
+                pending.append(index)
+        if not pending:
+            return results
 
         try:
-            indices = cv2.dnn.NMSBoxes(boxes, confidences, 0.5, 0.4)
+            frames = [images[index] for index in pending]
+            outs = self._run_batch(self._input_blob(frames, ("batch", threading.get_ident())))
+        except InferencePoolBusy:
+            raise
         except Exception as exc:
-            import traceback as _tb
-            tb = _tb.format_exc()
-            LOGGER.warning("NMSBoxes failed (%s); using cascade fallback", exc, exc_info=True)
+            LOGGER.warning("Batched forward pass failed (%s); detecting frame by frame", exc)
+            outs = None
+        for position, index in enumerate(pending):
+            if outs is None:
+                result = self._detect_all(images[index], None)
+            else:
+                # Batched outputs are (B, rows, 85); a batch of one comes back as (rows, 85)
+                result = self._decode_all([out[position] if out.ndim == 3 else out for out in outs], images[index], None)
+            if keys[index] is not None:
+                self.cache.put(keys[index], result)
+            results[index] = result
+        return results
+
+    def _has_stream_stages(self) -> bool:
+        """True when the change gate or the tracker keeps per-stream state."""
+        return self.change_gate is not None or self.keyframe_interval > 1
+
+    def _detect_stream(self, image: Any, stream_id: str) -> Dict[str, List[Dict[str, Any]]]:
+        if self.keyframe_interval <= 1 or image is None or self.use_simulated:
+            return self._detect_gated(image, stream_id)
+        with self._trackers_lock:
+            tracker = self._trackers.get(stream_id)
+            if tracker is None:
+                tracker = self._trackers[stream_id] = PersonTracker(keyframe_interval=self.keyframe_interval)
+        with tracker.lock:
+            if not tracker.needs_detection():
+                persons = tracker.predict(image.shape)
+                if persons:
+                    return {"persons": persons, "objects": copy.deepcopy(tracker.objects)}
+        # Keyframe (or every track was lost while predicting)
+        result = self._detect_gated(image, stream_id)
+        with tracker.lock:
+            tracker.update(result["persons"], result.get("objects"))
+        return result
+
+    def _detect_gated(self, image: Any, stream_id: str) -> Dict[str, List[Dict[str, Any]]]:
+        # The content hash is a pass over the full frame; behind a gate or tracker,
+        # which already skip repeated frames, it would cost that on every frame
+        # they let through for a cache that almost never hits
+        detect = self._detect_all if self._has_stream_stages() else self._detect_cached
+        gate = self.change_gate
+        if gate is None or image is None or cv2 is None:
+            return detect(image, stream_id)
+        thumb, cached = gate.lookup(image, stream_id)
+        if cached is not None:
+            return cached
+        result = detect(image, stream_id)
+        gate.store(thumb, image.shape, result, stream_id)
+        return result
+
+    def _detect_cached(self, image: Any, stream_id: str | None = "default") -> Dict[str, List[Dict[str, Any]]]:
+        key = self._cache_key(image) if image is not None and cv2 is not None else None
+        if key is None:
+            return self._detect_all(image, stream_id)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        result = self._detect_all(image, stream_id)
+        self.cache.put(key, result)
+        return result
+
+    def _detect_all(self, image: Any, stream_id: str | None = "default") -> Dict[str, List[Dict[str, Any]]]:
+        if self.use_simulated or cv2 is None or image is None:
+            return {
+                "persons": self._simulate_detection(image.shape if image is not None else None),
+                "objects": [{"class": "pill", "confidence": 0.72, "box": [10, 10, 80, 40]}] if self.use_simulated else [],
+            }
+
+        if self.process_backend is not None:
             try:
-                with open(str(self.model_path / 'detect_error.log'), 'a', encoding='utf-8') as _f:
-                    _f.write('\n--- NMS ERROR ---\n')
-                    _f.write(tb)
-            except Exception:
-                pass
-            return self._detect_with_cascade(image)
+                return self.process_backend.detect_all(
+                    image, (self.conf_threshold, self.score_threshold, self.nms_threshold)
+                )
+            except InferencePoolBusy:
+                raise
+            except Exception as exc:
+                LOGGER.warning("YOLO worker processes failed (%s); using cascade fallback", exc)
+                if self.face_cascade is None:
+                    self._setup_fallback_detector()
+                return {"persons": self._detect_with_cascade(image, stream_id), "objects": []}
 
-        if indices is None or len(indices) == 0:
-            LOGGER.debug("NMS returned no indices; falling back to cascade")
-            return self._detect_with_cascade(image)
+        if self.net is None or not self.output_layers:
+            return {"persons": self._detect_with_cascade(image, stream_id), "objects": []}
+
+        outs = self._forward(image)
+        if outs is None:
+            return {"persons": self._detect_with_cascade(image, stream_id), "objects": []}
+        return self._decode_all(outs, image, stream_id)
 
-        # Normalize indices into a flat list regardless of OpenCV return shape
+    def _decode_all(self, outs: Any, image: Any, stream_id: str | None = "default") -> Dict[str, List[Dict[str, Any]]]:
+        height, width = image.shape[:2]
+        start = time.perf_counter()
+        persons = self._decode_persons(outs, image, width, height, stream_id)
+        objects = self._decode_objects(outs, width, height)
+        self.preprocess_stats.record("decode", (time.perf_counter() - start) * 1000.0)
+        if self.medication_roi:
+            objects = self.detect_medications_roi(image, {"persons": persons, "objects": objects})
+        return {"persons": persons, "objects": objects}
+
+    def _forward(self, image: Any) -> Any:
+        """Run the network on `image`; returns the raw outputs or None on failure.
+
+        Raises `InferencePoolBusy` when every pooled context stays busy for
+        `admission_timeout` seconds, so callers can shed load instead of queueing.
+        """
         try:
-            flat_indices = np.array(indices).reshape(-1).tolist()
+            if self.scheduler is not None:
+                return self.scheduler.forward(image)
+            return self._run_frame(image)
+        except InferencePoolBusy:
+            raise
+        except Exception as exc:  # pragma: no cover - OpenCV runtime errors
+            # Counted and written off-thread; the full traceback is logged once per interval
+            logged = get_error_recorder().record("YOLO FORWARD ERROR", self.model_path / 'detect_error.log', exc)
+            LOGGER.warning("YOLO forward pass failed (%s); using cascade fallback", exc, exc_info=logged)
+            return None
+
+    def _run_net(self, net: Any, blob: Any) -> Any:
+        start = time.perf_counter()
+        net.setInput(blob)
+        # Use getUnconnectedOutLayersNames at call time to avoid backend reuse issues
+        try:
+            out_names = net.getUnconnectedOutLayersNames()  # type: ignore[attr-defined]
         except Exception:
-            try:
-                # Sometimes indices is already a flat list/tuple
-                flat_indices = list(indices)
-            except Exception:
-                flat_indices = []
-        result = []
-        for i in flat_indices:
-            # Use the stored class_id for this box (should be 0/person)
-            try:
-                cid = class_ids[i] if i < len(class_ids) else 0
-            except Exception:
-                cid = 0
-            conf = _sanitize_confidence(confidences[i] if i < len(confidences) else 0.0)
-            class_name = "person"
-            try:
-                if self.classes and cid < len(self.classes):
-                    class_name = self.classes[cid]
-            except Exception:
-                pass
-            result.append({"class": class_name, "confidence": conf, "box": boxes[i]})
+            out_names = self.output_layers
+        outs = net.forward(out_names)
+        self.preprocess_stats.record("forward", (time.perf_counter() - start) * 1000.0)
+        return outs
+
+    def _decode_persons(
+        self, outs: Any, image: Any, width: int, height: int, stream_id: str | None = "default"
+    ) -> List[Dict[str, Any]]:
+        boxes, confidences, class_ids = decode_yolo_outputs(
+            outs, width, height, self.conf_threshold, letterbox=self.input_size if self.letterbox else None
+        )
+        # Only consider the COCO 'person' class (class_id == 0)
+        is_person = class_ids == 0
+        boxes, confidences = boxes[is_person], confidences[is_person]
+
+        if len(boxes) == 0:
+            LOGGER.debug("YOLO produced no boxes; falling back to cascade")
+            return self._detect_with_cascade(image, stream_id)
 
-        # Limit to top-3 person detections by confidence
-        result = sorted(result, key=lambda x: x.get('confidence', 0.0), reverse=True)[:3]
+        try:
+            indices = cv2.dnn.NMSBoxes(boxes.astype(np.int32), confidences, self.score_threshold, self.nms_threshold)
+        except Exception as exc:
+            logged = get_error_recorder().record("NMS ERROR", self.model_path / 'detect_error.log', exc)
+            LOGGER.warning("NMSBoxes failed (%s); using cascade fallback", exc, exc_info=logged)
+            return self._detect_with_cascade(image, stream_id)
+
+        if indices is None or len(indices) == 0:
+            LOGGER.debug("NMS returned no indices; falling back to cascade")
+            return self._detect_with_cascade(image, stream_id)
+
+        # Normalize indices into a flat array regardless of OpenCV return shape,
+        # then keep the top-3 person detections by confidence
+        keep = np.asarray(indices, dtype=np.int64).reshape(-1)
+        keep = keep[np.argsort(-confidences[keep], kind="stable")][:3]
+        class_name = self.classes[0] if self.classes else "person"
+        result = [
+            {"class": class_name, "confidence": _sanitize_confidence(conf), "box": box}
+            for conf, box in zip(confidences[keep].tolist(), boxes[keep].tolist())
+        ]
 
         print("[YOLOV4] Detected {} objects".format(len(result)))
         for idx, detection in enumerate(result, start=1):
@@ -266,10 +847,7 @@ class YOLOv4PersonDetector:
 
         return result
 
-        # Defensive outer fallback (shouldn't normally reach here)
-        return self._detect_with_cascade(image)
-
-    def _detect_with_cascade(self, image) -> List[Dict[str, Any]]:
+    def _detect_with_cascade(self, image, stream_id: str | None = "default") -> List[Dict[str, Any]]:
         if self.use_simulated or cv2 is None or image is None:
             return self._simulate_detection(image.shape if image is not None else None)
 
@@ -278,8 +856,7 @@ class YOLOv4PersonDetector:
             return self._simulate_detection(image.shape)
 
         try:
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            faces = self.face_cascade.detectMultiScale(gray, 1.1, 4)
+            faces = self._cascade_faces_in(image, stream_id)
         except Exception as exc:  # pragma: no cover - OpenCV runtime errors
             LOGGER.warning("Cascade detection failed (%s); using simulated fallback", exc, exc_info=True)
             return self._simulate_detection(image.shape)
@@ -302,6 +879,71 @@ class YOLOv4PersonDetector:
         LOGGER.debug("Cascade found no faces; returning simulated detection")
         return self._simulate_detection(image.shape)
 
+    def _cascade_state(self, stream_id: str) -> _CascadeState:
+        with self._cascade_lock:
+            state = self._cascade_states.get(stream_id)
+            if state is None:
+                state = self._cascade_states[stream_id] = _CascadeState()
+            return state
+
+    def _cascade_faces_in(self, image: Any, stream_id: str | None = "default") -> List[List[int]]:
+        """Face boxes ``[x, y, w, h]`` in `image` pixels from the shrunk grayscale frame.
+
+        The previous faces of `stream_id` narrow the search; frames that are
+        not part of a stream (`stream_id` None) always get a full scan.
+        """
+        height, width = image.shape[:2]
+        scale = min(1.0, self.cascade_width / float(width))
+        gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        if scale < 1.0:
+            gray = cv2.resize(gray, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+        if stream_id is None:
+            return [[int(round(v / scale)) for v in face] for face in self._cascade_search(gray, None)]
+        state = self._cascade_state(stream_id)
+        with state.lock:
+            faces = self._cascade_search(gray, state)
+        return [[int(round(v / scale)) for v in face] for face in faces]
+
+    def _cascade_search(self, gray: Any, state: _CascadeState | None) -> List[List[int]]:
+        small_h, small_w = gray.shape[:2]
+        previous: List[List[int]] = []
+        if state is not None:
+            state.frames += 1
+            previous = state.faces if state.shape == gray.shape else []
+        faces: List[List[int]] | None = None
+        if previous and state.frames % max(1, self.cascade_full_scan_every):
+            # Local search: a window twice the size of each previous face, with a
+            # size range around it; any miss falls through to a full scan
+            faces = []
+            for x, y, w, h in previous:
+                x0, y0 = max(0, x - w // 2), max(0, y - h // 2)
+                x1, y1 = min(small_w, x + w + w // 2), min(small_h, y + h + h // 2)
+                with _FACE_CASCADE_RUN_LOCK:
+                    found = self.face_cascade.detectMultiScale(
+                        gray[y0:y1, x0:x1], 1.1, 4,
+                        minSize=(max(CASCADE_MIN_FACE, int(w * 0.7)),) * 2,
+                        maxSize=(int(w * 1.4) + 1,) * 2,
+                    )
+                if len(found) == 0:
+                    faces = None
+                    break
+                fx, fy, fw, fh = max(found, key=lambda f: f[2] * f[3])
+                faces.append([int(fx) + x0, int(fy) + y0, int(fw), int(fh)])
+        if faces is None or not previous:
+            side = min(small_w, small_h)
+            with _FACE_CASCADE_RUN_LOCK:
+                found = self.face_cascade.detectMultiScale(
+                    gray, 1.1, 4, minSize=(CASCADE_MIN_FACE, CASCADE_MIN_FACE), maxSize=(side, side)
+                )
+            faces = [[int(v) for v in f] for f in found]
+            if state is not None:
+                state.frames = 0
+
+        if state is not None:
+            state.faces = faces
+            state.shape = gray.shape
+        return faces
+
     def _simulate_detection(self, image_shape: Any | None = None) -> List[Dict[str, Any]]:
         if image_shape is None:
             height, width = 480, 640
@@ -342,51 +984,219 @@ class YOLOv4PersonDetector:
         if img is None:
             return []
 
-        height, width = img.shape[:2]
-        if self.net is None or not self.output_layers:
+        return self.detect_medications_in_array(img)
+
+    def detect_medications_in_bytes(self, data: bytes) -> List[Dict[str, Any]]:
+        """Same as `detect_medications_in_image` for encoded image bytes."""
+        if self.use_simulated:
+            return [{"class": "pill", "confidence": 0.72, "box": [10, 10, 80, 40]}]
+        if cv2 is None:
             return []
+        result = self.detect_all_in_bytes(data)
+        return result["objects"] if result is not None else []
+
+    def detect_medications_in_array(self, img: Any) -> List[Dict[str, Any]]:
+        """Same as `detect_medications_in_image` for an already decoded BGR frame."""
+        return self.detect_all(img)["objects"]
+
+    def detect_medications_roi(
+        self, image: Any, detections: Dict[str, List[Dict[str, Any]]] | None = None
+    ) -> List[Dict[str, Any]]:
+        """Two-stage medication detection on crops around hands and tables.
+
+        Stage one is a full-frame `detect_all` (or the `detections` already
+        computed for `image`). Stage two upscales crops around each person's
+        hand area and around table/bed boxes to the network input size and runs
+        them as one batched forward pass, so pill boxes that shrink to a few
+        pixels in the full frame are seen at several times the resolution.
+        Returns the non-person objects of both stages after class-wise NMS.
+        """
+        if detections is None:
+            detections = self._detect_all(image)
+        objects = list(detections.get("objects") or [])
+        if cv2 is None or image is None or self.net is None:
+            return objects
+        height, width = image.shape[:2]
+        regions = medication_regions(
+            detections.get("persons") or [], objects, width, height, max_crops=ROI_MAX_CROPS
+        )
+        if not regions:
+            return objects
+
         try:
-            blob = cv2.dnn.blobFromImage(img, 0.00392, (416, 416), (0, 0, 0), True, crop=False)
-            with self.net_lock:
-                self.net.setInput(blob)
-                try:
-                    out_names = self.net.getUnconnectedOutLayersNames()  # type: ignore[attr-defined]
-                except Exception:
-                    out_names = self.output_layers
-                outs = self.net.forward(out_names)
+            crops = [image[y:y + h, x:x + w] for x, y, w, h in regions]
+            # The blob is consumed before this thread preprocesses anything else
+            outs = self._run_batch(self._input_blob(crops, ("roi", threading.get_ident())))
+        except InferencePoolBusy:
+            raise
         except Exception as exc:
-            import traceback as _tb
-            tb = _tb.format_exc()
-            LOGGER.warning("YOLO forward for meds failed: %s", exc, exc_info=True)
-            try:
-                with open(str(self.model_path / 'detect_error.log'), 'a', encoding='utf-8') as _f:
-                    _f.write('\n--- MEDS FORWARD ERROR ---\n')
-                    _f.write(tb)
-            except Exception:
-                pass
+            LOGGER.warning("Medication ROI pass failed (%s); using full-frame objects", exc)
+            return objects
+
+        boxes, confidences, class_ids = [], [], []
+        for obj in objects:
+            boxes.append(list(obj["box"]))
+            confidences.append(obj["confidence"])
+            class_ids.append(self.classes.index(obj["class"]) if obj["class"] in self.classes else -1)
+        for index, (x, y, w, h) in enumerate(regions):
+            # Batched outputs are (B, rows, 85); a batch of one comes back as (rows, 85)
+            crop_outs = [out[index] if out.ndim == 3 else out for out in outs]
+            crop_boxes, crop_conf, crop_ids = decode_yolo_outputs(
+                crop_outs, w, h, self.conf_threshold, letterbox=self.input_size if self.letterbox else None
+            )
+            for box, conf, class_id in zip(crop_boxes.tolist(), crop_conf.tolist(), crop_ids.tolist()):
+                if class_id == 0:
+                    continue
+                boxes.append([box[0] + x, box[1] + y, box[2], box[3]])
+                confidences.append(conf)
+                class_ids.append(class_id)
+        if not boxes:
             return []
 
+        # Class-wise NMS: shift every class into its own region of the plane
+        shifted = np.asarray(boxes, dtype=np.int64)
+        shifted[:, :2] += (np.asarray(class_ids, dtype=np.int64) + 1)[:, None] * (max(width, height) + 1)
+        keep = cv2.dnn.NMSBoxes(
+            shifted.astype(np.int32), np.asarray(confidences, dtype=np.float32), self.conf_threshold, self.nms_threshold
+        )
+        result = []
+        for i in sorted(np.asarray(keep, dtype=np.int64).reshape(-1).tolist(), key=lambda i: -confidences[i]):
+            if i < len(objects):
+                result.append(objects[i])
+                continue
+            class_id = class_ids[i]
+            class_name = self.classes[class_id] if (self.classes and class_id < len(self.classes)) else "class_{}".format(class_id)
+            result.append({"class": class_name, "confidence": _sanitize_confidence(confidences[i]), "box": boxes[i], "roi": True})
+        return result
+
+    def _decode_objects(self, outs: Any, width: int, height: int) -> List[Dict[str, Any]]:
+        boxes, confidences, class_ids = decode_yolo_outputs(
+            outs, width, height, self.conf_threshold, letterbox=self.input_size if self.letterbox else None
+        )
+        # skip the person class (0); the rest are medication candidates
+        not_person = class_ids != 0
         meds = []
-        for out in outs:
-            for detection in out:
-                scores = detection[5:]
-                class_id = int(np.argmax(scores))
-                confidence = float(scores[class_id])
-                # skip low confidence and skip person class (0)
-                if confidence <= 0.3 or class_id == 0:
-                    continue
-                class_name = self.classes[class_id] if (self.classes and class_id < len(self.classes)) else "class_{}".format(class_id)
-                center_x = int(detection[0] * width)
-                center_y = int(detection[1] * height)
-                w = int(detection[2] * width)
-                h = int(detection[3] * height)
-                x = center_x - w // 2
-                y = center_y - h // 2
-                meds.append({"class": class_name, "confidence": _sanitize_confidence(confidence), "box": [x, y, w, h]})
+        for class_id, conf, box in zip(
+            class_ids[not_person].tolist(), confidences[not_person].tolist(), boxes[not_person].tolist()
+        ):
+            class_name = self.classes[class_id] if (self.classes and class_id < len(self.classes)) else "class_{}".format(class_id)
+            meds.append({"class": class_name, "confidence": _sanitize_confidence(conf), "box": box})
 
         return meds
 
 
+def decode_yolo_outputs(
+    outs: Any, width: int, height: int, conf_threshold: float = 0.3, letterbox: int | None = None
+):
+    """Decode raw YOLO output layers with array operations.
+
+    `outs` is the list returned by ``net.forward(out_names)``; each entry holds
+    rows of ``[cx, cy, w, h, objectness, class scores...]`` normalised to the
+    input size. Rows whose best class score is not above `conf_threshold` are
+    dropped. Returns ``(boxes, confidences, class_ids)`` where ``boxes`` is an
+    (N, 4) int array of ``[x, y, w, h]`` in image pixels. Pass the network
+    input size as `letterbox` when the frame was letterboxed rather than stretched.
+    """
+    arrays = [np.asarray(out, dtype=np.float32) for out in (outs if outs is not None else [])]
+    arrays = [a.reshape(-1, a.shape[-1]) for a in arrays if a.size]
+    if not arrays:
+        return np.zeros((0, 4), dtype=np.int64), np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64)
+
+    rows = arrays[0] if len(arrays) == 1 else np.concatenate(arrays, axis=0)
+    scores = rows[:, 5:]
+    class_ids = scores.argmax(axis=1)
+    confidences = np.take_along_axis(scores, class_ids[:, None], axis=1)[:, 0]
+    keep = confidences > conf_threshold
+    rows, class_ids, confidences = rows[keep], class_ids[keep], confidences[keep]
+
+    if letterbox:
+        # Undo the padding and the uniform scale of the letterboxed input
+        ratio, _, _, pad_x, pad_y = letterbox_params(width, height, letterbox)
+        cxcywh_f = rows[:, :4] * np.float32(letterbox)
+        cxcywh_f[:, :2] -= np.array([pad_x, pad_y], dtype=np.float32)
+        cxcywh = (cxcywh_f / np.float32(ratio)).astype(np.int64)
+    else:
+        scale = np.array([width, height, width, height], dtype=np.float32)
+        cxcywh = (rows[:, :4] * scale).astype(np.int64)
+    wh = cxcywh[:, 2:]
+    boxes = np.concatenate([cxcywh[:, :2] - wh // 2, wh], axis=1)
+    return boxes, confidences, class_ids
+
+
+def medication_regions(
+    persons: List[Dict[str, Any]],
+    objects: List[Dict[str, Any]],
+    width: int,
+    height: int,
+    max_crops: int = 4,
+    min_size: int = 160,
+) -> List[List[int]]:
+    """Square ``[x, y, w, h]`` crops where medication is likely to be found.
+
+    Each person contributes the band around the hands (lower torso, widened
+    to arm's reach); table/bed/sofa detections contribute their own box.
+    Crops that mostly overlap are merged and the `max_crops` largest are kept.
+    """
+    regions = []
+    for person in persons:
+        x, y, w, h = (float(v) for v in (person.get("box") or [0, 0, 0, 0])[:4])
+        if w > 0 and h > 0:
+            regions.append([x - 0.25 * w, y + 0.3 * h, 1.5 * w, 0.5 * h])
+    for obj in objects:
+        if obj.get("class") in ROI_CONTEXT_CLASSES:
+            x, y, w, h = (float(v) for v in obj["box"][:4])
+            regions.append([x - 0.1 * w, y - 0.1 * h, 1.2 * w, 1.2 * h])
+
+    def square(x1: float, y1: float, x2: float, y2: float) -> List[int]:
+        # Square crops so resizing to the square network input does not distort them
+        side = int(min(max(x2 - x1, y2 - y1, min_size), width, height))
+        cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+        x0 = int(min(max(cx - side / 2, 0), width - side))
+        y0 = int(min(max(cy - side / 2, 0), height - side))
+        return [x0, y0, x0 + side, y0 + side]
+
+    def area(c: List[int]) -> int:
+        return (c[2] - c[0]) * (c[3] - c[1])
+
+    # A crop covering most of the frame gains nothing over the full-frame pass
+    limit = 0.6 * width * height
+    crops = [c for c in (square(x, y, x + w, y + h) for x, y, w, h in regions) if area(c) < limit]
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(crops)):
+            for j in range(i + 1, len(crops)):
+                a, b = crops[i], crops[j]
+                inter = max(0, min(a[2], b[2]) - max(a[0], b[0])) * max(0, min(a[3], b[3]) - max(a[1], b[1]))
+                union = square(min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+                if inter >= 0.5 * min(area(a), area(b)) and area(union) < limit:
+                    crops[i] = union
+                    del crops[j]
+                    merged = True
+                    break
+            if merged:
+                break
+
+    boxes = [[x1, y1, x2 - x1, y2 - y1] for x1, y1, x2, y2 in crops if x2 > x1 and y2 > y1]
+    boxes.sort(key=lambda b: -b[2] * b[3])
+    return boxes[:max_crops]
+
+
+def decode_image_bytes(data: bytes) -> Any:
+    """Decode JPEG/PNG bytes into a BGR numpy array. Returns None if decoding fails."""
+    if cv2 is None or not data:
+        return None
+    try:
+        buf = np.frombuffer(data, dtype=np.uint8)
+        image = cv2.imdecode(buf, cv2.IMREAD_COLOR)
+    except Exception as exc:
+        LOGGER.debug("cv2.imdecode failed: %s", exc)
+        return None
+    if image is None or image.ndim < 2:
+        return None
+    return image
+
+
 def _sanitize_confidence(value: Any) -> float:
     try:
         conf = float(value)
@@ -407,8 +1217,13 @@ def _sanitize_confidence(value: Any) -> float:
 class YOLOv4MedicationDetector:
     """Combines YOLO detections with medication lookups."""
 
-    def __init__(self, person_id_mapping: Dict[int, str] | None = None) -> None:
-        self.yolo = YOLOv4PersonDetector()
+    def __init__(
+        self,
+        person_id_mapping: Dict[int, str] | None = None,
+        detector: YOLOv4PersonDetector | None = None,
+    ) -> None:
+        # Reuse an existing detector when given so the network is not loaded twice
+        self.yolo = detector if detector is not None else YOLOv4PersonDetector()
         self.db = setup_medication_database()
         self.manager = MedicationManager(self.db)
         self.reminder = MedicationReminder(self.manager)
@@ -420,8 +1235,41 @@ class YOLOv4MedicationDetector:
 
         print("[DETECTOR] YOLOv4 + Medication system initialized")
 
-    def detect_and_identify(self, image_path: str) -> List[Dict[str, Any]]:
-        detections = self.yolo.detect_persons_in_image(image_path)
+    def detect_and_identify(
+        self, image_path: str, detections: Dict[str, List[Dict[str, Any]]] | None = None
+    ) -> List[Dict[str, Any]]:
+        """Identify persons in the image at `image_path`.
+
+        `detections` may be a result of `YOLOv4PersonDetector.detect_all` for the
+        same image; when given, no forward pass is run here.
+        """
+        if detections is None:
+            data = None
+            if cv2 is not None and not self.yolo.use_simulated and os.path.exists(image_path):
+                with open(image_path, "rb") as fh:
+                    data = fh.read()
+            # Bytes go through the detection cache before they are even decoded
+            detections = self.yolo.detect_all_in_bytes(data) if data else None
+            if detections is None:
+                # Keep the path-based behaviour for missing files and simulated mode
+                detections = {
+                    "persons": self.yolo.detect_persons_in_image(image_path),
+                    "objects": self.yolo.detect_medications_in_image(image_path),
+                }
+        return self._identify(detections)
+
+    def detect_and_identify_in_array(
+        self, image: Any, detections: Dict[str, List[Dict[str, Any]]] | None = None
+    ) -> List[Dict[str, Any]]:
+        """Same as `detect_and_identify` for an already decoded BGR frame."""
+        if detections is None:
+            detections = self.yolo.detect_all(image)
+        return self._identify(detections)
+
+    def _identify(self, all_detections: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        detections = all_detections.get("persons") or []
+        # Medication candidates come from the same forward pass as the persons
+        med_detections = all_detections.get("objects") or []
         if not detections:
             print("[RESULT] No persons detected")
             return []
@@ -446,8 +1294,7 @@ class YOLOv4MedicationDetector:
             medications = self.manager.get_medications(person_id)
             due_meds = self.reminder.get_due_medications(person_id)
 
-            # Try to detect medication objects in the same image and map them to known meds
-            med_detections = self.yolo.detect_medications_in_image(image_path)
+            # Map medication objects detected in the same image to known meds
             mapped_meds = []
             if med_detections:
                 # Build a simple name->med map from manager for this person
@@ -474,6 +1321,7 @@ class YOLOv4MedicationDetector:
                     "detection_confidence": confidence,
                     "person_id": person_id,
                     "person_name": person_name,
+                    "track_id": detection.get("track_id"),
                     "age": person_info.get("age"),
                     "phone": person_info.get("phone"),
                         "medications": medications,
@@ -491,21 +1339,28 @@ class YOLOv4MedicationDetector:
 # ============================================================================
 
 
-def download_yolov4_weights() -> None:
-    """Download YOLOv4 weights if they are missing (245 MB download)."""
+WEIGHT_URLS = {
+    "yolov4": ("https://github.com/AlexeyAB/darknet/releases/download/darknet_yolo_v4_pre/yolov4.weights", "245 MB"),
+    "yolov4-tiny": ("https://github.com/AlexeyAB/darknet/releases/download/darknet_yolo_v4_pre/yolov4-tiny.weights", "23 MB"),
+}
+
+
+def download_yolov4_weights(variant: str | None = None) -> None:
+    """Download the weights for `variant` (default: the configured one) if missing."""
 
     import urllib.request
 
+    variant = variant or MODEL_VARIANT
     model_dir = Path("yoloV4")
     model_dir.mkdir(parents=True, exist_ok=True)
-    weights_file = model_dir / "yolov4.weights"
+    weights_file = model_dir / model_files(variant)[1]
 
     if weights_file.exists():
         print("[YOLOV4] Weights already downloaded")
         return
 
-    print("[YOLOV4] Downloading YOLOv4 weights (245 MB)...")
-    url = "https://github.com/AlexeyAB/darknet/releases/download/darknet_yolo_v4_pre/yolov4.weights"
+    url, size = WEIGHT_URLS[variant]
+    print(f"[YOLOV4] Downloading {variant} weights ({size})...")
 
     try:
         urllib.request.urlretrieve(url, weights_file)
@@ -515,16 +1370,17 @@ def download_yolov4_weights() -> None:
         print("[FALLBACK] Will use Haar Cascade or simulated detection instead")
 
 
-def setup_yolov4_config() -> None:
-    """Download YOLOv4 config files if they are missing."""
+def setup_yolov4_config(variant: str | None = None) -> None:
+    """Download the config for `variant` (default: the configured one) and coco.names if missing."""
 
     import urllib.request
 
     model_dir = Path("yoloV4")
     model_dir.mkdir(parents=True, exist_ok=True)
 
+    config_name = model_files(variant or MODEL_VARIANT)[0]
     files = {
-        "yolov4.cfg": "https://raw.githubusercontent.com/AlexeyAB/darknet/master/cfg/yolov4.cfg",
+        config_name: "https://raw.githubusercontent.com/AlexeyAB/darknet/master/cfg/" + config_name,
         "coco.names": "https://raw.githubusercontent.com/AlexeyAB/darknet/master/data/coco.names",
     }
 